@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class MainBackendConfig(AppConfig):
+    name = 'MainBackend'
+    
+    def ready(self):
+        """
+        Connect the database statistics handlers when Django starts.
+        """
+        from django.core.signals import request_finished
+        from django.db.backends.signals import connection_created
+        from .db_stats import record_connection, record_request
+        
+        connection_created.connect(record_connection, dispatch_uid='db_stats_connection')
+        request_finished.connect(record_request, dispatch_uid='db_stats_request')
@@ -0,0 +1,80 @@
+"""
+HTTP conditional GET (ETag / Last-Modified) for read endpoints.
+
+A view decorated with @conditional_get describes the rows its response is
+built from as a list of table states: the row count and newest `updated_at`
+of a queryset, read with one aggregate query. The ETag hashes those states
+together with the requested URL and the session account, and Last-Modified
+is the newest of the timestamps. When the client's If-None-Match or
+If-Modified-Since still matches, Django's `condition` answers 304 before the
+view runs, so nothing is loaded or serialized.
+
+Prefer If-None-Match: deleting a row changes the ETag through the count but
+cannot move Last-Modified.
+
+While the database is failing (see MainBackend/stale_fallback.py) responses
+are served without validators.
+"""
+
+import hashlib
+
+from django.db import DatabaseError
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .stale_fallback import database_breaker
+
+
+def table_state(queryset, *fields):
+    """
+    (row count, newest value of `fields`) of a queryset, read in one query.
+    `fields` defaults to updated_at; related timestamps such as
+    'account__updated_at' fold joined rows into the same state.
+    """
+    fields = fields or ('updated_at',)
+    state = queryset.aggregate(
+        count=Count('pk', distinct=True),
+        **{f'newest_{i}': Max(field) for i, field in enumerate(fields)}
+    )
+    stamps = [state[f'newest_{i}'] for i in range(len(fields)) if state[f'newest_{i}'] is not None]
+    return state['count'], max(stamps) if stamps else None
+
+
+def conditional_get(get_states, last_modified=True):
+    """
+    Answer GET/HEAD requests with 304 Not Modified when the client's copy is
+    current. Apply it directly above @api_view.
+
+    Args:
+        get_states: Called with the view's arguments. Returns the list of
+                    states the response depends on, e.g. [table_state(...)],
+                    or None to serve the request without validators.
+        last_modified: Send Last-Modified. Turn it off when the states are
+                       not (count, timestamp) pairs, e.g. hold a max id.
+    """
+    def states(request, *args, **kwargs):
+        # condition() asks for the ETag and Last-Modified separately
+        if not hasattr(request, '_validator_states'):
+            request._validator_states = None
+            if database_breaker.is_closed:
+                try:
+                    request._validator_states = get_states(request, *args, **kwargs)
+                except DatabaseError:
+                    database_breaker.record_failure()
+        return request._validator_states
+
+    def etag(request, *args, **kwargs):
+        current = states(request, *args, **kwargs)
+        if current is None:
+            return None
+        key = repr([request.get_full_path(), request.session.get('account_id'), current])
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def newest(request, *args, **kwargs):
+        current = states(request, *args, **kwargs)
+        if not last_modified or current is None:
+            return None
+        stamps = [stamp for _, stamp in current if stamp is not None]
+        return max(stamps) if stamps else None
+
+    return condition(etag_func=etag, last_modified_func=newest)
@@ -0,0 +1,95 @@
+"""
+Read-replica routing.
+
+When settings.REPLICA_DATABASE names a configured alias, GET/HEAD requests to
+views marked with @replica_read run their queries against that replica. All
+other views and all writes use the primary (`default`).
+
+Replicas lag behind the primary, so a client that has just written is pinned
+to the primary for settings.REPLICA_PIN_SECONDS: a request that writes sets a
+short-lived cookie, and replica-safe views ignore the replica while it is
+present. Reads made after a write within the same request also go to the
+primary.
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# Cookie marking a client whose recent writes may not have replicated yet
+PIN_COOKIE_NAME = 'db_primary_pin'
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_use_replica = ContextVar('use_replica', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+
+def replica_read(view):
+    """Mark a view as read-only so its GET requests may be served by the replica"""
+    view.replica_safe = True
+    return view
+
+
+def get_replica_alias():
+    """The replica alias, or None when no replica is configured"""
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+class ReplicaRouter:
+    """Send reads to the replica while a replica-safe view is running"""
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _wrote.get():
+            return get_replica_alias() or 'default'
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Enable replica reads for replica-safe views and pin writers to the primary.
+
+    Must come after SessionMiddleware. The session is loaded before replica
+    reads are enabled, so logins and logouts take effect immediately.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replica_token = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get() and get_replica_alias():
+                response.set_cookie(
+                    PIN_COOKIE_NAME, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax'
+                )
+            return response
+        finally:
+            _use_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and getattr(view_func, 'replica_safe', False)
+            and PIN_COOKIE_NAME not in request.COOKIES
+            and get_replica_alias()
+        ):
+            request.session.get('account_id')
+            _use_replica.set(True)
+        return None
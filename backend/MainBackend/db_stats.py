@@ -0,0 +1,69 @@
+"""
+Per-worker database connection statistics.
+
+Every gunicorn worker is its own process with its own connections, so the
+numbers describe the worker that serves the stats request (see `pid`).
+`connections_created` counts Django connects: with persistent connections it
+stays far below `requests`, without them it grows one for one. `warmup`
+reports how long the worker's cache warm-up took (see MainBackend/warmup.py).
+"""
+
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .warmup import get_warmup_stats
+
+
+_lock = threading.Lock()
+_started_at = timezone.now()
+_requests = 0
+_connections_created = Counter()
+
+POOLED_ENGINE = 'MainBackend.pooled_postgresql'
+
+
+def record_connection(sender, connection, **kwargs):
+    """connection_created handler"""
+    with _lock:
+        _connections_created[connection.alias] += 1
+
+
+def record_request(sender, **kwargs):
+    """request_finished handler"""
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+def get_db_stats():
+    """Snapshot of this worker's connection settings, counters and pools"""
+    databases = {}
+    for alias, database in settings.DATABASES.items():
+        pooled = database['ENGINE'] == POOLED_ENGINE and bool(database.get('POOL'))
+        pool = None
+        if pooled:
+            # Imported here because the pooled backend needs psycopg2
+            from .pooled_postgresql.base import get_pool, describe_pool
+            if get_pool(alias) is not None:
+                pool = describe_pool(get_pool(alias))
+        databases[alias] = {
+            'vendor': connections[alias].vendor,
+            'conn_max_age': database.get('CONN_MAX_AGE', 0),
+            'health_checks': database.get('CONN_HEALTH_CHECKS', False),
+            'connections_created': _connections_created[alias],
+            'pooled': pooled,
+            'pool': pool,
+        }
+
+    return {
+        'pid': os.getpid(),
+        'started_at': _started_at.isoformat(),
+        'requests': _requests,
+        'warmup': get_warmup_stats(),
+        'databases': databases,
+    }
@@ -0,0 +1,68 @@
+"""
+Fixed-size latitude/longitude grid used as a spatial index.
+
+Every geocoded row stores the id of the grid cell its coordinates fall in
+(an indexed integer column), so finding what is near a point only reads the
+rows of the cells around it. GRID_CELL_DEGREES is about 5.5 km of latitude;
+changing it requires recomputing every stored cell.
+"""
+
+import math
+
+
+GRID_CELL_DEGREES = 0.05
+GRID_COLUMNS = round(360 / GRID_CELL_DEGREES)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def _row_col(latitude, longitude):
+    row = math.floor((float(latitude) + 90) / GRID_CELL_DEGREES)
+    col = math.floor((float(longitude) + 180) / GRID_CELL_DEGREES) % GRID_COLUMNS
+    return row, col
+
+
+def grid_cell(latitude, longitude):
+    """The grid cell id of a point, or None when a coordinate is missing"""
+    if latitude is None or longitude is None:
+        return None
+    row, col = _row_col(latitude, longitude)
+    return row * GRID_COLUMNS + col
+
+
+def ring_cells(latitude, longitude, inner, outer):
+    """
+    Ids of the cells whose distance in cells from the point's cell is
+    between `inner` and `outer` inclusive (0 is the point's own cell).
+    """
+    row, col = _row_col(latitude, longitude)
+    cells = []
+    for d_row in range(-outer, outer + 1):
+        for d_col in range(-outer, outer + 1):
+            if max(abs(d_row), abs(d_col)) < inner:
+                continue
+            cells.append((row + d_row) * GRID_COLUMNS + (col + d_col) % GRID_COLUMNS)
+    return cells
+
+
+def covered_km(latitude, rings):
+    """
+    Radius around a point that the cells up to `rings` away are sure to
+    cover: anything farther lies outside them.
+    """
+    cell_height = GRID_CELL_DEGREES * KM_PER_DEGREE
+    cell_width = cell_height * math.cos(math.radians(min(abs(float(latitude)), 89)))
+    return rings * min(cell_height, cell_width)
+
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle (haversine) distance between two points in kilometres"""
+    lat1, lng1, lat2, lng2 = map(
+        math.radians, map(float, (latitude, longitude, other_latitude, other_longitude))
+    )
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
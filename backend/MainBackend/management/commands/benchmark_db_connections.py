@@ -0,0 +1,88 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare p50/p99 request latency with a new database connection per "
+        "request against the configured persistent connections or pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/services/',
+            help='GET endpoint to request (default: /api/services/)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Measured requests per mode (default: 200)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Unmeasured requests before each mode (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connections['default'].settings_dict
+        configured = {
+            'CONN_MAX_AGE': settings_dict['CONN_MAX_AGE'],
+            'POOL': settings_dict.get('POOL'),
+        }
+
+        if configured['POOL']:
+            label = f"pooled (max {configured['POOL'].get('max_size', 10)})"
+        elif configured['CONN_MAX_AGE']:
+            label = f"persistent (max age {configured['CONN_MAX_AGE']}s)"
+        else:
+            label = 'configured (no persistence)'
+
+        modes = [
+            ('new connection per request', {'CONN_MAX_AGE': 0, 'POOL': None}),
+            (label, configured),
+        ]
+
+        self.stdout.write(f"{'mode':<36}{'p50 ms':>10}{'p99 ms':>10}{'connects':>10}")
+        try:
+            for name, overrides in modes:
+                connections['default'].close()
+                settings_dict.update(overrides)
+                p50, p99, connects = self.measure(options['path'], options['requests'], options['warmup'])
+                self.stdout.write(f"{name:<36}{p50:>10.2f}{p99:>10.2f}{connects:>10}")
+        finally:
+            connections['default'].close()
+            settings_dict.update(configured)
+
+    def measure(self, path, count, warmup):
+        """Time `count` GET requests, handling connections like a WSGI server does"""
+        client = Client()
+        connects = 0
+        timings = []
+
+        for i in range(warmup + count):
+            start = time.perf_counter()
+            # The test client skips the request_started/finished connection
+            # handling, so run it here around each request
+            close_old_connections()
+            was_connected = connections['default'].connection is not None
+            response = client.get(path)
+            reconnected = not was_connected and connections['default'].connection is not None
+            close_old_connections()
+            elapsed = (time.perf_counter() - start) * 1000
+
+            if response.status_code >= 500:
+                raise RuntimeError(f'{path} returned {response.status_code}')
+            if i >= warmup:
+                timings.append(elapsed)
+                connects += reconnected
+
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return percentiles[49], percentiles[98], connects
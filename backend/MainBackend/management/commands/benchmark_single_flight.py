@@ -0,0 +1,85 @@
+import threading
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire bursts of identical concurrent GET requests and compare the "
+        "database queries they run with and without request coalescing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/users/mechanics/',
+            help='GET endpoint to request (default: /api/users/mechanics/)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Simultaneous requests per burst (default: 50)'
+        )
+        parser.add_argument(
+            '--bursts',
+            type=int,
+            default=5,
+            help='Measured bursts per mode (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':<20}{'requests':>10}{'queries':>10}{'per request':>14}{'queries/s':>12}")
+        for name, enabled in (('independent', False), ('single flight', True)):
+            with override_settings(SINGLE_FLIGHT_ENABLED=enabled, SINGLE_FLIGHT_SHARED=False):
+                requests, queries, elapsed = self.measure(
+                    options['path'], options['concurrency'], options['bursts']
+                )
+            rate = queries / elapsed if elapsed else 0
+            self.stdout.write(
+                f"{name:<20}{requests:>10}{queries:>10}{queries / requests:>14.2f}{rate:>12.0f}"
+            )
+
+    def measure(self, path, concurrency, bursts):
+        """Run `bursts` bursts of `concurrency` threads, released together"""
+        counted = []
+        failures = []
+        counted_lock = threading.Lock()
+        elapsed = 0.0
+
+        def run(barrier):
+            queries = 0
+
+            def count(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count))
+                barrier.wait()
+                response = Client().get(path)
+            connections.close_all()
+            with counted_lock:
+                counted.append(queries)
+                if response.status_code >= 500:
+                    failures.append(response.status_code)
+
+        for _ in range(bursts):
+            barrier = threading.Barrier(concurrency)
+            threads = [threading.Thread(target=run, args=(barrier,)) for _ in range(concurrency)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed += time.perf_counter() - start
+            if failures:
+                raise CommandError(f'{path} returned {failures[0]}')
+
+        return len(counted), sum(counted), elapsed
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from MainBackend.warmup import warm_caches
+
+
+class Command(BaseCommand):
+    help = "Fill the catalog and mechanic menu caches, as workers do on boot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=None,
+            help='Stop warming up after this long (default: settings.WARMUP_MAX_SECONDS)'
+        )
+
+    def handle(self, *args, **options):
+        stats = warm_caches(options['max_seconds'])
+        self.stdout.write(
+            f"Warmed up in {stats['duration_seconds']:.3f}s "
+            f"(completed: {', '.join(stats['completed']) or 'none'}"
+            f"{'; failed: ' + ', '.join(stats['failed']) if stats['failed'] else ''}"
+            f"{'; skipped: ' + ', '.join(stats['skipped']) if stats['skipped'] else ''}"
+            f"{'; timed out' if stats['timed_out'] else ''})"
+        )
@@ -0,0 +1,36 @@
+"""
+Custom migration operations shared by the apps.
+
+Migrations using these operations must set `atomic = False`, because
+PostgreSQL cannot build an index concurrently inside a transaction.
+"""
+
+from django.db import migrations
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """
+    AddIndex that does not block writes while the index is built.
+
+    On PostgreSQL the index is created with CREATE INDEX CONCURRENTLY. MySQL
+    (InnoDB) already builds secondary indexes online, and SQLite has no
+    concurrent writers to protect, so both use the regular CREATE INDEX.
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if schema_editor.connection.vendor == 'postgresql':
+                schema_editor.add_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if schema_editor.connection.vendor == 'postgresql':
+                schema_editor.remove_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        return super().describe().replace('Create index', 'Create index online', 1)
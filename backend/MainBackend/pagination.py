@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Pages are selected with a WHERE on the (timestamp, id) sort key of the last
+row served instead of an OFFSET, so a deep page costs the same as the first
+one. Cursors are opaque to clients: a URL-safe base64 token of that sort key.
+
+Pagination is opt-in. Endpoints only paginate when the client sends `cursor`
+or `page_size`, so callers that do not know about it keep getting every row.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when the cursor or page size sent by a client cannot be used"""
+
+
+def wants_pagination(request):
+    """Whether the client asked for a page rather than the full listing"""
+    return 'cursor' in request.query_params or 'page_size' in request.query_params
+
+
+def get_page_params(request):
+    """
+    Read the cursor and page size from the query string.
+
+    The page size defaults to settings.CURSOR_PAGE_SIZE and is capped at
+    settings.CURSOR_MAX_PAGE_SIZE. Raises InvalidCursor for a malformed size.
+    """
+    page_size = request.query_params.get('page_size')
+    if page_size is None:
+        page_size = settings.CURSOR_PAGE_SIZE
+    elif not page_size.isdigit() or int(page_size) < 1:
+        raise InvalidCursor('page_size must be a positive integer')
+
+    return {
+        'cursor': request.query_params.get('cursor') or None,
+        'page_size': min(int(page_size), settings.CURSOR_MAX_PAGE_SIZE),
+    }
+
+
+def encode_cursor(timestamp, pk):
+    raw = json.dumps([timestamp.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (timestamp, id) sort key in a cursor, or raise InvalidCursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def keyset_page(queryset, cursor=None, page_size=None, field='created_at', descending=True):
+    """
+    Fetch one page of `queryset` ordered by (field, id).
+
+    Args:
+        queryset: Queryset to paginate; its ordering is replaced
+        cursor: Cursor returned with the previous page, or None for the first page
+        page_size: Rows per page, defaults to settings.CURSOR_PAGE_SIZE
+        field: Timestamp field used as the primary sort key
+        descending: Newest first when True, oldest first otherwise
+
+    Returns a (rows, next_cursor) tuple; next_cursor is None on the last page.
+    """
+    page_size = min(page_size or settings.CURSOR_PAGE_SIZE, settings.CURSOR_MAX_PAGE_SIZE)
+
+    if descending:
+        queryset = queryset.order_by(f'-{field}', '-id')
+    else:
+        queryset = queryset.order_by(field, 'id')
+
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        direction = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{direction}': timestamp}) |
+            Q(**{field: timestamp, f'id__{direction}': pk})
+        )
+
+    # Fetch one extra row to learn whether another page follows
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.id)
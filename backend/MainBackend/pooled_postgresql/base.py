@@ -0,0 +1,127 @@
+"""
+PostgreSQL backend that borrows connections from a per-process psycopg2 pool.
+
+Enabled with DB_POOL=True on the Supabase path. Django hands a connection back
+to the pool wherever it would otherwise close it (at the end of a request
+when CONN_MAX_AGE is 0, once the max age passes, or after a failed health
+check), so the threads of a gunicorn worker share at most POOL['max_size']
+server connections instead of each opening their own.
+
+Without a POOL entry in the database settings this behaves exactly like
+django.db.backends.postgresql.
+"""
+
+import threading
+
+import psycopg2.extras
+from psycopg2 import pool as psycopg2_pool
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class CountingConnectionPool(psycopg2_pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool that counts the server connections it opens"""
+    def __init__(self, *args, **kwargs):
+        self.connections_opened = 0
+        super().__init__(*args, **kwargs)
+
+    def _connect(self, key=None):
+        self.connections_opened += 1
+        return super()._connect(key)
+
+
+def get_pool(alias):
+    """The pool serving database `alias` in this process, or None"""
+    return _pools.get(alias)
+
+
+def describe_pool(pool):
+    """Snapshot of a pool's size and usage"""
+    return {
+        'min_size': pool.minconn,
+        'max_size': pool.maxconn,
+        'in_use': len(pool._used),
+        'idle': len(pool._pool),
+        'connections_opened': pool.connections_opened,
+    }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        if not self.settings_dict.get('POOL'):
+            return super().get_new_connection(conn_params)
+
+        # Same per-connection setup as the stock backend, see
+        # django.db.backends.postgresql.base.DatabaseWrapper.get_new_connection
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = IsolationLevel(
+                options.get('isolation_level', IsolationLevel.READ_COMMITTED)
+            )
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {options['isolation_level']} "
+                f"specified. Use one of the psycopg.IsolationLevel values."
+            )
+
+        connection = self._checkout(conn_params)
+        if 'isolation_level' in options:
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        pool = get_pool(self.alias)
+        if pool is None or self.connection is None or not self.settings_dict.get('POOL'):
+            return super()._close()
+
+        with self.wrap_database_errors:
+            discard = bool(self.connection.closed)
+            if not discard and not self.connection.autocommit:
+                try:
+                    self.connection.rollback()
+                except self.Database.Error:
+                    discard = True
+            pool.putconn(self.connection, close=discard)
+
+    def _checkout(self, conn_params):
+        """Take a connection from the pool, replacing dead ones when health checks are on"""
+        pool = self._get_or_create_pool(conn_params)
+        connection = pool.getconn()
+        if connection.closed or (
+            self.settings_dict['CONN_HEALTH_CHECKS'] and not _is_alive(connection)
+        ):
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+        return connection
+
+    def _get_or_create_pool(self, conn_params):
+        pool = get_pool(self.alias)
+        if pool is None:
+            with _pools_lock:
+                pool = get_pool(self.alias)
+                if pool is None:
+                    pool_settings = self.settings_dict['POOL']
+                    pool = CountingConnectionPool(
+                        pool_settings.get('min_size', 1),
+                        pool_settings.get('max_size', 10),
+                        **conn_params
+                    )
+                    _pools[self.alias] = pool
+        return pool
+
+
+def _is_alive(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+    except psycopg2.Error:
+        return False
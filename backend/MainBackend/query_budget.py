@@ -0,0 +1,194 @@
+"""
+Per-request query budgets and N+1 detection for development and tests.
+
+Views declare how many queries a request may run with @query_budget; views
+without a declaration get settings.QUERY_BUDGET_DEFAULT_MAX. Besides the
+total, a request fails its budget when one query shape (the SQL with its
+parameters and IN lists collapsed) runs more than `max_repeats` times, which
+is the signature of an N+1 loop.
+
+QueryBudgetMiddleware checks every request while settings.QUERY_BUDGET_ENABLED
+is on, and logs or raises (settings.QUERY_BUDGET_ACTION) on a violation. It
+checks once the view has returned, when a write has already committed, so
+POST, PUT, PATCH and DELETE violations are only logged and flagged with an
+X-Query-Budget header; raising would answer a successful write with a 500.
+QueryBudgetTestMixin asserts the budgets of every URL in a URLconf from the
+test suite.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver, resolve
+from django.urls.resolvers import RoutePattern
+
+from .db_router import SAFE_METHODS
+
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_ROUTE_PARAM = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request runs more queries than its view's budget allows"""
+
+
+class QueryBudget:
+    """Maximum queries per request, and repeats allowed for any one query shape"""
+    def __init__(self, max_queries=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+
+
+def query_budget(max_queries, max_repeats=None):
+    """
+    Declare the query budget of a view. Apply it above @api_view.
+
+    Args:
+        max_queries: Queries a request may run, session and account lookups included
+        max_repeats: Times one query shape may run, defaults to
+                     settings.QUERY_BUDGET_MAX_REPEATS
+    """
+    def decorator(view):
+        view.query_budget = QueryBudget(max_queries, max_repeats)
+        return view
+    return decorator
+
+
+def get_budget(view):
+    """The budget declared on `view`, with settings filling in what it leaves out"""
+    declared = getattr(view, 'query_budget', None) or QueryBudget()
+    return QueryBudget(
+        declared.max_queries if declared.max_queries is not None else settings.QUERY_BUDGET_DEFAULT_MAX,
+        declared.max_repeats if declared.max_repeats is not None else settings.QUERY_BUDGET_MAX_REPEATS,
+    )
+
+
+def query_shape(sql):
+    """The SQL of a query with IN lists collapsed, so N+1 loops share one shape"""
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+@contextmanager
+def record_queries():
+    """Collect the SQL of every query run on any database inside the block"""
+    queries = []
+
+    def recorder(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield queries
+
+
+class QueryReport:
+    """Queries a request ran, checked against a budget"""
+    def __init__(self, budget, queries):
+        self.budget = budget
+        self.count = len(queries)
+        self.repeated = {
+            shape: times for shape, times in Counter(map(query_shape, queries)).items()
+            if times > budget.max_repeats
+        }
+
+    @property
+    def problems(self):
+        problems = []
+        if self.count > self.budget.max_queries:
+            problems.append(f'{self.count} queries exceed the budget of {self.budget.max_queries}')
+        for shape, times in self.repeated.items():
+            problems.append(f'possible N+1, ran {times} times: {shape}')
+        return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries of each request and report views that exceed their
+    budget. Adds an X-Query-Count header to every checked response, and
+    X-Query-Budget: exceeded to those over budget.
+    """
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as queries:
+            response = self.get_response(request)
+
+        budget = getattr(request, '_query_budget', None)
+        if budget is None:
+            return response
+
+        report = QueryReport(budget, queries)
+        response['X-Query-Count'] = str(report.count)
+        if report.problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(report.problems)
+            # Writes have committed by now, so only reads fail
+            if settings.QUERY_BUDGET_ACTION == 'raise' and request.method in SAFE_METHODS:
+                raise QueryBudgetExceeded(message)
+            response['X-Query-Budget'] = 'exceeded'
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_budget(view_func)
+        return None
+
+
+def iter_routes(patterns=None, prefix=''):
+    """Yield (route, view) for every path() in a URLconf, following include()"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if not isinstance(pattern.pattern, RoutePattern):
+            continue
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern.callback
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin asserting that views stay within their query budgets"""
+    def assert_query_budget(self, path, method='get', **kwargs):
+        """Request `path` and fail if it breaks its view's budget"""
+        with record_queries() as queries:
+            response = getattr(self.client, method)(path, **kwargs)
+        self.assertLess(response.status_code, 500, f'{path}: {response.content[:300]}')
+
+        report = QueryReport(get_budget(resolve(path).func), queries)
+        self.assertFalse(report.problems, f'{method.upper()} {path}: {report.problems}')
+        return response
+
+    def assert_url_budgets(self, url_kwargs, skip_prefixes=('admin/',), method='get'):
+        """
+        Request every route of the project URLconf and assert its budget.
+
+        Args:
+            url_kwargs: Values for route parameters, e.g. {'booking_id': 3}
+            skip_prefixes: Routes starting with these are not requested
+            method: HTTP method used for every route
+        """
+        checked = 0
+        for route, view in iter_routes():
+            if route.startswith(skip_prefixes):
+                continue
+            missing = [name for name in _ROUTE_PARAM.findall(route) if name not in url_kwargs]
+            self.assertFalse(missing, f'No url_kwargs value for {missing} in {route}')
+
+            path = '/' + _ROUTE_PARAM.sub(lambda match: str(url_kwargs[match.group(1)]), route)
+            self.assert_query_budget(path, method)
+            checked += 1
+        return checked
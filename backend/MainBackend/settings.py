@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'services',
     'bookings',
     'notification',
+    'MainBackend',
 ]
 
 MIDDLEWARE = [
@@ -55,6 +56,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.SessionAccountMiddleware',
+    'MainBackend.db_router.ReplicaRoutingMiddleware',
+    'MainBackend.query_budget.QueryBudgetMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -109,6 +113,134 @@ else:
     }
 
 
+# Persistent connections: each worker thread keeps its connection for
+# DB_CONN_MAX_AGE seconds instead of reconnecting (TCP + TLS) per request,
+# and checks it is still alive before reusing it.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Optional driver-level pooling on the PostgreSQL path: threads of a worker
+# share at most DB_POOL_MAX_SIZE connections (see MainBackend/pooled_postgresql).
+# Keep DB_POOL_MAX_SIZE at or above gunicorn's --threads.
+if USE_SUPABASE and os.getenv('DB_POOL', 'False') == 'True':
+    DATABASES['default']['ENGINE'] = 'MainBackend.pooled_postgresql'
+    DATABASES['default']['POOL'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+    }
+    # Connections go back to the pool at the end of every request
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Optional read replica. When DB_REPLICA_HOST or DB_REPLICA_NAME is set,
+# views marked with @replica_read serve GET requests from this connection
+# (see MainBackend/db_router.py). Unset fields fall back to the primary's.
+# Run the test suite without DB_REPLICA_* set: a test mirror has its own
+# connection and cannot see rows written inside a TestCase.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['MainBackend.db_router.ReplicaRouter']
+
+# Seconds a client stays on the primary after writing, covering replication lag
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '5'))
+
+
+# Per-request query budgets (see MainBackend/query_budget.py), checked in
+# development. QUERY_BUDGET_ACTION is 'log' or 'raise'; writes over budget
+# are only logged, since they have committed by the time they are checked.
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET', str(DEBUG)) == 'True'
+QUERY_BUDGET_ACTION = os.getenv('QUERY_BUDGET_ACTION', 'log')
+QUERY_BUDGET_DEFAULT_MAX = int(os.getenv('QUERY_BUDGET_DEFAULT_MAX', '20'))
+QUERY_BUDGET_MAX_REPEATS = int(os.getenv('QUERY_BUDGET_MAX_REPEATS', '5'))
+
+
+# Cache shared by the workers. Set REDIS_URL (needs the redis package) in
+# production; the local-memory fallback is per process.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Whether every worker sees the same cache. Caches that must be invalidated
+# in all workers at once are only used when it is.
+CACHE_IS_SHARED = bool(os.getenv('REDIS_URL'))
+
+# Versioned response caches (see MainBackend/versioned_cache.py). Entries of
+# an old version are never read again and expire after CACHE_ENTRY_SECONDS.
+# They are only used with a shared cache, which every version bump reaches.
+CACHE_ENTRY_SECONDS = int(os.getenv('CACHE_ENTRY_SECONDS', '3600'))
+CACHE_REBUILD_LOCK_SECONDS = int(os.getenv('CACHE_REBUILD_LOCK_SECONDS', '10'))
+CACHE_REBUILD_WAIT_SECONDS = float(os.getenv('CACHE_REBUILD_WAIT_SECONDS', '2'))
+
+# Seconds a worker keeps its in-memory catalog snapshot (see
+# services/snapshot.py) before reloading it. Catalog changes reload it sooner
+# when the cache is shared.
+CATALOG_SNAPSHOT_MAX_SECONDS = int(os.getenv('CATALOG_SNAPSHOT_MAX_SECONDS', '60'))
+
+# Seconds the account record used to authenticate requests is cached
+# (see users/account_cache.py); changes through the models drop it at once.
+# Without a shared cache the record is read from the database every request,
+# since a per-process entry would survive a ban saved by another worker.
+ACCOUNT_RECORD_SECONDS = int(os.getenv('ACCOUNT_RECORD_SECONDS', '60'))
+
+# Identical concurrent GETs to @single_flight views share one computation
+# (see MainBackend/single_flight.py), across workers too when SHARED is on.
+# Within a worker this only happens with gunicorn's --threads above 1.
+# Waiters compute the response themselves after SINGLE_FLIGHT_WAIT_SECONDS.
+# In shared mode the result is cached for SINGLE_FLIGHT_RESULT_SECONDS, so
+# identical requests in that window reuse it even after the computation ended.
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT', 'True') == 'True'
+SINGLE_FLIGHT_SHARED = os.getenv('SINGLE_FLIGHT_SHARED', str(bool(os.getenv('REDIS_URL')))) == 'True'
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv('SINGLE_FLIGHT_WAIT_SECONDS', '5'))
+SINGLE_FLIGHT_RESULT_SECONDS = int(os.getenv('SINGLE_FLIGHT_RESULT_SECONDS', '1'))
+
+# Public reads keep serving their last good payload while the database fails
+# (see MainBackend/stale_fallback.py). The per-worker breaker opens after
+# DB_BREAKER_FAILURES consecutive failures and probes again after
+# DB_BREAKER_RESET_SECONDS.
+STALE_PAYLOAD_SECONDS = int(os.getenv('STALE_PAYLOAD_SECONDS', '86400'))
+STALE_PAYLOAD_REFRESH_SECONDS = int(os.getenv('STALE_PAYLOAD_REFRESH_SECONDS', '30'))
+DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES', '3'))
+DB_BREAKER_RESET_SECONDS = int(os.getenv('DB_BREAKER_RESET_SECONDS', '30'))
+
+# Nearest-mechanic search (see users/nearby.py): mechanics returned by
+# default and at most, and the farthest distance searched
+NEAREST_MECHANICS_DEFAULT_K = int(os.getenv('NEAREST_MECHANICS_DEFAULT_K', '10'))
+NEAREST_MECHANICS_MAX_K = int(os.getenv('NEAREST_MECHANICS_MAX_K', '50'))
+NEAREST_MECHANICS_MAX_KM = float(os.getenv('NEAREST_MECHANICS_MAX_KM', '50'))
+
+# Cache warm-up run by each gunicorn worker before it accepts traffic (see
+# MainBackend/warmup.py). Keep the cap below gunicorn's worker timeout (30s).
+WARMUP_ENABLED = os.getenv('WARMUP', 'True') == 'True'
+WARMUP_MAX_SECONDS = float(os.getenv('WARMUP_MAX_SECONDS', '15'))
+
+# Sessions are read from the cache and written through to the database when
+# the cache is shared (REDIS_URL). A per-process cache would keep serving a
+# session another worker changed or flushed, so it falls back to the database.
+SESSION_ENGINE = os.getenv(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if os.getenv('REDIS_URL')
+    else 'django.contrib.sessions.backends.db'
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -158,6 +290,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users.authentication.SessionAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -173,6 +306,10 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Keyset pagination for list endpoints (see MainBackend/pagination.py)
+CURSOR_PAGE_SIZE = int(os.getenv('CURSOR_PAGE_SIZE', '20'))
+CURSOR_MAX_PAGE_SIZE = int(os.getenv('CURSOR_MAX_PAGE_SIZE', '100'))
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,137 @@
+"""
+Request coalescing (single flight) for expensive public reads.
+
+When many clients ask for the same listing at once, every request would run
+the same queries and build the same response. A view decorated with
+@single_flight lets the first of a burst of identical GET requests compute
+the response while the others in the same worker wait for it and answer
+with a copy of its data, status and headers. Within a worker only
+concurrent threads can wait, so this needs gunicorn's --threads above 1
+(start.sh defaults to 4). Requests are identical when they hit the same view with the
+same query parameters, the same account (for views that vary on it) and the
+same database: clients pinned to the primary after a write never share a
+response read from the replica.
+
+With settings.SINGLE_FLIGHT_SHARED on (the default when REDIS_URL is set)
+the computation is also shared across workers through
+versioned_cache.get_or_build: one worker computes, the others poll the cache
+for its result. The result stays in the cache for
+settings.SINGLE_FLIGHT_RESULT_SECONDS after the computation ends, so in
+shared mode it is also a response cache of that length: identical requests
+arriving in that window get it without running the view.
+"""
+
+import functools
+import hashlib
+import threading
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from .db_router import PIN_COOKIE_NAME, SAFE_METHODS
+from .versioned_cache import get_or_build
+
+
+SINGLE_FLIGHT_NAMESPACE = 'single-flight'
+
+
+class _Flight:
+    """One computation in progress and the requests waiting on it"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def coalesce(key, compute):
+    """
+    The result of `compute()`, shared by every caller that asks for `key`
+    while it is running in this worker. Callers that wait longer than
+    settings.SINGLE_FLIGHT_WAIT_SECONDS compute the result themselves.
+    Errors are raised in every waiting caller.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if not flight.done.wait(settings.SINGLE_FLIGHT_WAIT_SECONDS):
+            return compute()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = compute()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def request_key(view, request, vary_on_account=False):
+    """Key identifying the requests that get the same response from `view`"""
+    params = sorted((name, sorted(values)) for name, values in request.GET.lists())
+    scope = [
+        'primary' if PIN_COOKIE_NAME in request.COOKIES else 'replica',
+        request.session.get('account_id') if vary_on_account else None,
+    ]
+    key = repr([view.__module__, view.__qualname__, params, scope])
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def single_flight(view=None, vary_on_account=False):
+    """
+    Coalesce identical concurrent GET requests to a view. Apply it directly
+    below @api_view, so each request still gets its own rendered response.
+
+    Args:
+        vary_on_account: The response depends on the session account, so
+                         only requests of the same account are coalesced.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not settings.SINGLE_FLIGHT_ENABLED or request.method not in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+
+            leader_response = None
+
+            def compute():
+                nonlocal leader_response
+                leader_response = view(request, *args, **kwargs)
+                # Content-Type is set again when each response is rendered
+                headers = {
+                    name: value for name, value in leader_response.items() if name != 'Content-Type'
+                }
+                return leader_response.data, leader_response.status_code, headers
+
+            def compute_shared():
+                if not settings.SINGLE_FLIGHT_SHARED:
+                    return compute()
+                return get_or_build(
+                    SINGLE_FLIGHT_NAMESPACE, key, compute, timeout=settings.SINGLE_FLIGHT_RESULT_SECONDS
+                )
+
+            key = request_key(view, request, vary_on_account)
+            data, status_code, headers = coalesce(key, compute_shared)
+            if leader_response is not None:
+                return leader_response
+            return Response(data, status=status_code, headers=headers)
+        return wrapped
+
+    if view is not None:
+        return decorator(view)
+    return decorator
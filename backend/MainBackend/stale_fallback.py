@@ -0,0 +1,187 @@
+"""
+Serving public reads through database trouble.
+
+A view decorated with @stale_fallback keeps the last good payload of each
+request (same view and query parameters, see single_flight.request_key) in
+the cache for settings.STALE_PAYLOAD_SECONDS, stored again at most every
+settings.STALE_PAYLOAD_REFRESH_SECONDS. When the view fails with a
+DatabaseError, or the database circuit breaker is open, that payload is
+served instead with `X-Stale: true` and an `Age` header. Fresh responses
+carry `X-Stale: false`. Without a stored payload the client gets a 503 with
+Retry-After.
+
+The decorator goes above @conditional_get and @api_view: loading the
+session and authenticating it read the database before the view body runs,
+so an outage there must fall back as well. Stale payloads are the same for
+every client, logged in or not.
+
+The breaker is per worker. It opens after settings.DB_BREAKER_FAILURES
+consecutive database failures, so requests stop waiting on a database that
+is down. After settings.DB_BREAKER_RESET_SECONDS it lets one request through
+as a probe. That request is answered from the stale payload while the view
+runs again in a background thread; success closes the breaker and refreshes
+the payload, failure keeps it open for another period.
+"""
+
+import functools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .db_router import SAFE_METHODS
+from .single_flight import request_key
+
+
+logger = logging.getLogger(__name__)
+
+STALE_HEADER = 'X-Stale'
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed, open, then one probe at a time"""
+    CLOSED = 'closed'
+    PROBE = 'probe'
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def is_closed(self):
+        return self._opened_at is None
+
+    def allow(self):
+        """
+        Whether a database attempt may be made: CLOSED while the breaker is
+        closed, PROBE for the one caller let through after the reset period
+        (it must report the outcome with record_success or record_failure),
+        and None while the breaker is open.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if self._probing or time.monotonic() - self._opened_at < settings.DB_BREAKER_RESET_SECONDS:
+                return None
+            self._probing = True
+            return self.PROBE
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info('Circuit breaker %s closed', self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= settings.DB_BREAKER_FAILURES:
+                if self._opened_at is None:
+                    logger.warning('Circuit breaker %s opened after %d failures', self.name, self._failures)
+                self._opened_at = time.monotonic()
+
+
+# Guards this worker's attempts to reach the database from public reads
+database_breaker = CircuitBreaker('database')
+
+
+def _payload_key(key):
+    return f'last-good:{key}'
+
+
+def _rendered(response):
+    """Helper function preparing a Response built outside @api_view to render as JSON"""
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = JSONRenderer.media_type
+    response.renderer_context = {}
+    return response
+
+
+def _stale_response(key):
+    """The last good payload of `key` marked as stale, or a 503 without one"""
+    stored = cache.get(_payload_key(key))
+    if stored is None:
+        return _rendered(Response({
+            'error': 'Service temporarily unavailable, please try again shortly'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={
+            'Retry-After': str(settings.DB_BREAKER_RESET_SECONDS)
+        }))
+    data, stored_at = stored
+    return _rendered(Response(data, status=status.HTTP_200_OK, headers={
+        STALE_HEADER: 'true',
+        'Age': str(max(0, int(time.time() - stored_at))),
+    }))
+
+
+def _fresh(view, request, args, kwargs, key):
+    """
+    Run the view, recording the outcome with the breaker and storing a
+    successful payload. Raises DatabaseError when the database failed.
+    """
+    try:
+        response = view(request, *args, **kwargs)
+    except DatabaseError:
+        database_breaker.record_failure()
+        raise
+    database_breaker.record_success()
+    # Store the payload at most every STALE_PAYLOAD_REFRESH_SECONDS per key
+    if response.status_code == status.HTTP_200_OK and cache.add(
+        f'{_payload_key(key)}:stored', 1, settings.STALE_PAYLOAD_REFRESH_SECONDS
+    ):
+        cache.set(_payload_key(key), (response.data, time.time()), settings.STALE_PAYLOAD_SECONDS)
+    response[STALE_HEADER] = 'false'
+    return response
+
+
+def _refresh_in_background(view, request, args, kwargs, key):
+    """Probe the database with the view in a thread, refreshing the stored payload"""
+    def refresh():
+        try:
+            _fresh(view, request, args, kwargs, key)
+        except DatabaseError:
+            logger.warning('Background refresh of %s failed', view.__qualname__)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def stale_fallback(view):
+    """
+    Serve the last good payload of a GET view while the database is failing.
+    Apply it above @conditional_get and @api_view. The view must let
+    DatabaseError propagate instead of turning it into an error response.
+    """
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+
+        key = request_key(view, request)
+        attempt = database_breaker.allow()
+        if attempt is None:
+            return _stale_response(key)
+
+        if attempt == CircuitBreaker.PROBE and cache.get(_payload_key(key)) is not None:
+            # Probe in the background and answer this request right away
+            _refresh_in_background(view, request, args, kwargs, key)
+            return _stale_response(key)
+
+        try:
+            return _fresh(view, request, args, kwargs, key)
+        except DatabaseError:
+            logger.warning('Serving %s stale after a database error', view.__qualname__, exc_info=True)
+            return _stale_response(key)
+    return wrapped
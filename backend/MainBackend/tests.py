@@ -0,0 +1,569 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from bookings.dashboard import get_dashboard_summary
+from bookings.models import Booking, ActiveBooking, CancelBooking, CompleteBooking, DashboardSummary
+from bookings.tests import create_requests
+from bookings.views.client_booking_views import BOOKING_STATUSES
+from services.catalog import get_mechanic_menu, get_services
+from services import snapshot
+from services.models import Service, ServiceAddOn, ServiceCategory, MechanicService
+from services.snapshot import get_catalog_snapshot
+from shops.models import Shop
+from users.models import Account, Mechanic, MechanicReview, ShopOwner
+from users.tests import create_account
+from .db_router import PIN_COOKIE_NAME
+from . import single_flight as single_flight_module
+from .single_flight import single_flight
+from . import warmup
+from .warmup import warm_caches
+from .stale_fallback import CircuitBreaker, database_breaker, stale_fallback
+from .query_budget import (
+    QueryBudgetExceeded, QueryBudgetMiddleware, QueryBudgetTestMixin, query_budget
+)
+
+
+class DbStatsTests(TestCase):
+    def login(self, account):
+        session = self.client.session
+        session['account_id'] = account.id
+        session.save()
+
+    def test_admins_see_worker_connection_stats(self):
+        self.login(create_account('boss', roles=('admin',)))
+        response = self.client.get(reverse('db-stats'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pid', response.data)
+        self.assertGreaterEqual(response.data['requests'], 0)
+        default = response.data['databases']['default']
+        self.assertEqual(
+            set(default),
+            {'vendor', 'conn_max_age', 'health_checks', 'connections_created', 'pooled', 'pool'}
+        )
+
+    def test_other_accounts_are_refused(self):
+        self.assertEqual(self.client.get(reverse('db-stats')).status_code, 403)
+        self.login(create_account('juan'))
+        self.assertEqual(self.client.get(reverse('db-stats')).status_code, 403)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class CacheWarmupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = Service.objects.create(name='Oil change', description='Full synthetic', price=1500)
+        self.mechanics = [create_account(f'mechanic{i}') for i in range(3)]
+        for account in self.mechanics:
+            mechanic = Mechanic.objects.create(account=account)
+            MechanicService.objects.create(mechanic=mechanic, service=self.service)
+
+    def test_warm_caches_serve_the_first_requests(self):
+        stats = warm_caches(max_seconds=30)
+
+        self.assertEqual(stats['completed'], ['connections', 'catalog_snapshot', 'catalog', 'mechanic_menus'])
+        self.assertFalse(stats['timed_out'])
+        self.assertGreaterEqual(stats['duration_seconds'], 0)
+        with self.assertNumQueries(0):
+            get_services()
+            for account in self.mechanics:
+                get_mechanic_menu(account.id)
+
+    def test_shared_cache_is_warmed_once_per_catalog_version(self):
+        warm_caches(max_seconds=30)
+        with self.assertNumQueries(0):
+            stats = warm_caches(max_seconds=30)
+        self.assertEqual(stats['skipped'], ['catalog', 'mechanic_menus'])
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_without_a_shared_cache_only_the_worker_is_warmed(self):
+        with mock.patch.object(snapshot, '_snapshot', None):
+            stats = warm_caches(max_seconds=30)
+            self.assertEqual(stats['completed'], ['connections', 'catalog_snapshot'])
+            self.assertEqual(stats['skipped'], ['catalog', 'mechanic_menus'])
+            with self.assertNumQueries(0):
+                get_catalog_snapshot()
+
+    def test_warm_up_stops_at_its_time_cap(self):
+        skipped = mock.Mock()
+        steps = [('slow', lambda deadline: time.sleep(0.2)), ('skipped', skipped)]
+        with mock.patch.object(warmup, 'WARMUP_STEPS', steps):
+            stats = warm_caches(max_seconds=0.1)
+        self.assertTrue(stats['timed_out'])
+        self.assertEqual(stats['completed'], ['slow'])
+        skipped.assert_not_called()
+
+    def test_failing_steps_are_skipped(self):
+        steps = [('broken', mock.Mock(side_effect=ValueError)), ('next', mock.Mock())]
+        with mock.patch.object(warmup, 'WARMUP_STEPS', steps):
+            stats = warm_caches(max_seconds=30)
+        self.assertEqual(stats['failed'], ['broken'])
+        self.assertEqual(stats['completed'], ['next'])
+
+    def test_duration_is_reported_by_db_stats(self):
+        warm_caches(max_seconds=30)
+        DbStatsTests.login(self, create_account('boss', roles=('admin',)))
+        response = self.client.get(reverse('db-stats'))
+        self.assertEqual(
+            response.data['warmup']['completed'], ['connections', 'catalog_snapshot', 'catalog', 'mechanic_menus']
+        )
+
+    def test_command_reports_the_duration(self):
+        out = StringIO()
+        call_command('warm_caches', stdout=out)
+        self.assertTrue(out.getvalue().startswith('Warmed up in '))
+
+
+class BenchmarkDbConnectionsTests(TestCase):
+    def test_reports_both_modes(self):
+        out = StringIO()
+        call_command('benchmark_db_connections', requests=5, warmup=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith('new connection per request'))
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ACTION='raise')
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account('juan')
+        category = ServiceCategory.objects.create(name='Maintenance')
+        self.service = Service.objects.create(
+            name='Oil change', description='Full synthetic', price=1500, category=category
+        )
+        self.add_ons = [
+            ServiceAddOn.objects.create(service=self.service, name=name, description=name, price=300)
+            for name in ('Filter', 'Flush')
+        ]
+
+        self.mechanics = []
+        for i in range(8):
+            mechanic = create_account(f'mechanic{i}', roles=('mechanic',)).mechanic
+            MechanicService.objects.create(mechanic=mechanic, service=self.service)
+            self.mechanics.append(mechanic)
+        for i in range(3):
+            owner = ShopOwner.objects.create(account=create_account(f'owner{i}', roles=('shop_owner',)))
+            Shop.objects.create(shop_owner=owner, shop_name=f'Shop {i}')
+
+        requests = create_requests(self.account.client, self.mechanics[0].account, self.service, self.add_ons, 30)
+        for i, req in enumerate(requests[:20]):
+            booking = Booking.objects.create(
+                request=req, status=BOOKING_STATUSES[i % len(BOOKING_STATUSES)], amount_fee=1500
+            )
+            if booking.status == 'active':
+                ActiveBooking.objects.create(booking=booking)
+            elif booking.status == 'cancelled':
+                CancelBooking.objects.create(booking=booking, cancelled_by=self.account, reason='Changed plans')
+            elif booking.status == 'completed':
+                CompleteBooking.objects.create(booking=booking, total_amount=1500)
+        self.booking = Booking.objects.first()
+
+        session = self.client.session
+        session['account_id'] = self.account.id
+        session.save()
+
+    def test_every_url_stays_within_budget(self):
+        checked = self.assert_url_budgets({
+            'mechanic_id': self.mechanics[0].account.id,
+            'service_id': self.service.id,
+            'booking_id': self.booking.id,
+        })
+        self.assertGreater(checked, 30)
+
+    def create_payloads(self):
+        """Payloads of the create endpoints, by URL name"""
+        location = {'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City'}
+        direct = {
+            'provider_id': self.mechanics[0].account.id,
+            'service_id': self.service.id,
+            'add_on_ids': [add_on.id for add_on in self.add_ons],
+            'service_location': location,
+        }
+        payloads = {
+            'create-custom-request': {
+                'provider_id': self.mechanics[0].account.id, 'description': 'Engine noise', 'service_location': location
+            },
+            'create-direct-request': direct,
+            'create-mechanic-direct-request': direct,
+            'create-emergency-request': {'description': 'Flat tire', 'service_location': location},
+            'register_mechanic': {'contact_number': '09171234567'},
+            'register': {
+                'firstname': 'Maria', 'lastname': 'Santos', 'email': 'maria@example.com', 'username': 'maria',
+                'password': 'Secret123', 'confirm_password': 'Secret123', 'role': 'client',
+                'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City',
+                'province': 'Davao del Sur', 'region': 'XI',
+            },
+        }
+        return payloads
+
+    def test_create_endpoints_stay_within_budget(self):
+        for account in Account.objects.filter(id__in=[self.account.id, self.mechanics[0].account_id]):
+            get_dashboard_summary(account)
+        get_catalog_snapshot()
+        for name, payload in self.create_payloads().items():
+            response = self.assert_query_budget(reverse(name), 'post', data=payload, content_type='application/json')
+            self.assertEqual(response.status_code, 201, f'{name}: {response.data}')
+
+    def test_create_endpoints_stay_within_budget_when_cold(self):
+        for name, payload in self.create_payloads().items():
+            # No dashboard summaries yet and a catalog snapshot to reload
+            DashboardSummary.objects.all().delete()
+            with mock.patch.object(snapshot, '_snapshot', None):
+                response = self.assert_query_budget(
+                    reverse(name), 'post', data=payload, content_type='application/json'
+                )
+            self.assertEqual(response.status_code, 201, f'{name}: {response.data}')
+
+    def test_middleware_reports_n_plus_one(self):
+        @query_budget(10, max_repeats=2)
+        def loop(request):
+            for mechanic in Mechanic.objects.all()[:4]:
+                mechanic.account.username
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        middleware = QueryBudgetMiddleware(lambda request: loop(request))
+        middleware.process_view(request, loop, (), {})
+        with override_settings(QUERY_BUDGET_ACTION='raise'):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'possible N+1, ran 4 times'):
+                middleware(request)
+
+    def test_middleware_only_logs_writes_over_budget(self):
+        @query_budget(1)
+        def create(request):
+            ServiceCategory.objects.create(name='Repairs')
+            ServiceCategory.objects.create(name='Detailing')
+            return HttpResponse(status=201)
+
+        request = RequestFactory().post('/')
+        middleware = QueryBudgetMiddleware(lambda request: create(request))
+        middleware.process_view(request, create, (), {})
+        with override_settings(QUERY_BUDGET_ACTION='raise'):
+            with self.assertLogs('MainBackend.query_budget', 'WARNING'):
+                response = middleware(request)
+        # The write went through, so the client is told it did
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['X-Query-Budget'], 'exceeded')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account('juan')
+        mechanic_account = create_account('pedro', roles=('mechanic',))
+        self.service = Service.objects.create(name='Oil change', description='Full synthetic', price=1500)
+        self.add_on = ServiceAddOn.objects.create(service=self.service, name='Filter', description='', price=300)
+        self.mechanic = mechanic_account.mechanic
+        MechanicService.objects.create(mechanic=self.mechanic, service=self.service)
+        owner = ShopOwner.objects.create(account=create_account('owner', roles=('shop_owner',)))
+        Shop.objects.create(shop_owner=owner, shop_name='Shop')
+        request, = create_requests(self.account.client, mechanic_account, self.service, [], 1)
+        self.booking = Booking.objects.create(request=request, amount_fee=1500)
+        ActiveBooking.objects.create(booking=self.booking)
+
+        session = self.client.session
+        session['account_id'] = self.account.id
+        session.save()
+
+        self.urls = [
+            reverse('list_services'),
+            reverse('list_shops'),
+            reverse('list_mechanics'),
+            reverse('get-mechanic-services', args=[mechanic_account.id]) + '?include=addons',
+            reverse('get-booking-detail', args=[self.booking.id]),
+            reverse('get_profile_details'),
+        ]
+
+    def revalidate(self, url):
+        """GET `url`, then repeat the request with its ETag"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertIn('ETag', response, url)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_responses_are_not_rebuilt(self):
+        for url in self.urls:
+            with mock.patch.object(APIView, 'dispatch', autospec=True, side_effect=APIView.dispatch) as dispatch:
+                response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'', url)
+            # Only the first request reached the view and its serialization
+            self.assertEqual(dispatch.call_count, 1, url)
+
+    def test_changes_invalidate_the_etag(self):
+        changes = {
+            self.urls[0]: lambda: self.service.save(),
+            self.urls[2]: lambda: MechanicReview.objects.create(
+                reviewer=self.account, mechanic=self.mechanic, rating=4
+            ),
+            self.urls[3]: lambda: self.add_on.save(),
+            self.urls[4]: lambda: self.booking.activebooking.save(),
+            self.urls[5]: lambda: self.account.save(),
+        }
+        for url, change in changes.items():
+            etag = self.client.get(url)['ETag']
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_last_modified_is_honoured(self):
+        response = self.client.get(reverse('list_shops'))
+        response = self.client.get(
+            reverse('list_shops'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_validators_follow_the_session(self):
+        etag = self.client.get(self.urls[5])['ETag']
+        session = self.client.session
+        session['account_id'] = create_account('maria').id
+        session.save()
+        self.assertEqual(self.client.get(self.urls[5], HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+
+@override_settings(SINGLE_FLIGHT_ENABLED=True, SINGLE_FLIGHT_SHARED=False, SINGLE_FLIGHT_WAIT_SECONDS=5)
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+        @api_view(['GET'])
+        @single_flight
+        @permission_classes([AllowAny])
+        def slow_view(request):
+            self.calls.append(request.GET.get('page'))
+            self.started.set()
+            self.release.wait(5)
+            return Response({'page': request.GET.get('page')}, headers={'Cache-Control': 'max-age=60'})
+        self.view = slow_view
+        self.responses = []
+
+    def get(self, results, path='/listing/?page=1', cookies=None):
+        request = RequestFactory().get(path)
+        request.session = {}
+        request.COOKIES.update(cookies or {})
+        response = self.view(request)
+        self.responses.append(response)
+        results.append(response.render().data)
+
+    def burst(self, followers):
+        """Hold one request in the view while `followers` (get() kwargs) arrive"""
+        results = []
+        arrived = []
+        request_key = single_flight_module.request_key
+
+        def counting_request_key(*args, **kwargs):
+            arrived.append(1)
+            return request_key(*args, **kwargs)
+
+        with mock.patch.object(single_flight_module, 'request_key', counting_request_key):
+            leader = threading.Thread(target=self.get, args=(results,))
+            leader.start()
+            self.started.wait(5)
+            threads = [threading.Thread(target=self.get, args=(results,), kwargs=kwargs) for kwargs in followers]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while len(arrived) <= len(followers) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            self.release.set()
+            for thread in [leader] + threads:
+                thread.join(10)
+        return results
+
+    def test_identical_requests_share_one_computation(self):
+        results = self.burst([{}] * 20)
+        self.assertEqual(results, [{'page': '1'}] * 21)
+        self.assertEqual(self.calls, ['1'])
+        for response in self.responses:
+            self.assertEqual(response['Cache-Control'], 'max-age=60')
+            self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_different_params_and_pinned_clients_are_not_coalesced(self):
+        results = self.burst([{'path': '/listing/?page=2'}, {'cookies': {PIN_COOKIE_NAME: '1'}}])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(sorted(self.calls), ['1', '1', '2'])
+
+    def test_errors_reach_every_waiter(self):
+        @single_flight
+        def failing_view(request):
+            raise ValueError('database unavailable')
+
+        request = RequestFactory().get('/listing/')
+        request.session = {}
+        with self.assertRaises(ValueError):
+            failing_view(request)
+
+    def test_shared_results_are_reused_across_workers(self):
+        self.release.set()
+        with override_settings(SINGLE_FLIGHT_SHARED=True, CACHE_IS_SHARED=True):
+            first, second = [], []
+            self.get(first)
+            self.get(second)
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ['1'])
+        self.assertEqual(self.responses[1]['Cache-Control'], 'max-age=60')
+
+
+class SingleFlightLoadTests(TransactionTestCase):
+    def test_bursts_run_fewer_queries_with_single_flight(self):
+        for i in range(20):
+            Mechanic.objects.create(account=create_account(f'mechanic{i}'))
+        out = StringIO()
+        call_command('benchmark_single_flight', concurrency=8, bursts=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        independent, coalesced = (int(line.split()[-3]) for line in lines[1:])
+        self.assertLessEqual(coalesced, independent)
+
+
+@override_settings(DB_BREAKER_FAILURES=2, DB_BREAKER_RESET_SECONDS=30)
+class StaleFallbackTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        database_breaker.record_success()
+        self.addCleanup(database_breaker.record_success)
+        Mechanic.objects.create(account=create_account('mechanic'))
+        self.url = reverse('list_mechanics')
+
+    def database_down(self):
+        return mock.patch.object(
+            Mechanic.objects, 'select_related', side_effect=OperationalError('connection refused')
+        )
+
+    def test_last_good_payload_is_served_on_database_errors(self):
+        fresh = self.client.get(self.url)
+        self.assertEqual(fresh['X-Stale'], 'false')
+
+        with self.database_down():
+            stale = self.client.get(self.url)
+
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale['X-Stale'], 'true')
+        self.assertIn('Age', stale)
+        self.assertEqual(stale.data, fresh.data)
+
+    def test_without_a_payload_clients_get_503(self):
+        with self.database_down():
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_open_breaker_skips_the_database(self):
+        self.client.get(self.url)
+        with self.database_down() as select_related:
+            self.client.get(self.url)
+            self.client.get(self.url)
+            self.assertFalse(database_breaker.is_closed)
+
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url)
+        self.assertEqual(response['X-Stale'], 'true')
+        self.assertEqual(select_related.call_count, 2)
+
+    def test_logged_in_clients_get_stale_listings_when_the_database_is_down(self):
+        session = self.client.session
+        session['account_id'] = create_account('client').id
+        session.save()
+        urls = [reverse('list_mechanics'), reverse('list_services'), reverse('list_shops')]
+        fresh = [self.client.get(url) for url in urls]
+
+        def refuse(execute, sql, params, many, context):
+            raise OperationalError('connection refused')
+
+        # Loading the session and its account fail before the view body runs
+        with connection.execute_wrapper(refuse):
+            stale = [self.client.get(url) for url in urls]
+
+        for fresh_response, stale_response in zip(fresh, stale):
+            self.assertEqual(stale_response.status_code, 200)
+            self.assertEqual(stale_response['X-Stale'], 'true')
+            self.assertEqual(stale_response.json(), fresh_response.json())
+
+    def test_other_errors_keep_their_handling(self):
+        with mock.patch.object(Mechanic.objects, 'select_related', side_effect=ValueError('bad')):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(database_breaker.is_closed)
+
+
+class CircuitBreakerProbeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        database_breaker.record_success()
+        self.addCleanup(database_breaker.record_success)
+        self.refreshed = threading.Event()
+        self.payload = {'mechanics': ['fresh']}
+
+        @stale_fallback
+        @api_view(['GET'])
+        @permission_classes([AllowAny])
+        def view(request):
+            if self.payload is None:
+                raise OperationalError('connection refused')
+            self.refreshed.set()
+            return Response(self.payload)
+        self.view = view
+
+    def get(self):
+        request = RequestFactory().get('/listing/')
+        request.session = {}
+        return self.view(request).render()
+
+    @override_settings(DB_BREAKER_FAILURES=1, DB_BREAKER_RESET_SECONDS=0)
+    def test_probe_without_a_payload_runs_in_the_request(self):
+        self.payload = None
+        self.assertEqual(self.get().status_code, 503)
+        self.assertFalse(database_breaker.is_closed)
+
+        self.payload = {'mechanics': ['recovered']}
+        probe = self.get()
+        self.assertEqual(probe['X-Stale'], 'false')
+        self.assertEqual(probe.data, self.payload)
+        self.assertTrue(database_breaker.is_closed)
+
+    @override_settings(DB_BREAKER_FAILURES=1, DB_BREAKER_RESET_SECONDS=0)
+    def test_background_probe_closes_the_breaker(self):
+        self.get()
+        self.payload = None
+        self.get()
+        self.refreshed.clear()
+
+        self.payload = {'mechanics': ['recovered']}
+        probe = self.get()
+        self.assertEqual(probe['X-Stale'], 'true')
+        self.assertTrue(self.refreshed.wait(5))
+        deadline = time.monotonic() + 5
+        while not database_breaker.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(database_breaker.is_closed)
+
+    @override_settings(DB_BREAKER_RESET_SECONDS=30)
+    def test_only_one_probe_at_a_time(self):
+        breaker = CircuitBreaker('test')
+        with override_settings(DB_BREAKER_FAILURES=1):
+            breaker.record_failure()
+        self.assertIsNone(breaker.allow())
+        with override_settings(DB_BREAKER_RESET_SECONDS=0):
+            self.assertEqual(breaker.allow(), CircuitBreaker.PROBE)
+            self.assertIsNone(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.allow(), CircuitBreaker.CLOSED)
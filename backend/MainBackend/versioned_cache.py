@@ -0,0 +1,97 @@
+"""
+Versioned caching of built responses, protected against stampedes.
+
+A namespace (e.g. the service catalog) has one version counter in the cache.
+Entries are stored under keys that include the current version, so bumping
+the version invalidates every entry of the namespace at once; the old entries
+are simply never read again and expire on their own.
+
+When an entry is missing, only the worker that wins a short cache lock
+rebuilds it. The others wait up to settings.CACHE_REBUILD_WAIT_SECONDS for
+the rebuilt entry and only build it themselves if it does not show up.
+
+A version bump must reach every worker, so entries are only cached when the
+cache is shared (settings.CACHE_IS_SHARED). With the per-process fallback
+get_or_build calls build() every time.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+_POLL_SECONDS = 0.05
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_version(namespace):
+    """The current version of `namespace`, starting one if there is none"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, so a counter lost from the cache never
+        # restarts at a version whose entries may still be stored
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every entry of `namespace`"""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def bump_version_on_commit(namespace):
+    """
+    Invalidate `namespace` once the current transaction commits, so no worker
+    rebuilds an entry from data that is about to change.
+    """
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+def get_or_build(namespace, name, build, timeout=None):
+    """
+    The cached value of `name` in the current version of `namespace`,
+    built with `build()` and stored when missing.
+
+    Args:
+        namespace: Version namespace the entry belongs to
+        name: Entry name, unique within the namespace
+        build: Callable returning the value; it must not return None
+        timeout: Seconds the entry is kept, defaults to settings.CACHE_ENTRY_SECONDS
+    """
+    if not settings.CACHE_IS_SHARED:
+        # A bump in one worker would never reach the entries of the others
+        return build()
+
+    key = f'{namespace}:{get_version(namespace)}:{name}'
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.CACHE_REBUILD_LOCK_SECONDS):
+        try:
+            value = build()
+            cache.set(key, value, timeout or settings.CACHE_ENTRY_SECONDS)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    # Another worker is rebuilding this entry
+    deadline = time.monotonic() + settings.CACHE_REBUILD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(_POLL_SECONDS)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
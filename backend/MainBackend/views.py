@@ -0,0 +1,20 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from users.permissions import IsAdmin
+from .db_stats import get_db_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def db_stats(request):
+    """
+    Internal: database connection statistics of the worker serving this request.
+    
+    Returns the worker pid, requests served, the duration and outcome of its
+    cache warm-up, and per database alias the persistent connection
+    settings, connections created and, when pooling is enabled, the pool
+    size and usage. Admins only.
+    """
+    return Response(get_db_stats(), status=status.HTTP_200_OK)
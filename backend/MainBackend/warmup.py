@@ -0,0 +1,166 @@
+"""
+Cache warm-up run by each worker before it accepts traffic.
+
+After a deploy every worker starts with an empty local-memory cache (and a
+shared cache that may be cold too), so the first requests would all rebuild
+the catalog and mechanic menus from the database. gunicorn.conf.py calls
+warm_caches from its post_worker_init hook, which runs before the worker
+starts accepting connections; `manage.py warm_caches` runs it by hand.
+
+The catalog and mechanic menus live in the shared cache: get_or_build stores
+nothing without one (settings.CACHE_IS_SHARED), so those steps are skipped
+then, and with one only the first worker to start for a catalog version
+fills them for everybody. Connections and the catalog snapshot belong to the
+worker and are always warmed.
+
+Steps run in order until settings.WARMUP_MAX_SECONDS is used up; whatever
+is left is built on demand as usual. The duration and outcome of the last
+warm-up of the worker are logged and reported by get_warmup_stats (see the
+db-stats endpoint).
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, When
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_last_warmup = None
+
+
+def _warm_connections(deadline):
+    """Open this worker's database connections"""
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+
+
+def _warm_catalog_snapshot(deadline):
+    """This worker's catalog snapshot"""
+    from services.snapshot import get_catalog_snapshot
+
+    get_catalog_snapshot()
+
+
+def _warm_catalog(deadline):
+    """Service catalog and categories"""
+    from services.catalog import get_services, get_service_categories
+
+    get_services()
+    get_service_categories()
+
+
+def _warm_mechanic_menus(deadline):
+    """Menus of the mechanics shown by discovery, available mechanics first"""
+    from services.catalog import CATALOG_DATABASE, get_mechanic_menu
+    from users.models import Mechanic
+
+    available_first = Case(When(status=Mechanic.Status.AVAILABLE, then=0), default=1)
+    account_ids = Mechanic.objects.using(CATALOG_DATABASE).order_by(
+        available_first, 'id'
+    ).values_list('account_id', flat=True)
+
+    for account_id in account_ids:
+        if time.monotonic() >= deadline:
+            raise TimeoutError('mechanic menus')
+        try:
+            get_mechanic_menu(account_id)
+        except Mechanic.DoesNotExist:
+            # Deleted while warming up
+            continue
+
+
+WARMUP_STEPS = [
+    ('connections', _warm_connections),
+    ('catalog_snapshot', _warm_catalog_snapshot),
+    ('catalog', _warm_catalog),
+    ('mechanic_menus', _warm_mechanic_menus),
+]
+
+# Steps filling the shared cache rather than this worker
+SHARED_STEPS = {'catalog', 'mechanic_menus'}
+
+
+def _claims_shared_steps():
+    """
+    Helper function deciding whether this worker runs SHARED_STEPS: never
+    without a shared cache, and only for the first worker to ask per
+    catalog version with one.
+    """
+    if not settings.CACHE_IS_SHARED:
+        return False
+    from services.catalog import CATALOG_NAMESPACE
+    from .versioned_cache import get_version
+
+    try:
+        # Entries outlive the claim by no more than CACHE_ENTRY_SECONDS
+        return cache.add(f'warmup:{get_version(CATALOG_NAMESPACE)}', 1, settings.CACHE_ENTRY_SECONDS)
+    except Exception:
+        logger.exception('Could not claim the shared cache warm-up')
+        return False
+
+
+def warm_caches(max_seconds=None):
+    """
+    Run the warm-up steps, stopping once `max_seconds` (defaults to
+    settings.WARMUP_MAX_SECONDS) have passed. A failing step is logged and
+    skipped, so warm-up never keeps a worker from starting.
+
+    Returns the stats also reported by get_warmup_stats.
+    """
+    global _last_warmup
+    if max_seconds is None:
+        max_seconds = settings.WARMUP_MAX_SECONDS
+    start = time.monotonic()
+    deadline = start + max_seconds
+    completed = []
+    failed = []
+    skipped = []
+    timed_out = False
+    run_shared = _claims_shared_steps()
+
+    for name, step in WARMUP_STEPS:
+        if name in SHARED_STEPS and not run_shared:
+            skipped.append(name)
+            continue
+        if time.monotonic() >= deadline:
+            timed_out = True
+            break
+        try:
+            step(deadline)
+        except TimeoutError:
+            timed_out = True
+            break
+        except Exception:
+            logger.exception('Cache warm-up step %s failed', name)
+            failed.append(name)
+        else:
+            completed.append(name)
+
+    stats = {
+        'duration_seconds': round(time.monotonic() - start, 3),
+        'max_seconds': max_seconds,
+        'timed_out': timed_out,
+        'completed': completed,
+        'failed': failed,
+        'skipped': skipped,
+    }
+    with _lock:
+        _last_warmup = stats
+    logger.info(
+        'Cache warm-up took %.3fs (completed: %s, skipped: %s, timed out: %s)',
+        stats['duration_seconds'], ', '.join(completed) or 'none', ', '.join(skipped) or 'none', timed_out
+    )
+    return stats
+
+
+def get_warmup_stats():
+    """Stats of this worker's last warm-up, or None if it has not warmed up"""
+    with _lock:
+        return _last_warmup
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class BookingsConfig(AppConfig):
     name = 'bookings'
+    
+    def ready(self):
+        """
+        Import signal handlers when Django starts.
+        This ensures signals are registered and active.
+        """
+        import bookings.signals  # noqa: F401
@@ -0,0 +1,78 @@
+"""
+Mechanic catalog used by the direct request flow.
+
+Fetches mechanics, their accounts and the services they offer in two queries,
+regardless of how many mechanics match or how deep the requested page is.
+"""
+
+from django.db.models import Prefetch
+
+from users.models import Mechanic
+from services.models import MechanicService
+from MainBackend.pagination import keyset_page
+
+
+def build_mechanic_catalog(service_id=None, status=None, shop_id=None, paginate=False, cursor=None, page_size=None):
+    """
+    Build the mechanic catalog, optionally filtered and paginated.
+
+    Args:
+        service_id: Only include mechanics offering this service
+        status: Only include mechanics with this Mechanic.Status value
+        shop_id: Only include mechanics working for this shop
+        paginate: Return one keyset page, oldest mechanics first
+        cursor: Cursor of the previous page (see MainBackend.pagination)
+        page_size: Mechanics per page
+
+    Returns a dict with the serialized mechanics, their count and, when
+    paginated, the next_cursor.
+    """
+    mechanics = Mechanic.objects.select_related('account').prefetch_related(
+        Prefetch(
+            'mechanicservice_set',
+            queryset=MechanicService.objects.select_related('service'),
+            to_attr='catalog_services'
+        )
+    )
+
+    if service_id is not None:
+        mechanics = mechanics.filter(
+            id__in=MechanicService.objects.filter(service_id=service_id).values('mechanic_id')
+        )
+    if status is not None:
+        mechanics = mechanics.filter(status=status)
+    if shop_id is not None:
+        mechanics = mechanics.filter(shop_id=shop_id)
+
+    if not paginate:
+        mechanics_data = [_serialize_mechanic(mechanic) for mechanic in mechanics.order_by('id')]
+        return {
+            'mechanics': mechanics_data,
+            'count': len(mechanics_data)
+        }
+
+    mechanics, next_cursor = keyset_page(mechanics, cursor, page_size, descending=False)
+    mechanics_data = [_serialize_mechanic(mechanic) for mechanic in mechanics]
+    return {
+        'mechanics': mechanics_data,
+        'count': len(mechanics_data),
+        'next_cursor': next_cursor
+    }
+
+
+def _serialize_mechanic(mechanic):
+    """Helper function to serialize a mechanic with the services they offer"""
+    account = mechanic.account
+    return {
+        'id': account.id,
+        'name': f"{account.firstname} {account.lastname}",
+        'full_name': f"{account.lastname}, {account.firstname} {account.middlename or ''}".strip(),
+        'services': [
+            {
+                'id': ms.service.id,
+                'name': ms.service.name,
+                'price': float(ms.service.price)
+            }
+            for ms in mechanic.catalog_services
+        ]
+    }
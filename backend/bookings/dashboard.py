@@ -0,0 +1,219 @@
+"""
+Materialized home page summaries.
+
+Each account with a client, mechanic or shop owner profile gets one
+DashboardSummary row holding its current booking and pending request counts
+plus the ids of the newest DASHBOARD_SIZE of each, so home_page reads one
+row by account and only hydrates a bounded id list.
+
+A summary is built by get_dashboard_summary the first time its account's
+home page is read. bookings.signals then keeps it current: when a request,
+its custom/direct/emergency row or its booking is saved, apply_request_change
+compares the request's state before and after the save: counts move by one,
+a new request or booking is put at the head of its id list, and a list is
+only read again when an older row joins or a listed one leaves it. Accounts
+without a summary are skipped, so writes never pay for a full build.
+Deletions, which are rare, rebuild the summaries in full.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Booking, Request, DashboardSummary
+from users.models import Account
+
+
+# Bookings and pending requests listed on the home page
+DASHBOARD_SIZE = 20
+
+# Booking statuses shown as current bookings
+CURRENT_BOOKING_STATUSES = [Booking.Status.ACTIVE, Booking.Status.REWORKED]
+
+# Request statuses shown as pending to clients and to providers
+CLIENT_PENDING_STATUSES = [Request.Status.PENDING, Request.Status.QUOTED]
+PROVIDER_PENDING_STATUSES = [Request.Status.PENDING]
+
+
+def dashboard_role(account):
+    """
+    The role whose dashboard an account sees: client first, then mechanic,
+    then shop owner. None when the account has none of these profiles.
+    """
+    if hasattr(account, 'client'):
+        return DashboardSummary.Role.CLIENT
+    if hasattr(account, 'mechanic'):
+        return DashboardSummary.Role.MECHANIC
+    if hasattr(account, 'shopowner'):
+        return DashboardSummary.Role.SHOP_OWNER
+    return None
+
+
+def dashboard_querysets(account, role):
+    """Current bookings and pending requests of `account` as `role`, newest first"""
+    if role == DashboardSummary.Role.CLIENT:
+        bookings = Booking.objects.filter(request__client__account=account)
+        requests = Request.objects.filter(client__account=account, request_status__in=CLIENT_PENDING_STATUSES)
+    else:
+        bookings = Booking.objects.filter(request__provider=account)
+        requests = Request.objects.filter(provider=account, request_status__in=PROVIDER_PENDING_STATUSES)
+
+    bookings = bookings.filter(status__in=CURRENT_BOOKING_STATUSES).order_by('-booked_at', '-id')
+    requests = requests.order_by('-created_at', '-id')
+    return bookings, requests
+
+
+def refresh_dashboard(account):
+    """
+    Rebuild the summary of one account from its bookings and requests.
+    Deletes the summary of an account that no longer has a dashboard role.
+    """
+    role = dashboard_role(account)
+    if role is None:
+        DashboardSummary.objects.filter(account=account).delete()
+        return None
+
+    bookings, requests = dashboard_querysets(account, role)
+    summary, _ = DashboardSummary.objects.update_or_create(
+        account=account,
+        defaults={
+            'role': role,
+            'current_booking_count': bookings.count(),
+            'pending_request_count': requests.count(),
+            'current_booking_ids': list(bookings.values_list('id', flat=True)[:DASHBOARD_SIZE]),
+            'pending_request_ids': list(requests.values_list('id', flat=True)[:DASHBOARD_SIZE]),
+        }
+    )
+    return summary
+
+
+def refresh_dashboards(account_ids):
+    """Refresh the summaries of several accounts, ignoring missing ids"""
+    accounts = Account.objects.filter(
+        id__in={account_id for account_id in account_ids if account_id}
+    ).select_related('client', 'mechanic', 'shopowner')
+    for account in accounts:
+        refresh_dashboard(account)
+
+
+def refresh_request_dashboards(request_id):
+    """Refresh the summaries of the client and provider of a request"""
+    for client_account_id, provider_id in Request.objects.filter(id=request_id).values_list(
+        'client__account_id', 'provider_id'
+    ):
+        refresh_dashboards([client_account_id, provider_id])
+
+
+def request_state(request_id):
+    """
+    What decides which dashboards list a request: its client's account id,
+    provider id, status, booking id and booking status. None when the
+    request does not exist.
+    """
+    return Request.objects.filter(id=request_id).values_list(
+        'client__account_id', 'provider_id', 'request_status', 'booking__id', 'booking__status'
+    ).first()
+
+
+def dashboard_entries(summary, state):
+    """
+    Whether the request of `state` puts its booking among the current
+    bookings of `summary`, and itself among its pending requests.
+    """
+    if state is None:
+        return False, False
+    client_account_id, provider_id, request_status, _, booking_status = state
+    if summary.role == DashboardSummary.Role.CLIENT:
+        involved = summary.account_id == client_account_id
+        pending_statuses = CLIENT_PENDING_STATUSES
+    else:
+        involved = summary.account_id == provider_id
+        pending_statuses = PROVIDER_PENDING_STATUSES
+    return (
+        involved and booking_status in CURRENT_BOOKING_STATUSES,
+        involved and request_status in pending_statuses,
+    )
+
+
+def _counted(field, joined):
+    """The count in `field` moved by one, never below zero"""
+    if joined:
+        return F(field) + 1
+    return Greatest(F(field) - 1, 0)
+
+
+def _listed(ids, row_id, joined, is_new, queryset):
+    """
+    The id list after `row_id` joined or left it, or None when it is
+    unchanged. A new row is the newest and goes first; otherwise the list is
+    read again.
+    """
+    if joined and is_new:
+        return [row_id] + ids[:DASHBOARD_SIZE - 1]
+    if joined or row_id in ids:
+        return list(queryset.values_list('id', flat=True)[:DASHBOARD_SIZE])
+    return None
+
+
+def apply_summary_change(summary, request_id, before, after):
+    """
+    Helper function updating one summary for a request whose state went from
+    `before` to `after`. Writes nothing when the request and its booking
+    stay on or off the summary's lists.
+    """
+    was_booked, was_pending = dashboard_entries(summary, before)
+    is_booked, is_pending = dashboard_entries(summary, after)
+    bookings, requests = dashboard_querysets(summary.account_id, summary.role)
+
+    changes = {}
+    if is_booked != was_booked:
+        changes['current_booking_count'] = _counted('current_booking_count', is_booked)
+        booking_id = (after if is_booked else before)[3]
+        new_booking = before is None or before[3] is None
+        ids = _listed(summary.current_booking_ids, booking_id, is_booked, new_booking, bookings)
+        if ids is not None:
+            changes['current_booking_ids'] = ids
+    if is_pending != was_pending:
+        changes['pending_request_count'] = _counted('pending_request_count', is_pending)
+        ids = _listed(summary.pending_request_ids, request_id, is_pending, before is None, requests)
+        if ids is not None:
+            changes['pending_request_ids'] = ids
+
+    if changes:
+        DashboardSummary.objects.filter(id=summary.id).update(updated_at=timezone.now(), **changes)
+
+
+def apply_request_change(request_id, before):
+    """
+    Update the summaries of the client and provider of a request after it,
+    its subtype row or its booking was saved. Accounts without a summary are
+    left to get_dashboard_summary.
+
+    Args:
+        request_id: The request that changed
+        before: Its request_state from before the save, None for a new request
+    """
+    after = request_state(request_id)
+    if after == before:
+        return
+
+    account_ids = {
+        account_id for state in (before, after) if state is not None
+        for account_id in state[:2] if account_id
+    }
+    with transaction.atomic(savepoint=False):
+        summaries = DashboardSummary.objects.select_for_update().filter(account_id__in=account_ids)
+        for summary in summaries:
+            apply_summary_change(summary, request_id, before, after)
+
+
+def get_dashboard_summary(account):
+    """
+    The summary of an account, built on first use or when the account's
+    dashboard role changed. None when the account has no dashboard role.
+    """
+    summary = DashboardSummary.objects.filter(account=account).first()
+    if summary is not None and summary.role == dashboard_role(account):
+        return summary
+    return refresh_dashboard(account)
@@ -0,0 +1,205 @@
+"""
+Request feed assembly for the bookings app.
+
+Loads a client's requests together with their custom/direct/emergency rows,
+the direct service and every add-on in a fixed number of queries (per page,
+when paginated), then shapes them into the grouped payload returned by
+list_requests.
+"""
+
+from django.db.models import Exists, OuterRef, Prefetch
+
+from .fieldsets import FULL_FIELDSET
+from .models import (
+    Request, Booking, CustomRequest, DirectRequest, EmergencyRequest,
+    DirectRequestAddOn
+)
+
+
+# Keys a client can pick with ?fields= and sections it can pick with ?expand=
+FEED_FIELDS = [
+    'id', 'status', 'description', 'quoted_price', 'providers_note',
+    'concern_picture', 'created_at', 'has_booking'
+]
+FEED_SECTIONS = ['provider', 'service', 'add_ons', 'service_location']
+
+# Subtype columns behind each feed key, loaded only when the key is asked for
+_SUBTYPE_COLUMNS = {
+    CustomRequest: ['description', 'quoted_price', 'providers_note', 'concern_picture'],
+    DirectRequest: [],
+    EmergencyRequest: ['description', 'providers_note', 'concern_picture'],
+}
+
+
+def request_feed_queryset(queryset, fieldset=FULL_FIELDSET):
+    """
+    Attach everything the request feed needs to a Request queryset.
+
+    The subtype rows and add-ons are prefetched with one query each, keyed by
+    request id, so the cost does not grow with the number of requests.
+    Add-ons land on each request as `feed_add_ons`. Sections and keys that
+    `fieldset` leaves out are neither joined, prefetched nor selected.
+    """
+    related = [
+        section for section in ('provider', 'service_location')
+        if fieldset.expands(section)
+    ]
+    if related:
+        queryset = queryset.select_related(*related)
+
+    direct_requests = _subtype_queryset(DirectRequest, fieldset)
+    if fieldset.expands('service'):
+        direct_requests = direct_requests.select_related('service')
+
+    prefetches = [
+        Prefetch('customrequest', queryset=_subtype_queryset(CustomRequest, fieldset)),
+        Prefetch('directrequest', queryset=direct_requests),
+        Prefetch('emergencyrequest', queryset=_subtype_queryset(EmergencyRequest, fieldset)),
+    ]
+    if fieldset.expands('add_ons'):
+        prefetches.append(Prefetch(
+            'directrequestaddon_set',
+            queryset=DirectRequestAddOn.objects.select_related('service_add_on'),
+            to_attr='feed_add_ons'
+        ))
+    queryset = queryset.prefetch_related(*prefetches)
+
+    if not fieldset.is_full:
+        queryset = queryset.only('id', 'request_type', 'created_at', 'provider', 'service_location')
+    if fieldset.wants('has_booking'):
+        queryset = queryset.annotate(
+            has_booking=Exists(Booking.objects.filter(request=OuterRef('pk')))
+        )
+    return queryset
+
+
+def client_request_feed(client, fieldset=FULL_FIELDSET):
+    """Feed queryset of every request made by a client, newest first"""
+    return request_feed_queryset(
+        Request.objects.filter(client=client), fieldset
+    ).order_by('-created_at', '-id')
+
+
+def build_request_feed(requests, fieldset=FULL_FIELDSET):
+    """
+    Group requests loaded through request_feed_queryset by type.
+
+    Returns a dict with custom_requests, direct_requests and
+    emergency_requests lists, keeping the order of `requests`.
+    """
+    feed = {
+        'custom_requests': [],
+        'direct_requests': [],
+        'emergency_requests': [],
+    }
+
+    for req in requests:
+        if req.request_type == 'custom' and hasattr(req, 'customrequest'):
+            feed['custom_requests'].append(_serialize_custom_entry(req, fieldset))
+        elif req.request_type == 'direct' and hasattr(req, 'directrequest'):
+            feed['direct_requests'].append(_serialize_direct_entry(req, fieldset))
+        elif req.request_type == 'emergency' and hasattr(req, 'emergencyrequest'):
+            feed['emergency_requests'].append(_serialize_emergency_entry(req, fieldset))
+
+    return feed
+
+
+def _subtype_queryset(model, fieldset):
+    """Helper function selecting only the subtype columns `fieldset` asks for"""
+    if fieldset.fields is None:
+        return model.objects.all()
+    columns = [column for column in _SUBTYPE_COLUMNS[model] if fieldset.wants(column)]
+    if model is not EmergencyRequest:
+        columns.append('request_status')
+    if model is DirectRequest and fieldset.expands('service'):
+        columns.append('service')
+    return model.objects.only('id', 'request', *columns)
+
+
+def _serialize_provider(req):
+    """Helper function to serialize the provider of a request"""
+    if not req.provider:
+        return None
+    return {
+        'id': req.provider.id,
+        'name': f"{req.provider.firstname} {req.provider.lastname}"
+    }
+
+
+def _serialize_location(req):
+    """Helper function to serialize the service location of a request"""
+    if not req.service_location:
+        return None
+    return {
+        'street_name': req.service_location.street_name,
+        'barangay': req.service_location.barangay,
+        'city_municipality': req.service_location.city_municipality,
+    }
+
+
+def _serialize_custom_entry(req, fieldset=FULL_FIELDSET):
+    """Helper function to serialize a custom request feed entry"""
+    custom = req.customrequest
+    entry = {'id': req.id}
+    if fieldset.expands('provider'):
+        entry['provider'] = _serialize_provider(req)
+    if fieldset.wants('description'):
+        entry['description'] = custom.description
+    if fieldset.wants('status'):
+        entry['status'] = custom.request_status
+    if fieldset.wants('quoted_price'):
+        entry['quoted_price'] = float(custom.quoted_price) if custom.quoted_price else None
+    if fieldset.wants('providers_note'):
+        entry['providers_note'] = custom.providers_note
+    if fieldset.wants('concern_picture'):
+        entry['concern_picture'] = custom.concern_picture.url if custom.concern_picture else None
+    return _finish_entry(entry, req, fieldset)
+
+
+def _serialize_direct_entry(req, fieldset=FULL_FIELDSET):
+    """Helper function to serialize a direct request feed entry with its add-ons"""
+    direct = req.directrequest
+    entry = {'id': req.id}
+    if fieldset.expands('provider'):
+        entry['provider'] = _serialize_provider(req)
+    if fieldset.expands('service'):
+        entry['service'] = {
+            'id': direct.service.id,
+            'name': direct.service.name,
+            'price': float(direct.service.price)
+        }
+    if fieldset.expands('add_ons'):
+        entry['add_ons'] = [{
+            'id': addon.service_add_on.id,
+            'name': addon.service_add_on.name,
+            'price': float(addon.service_add_on.price)
+        } for addon in req.feed_add_ons]
+    if fieldset.wants('status'):
+        entry['status'] = direct.request_status
+    return _finish_entry(entry, req, fieldset)
+
+
+def _serialize_emergency_entry(req, fieldset=FULL_FIELDSET):
+    """Helper function to serialize an emergency request feed entry"""
+    emergency = req.emergencyrequest
+    entry = {'id': req.id}
+    if fieldset.expands('provider'):
+        entry['provider'] = _serialize_provider(req)
+    if fieldset.wants('description'):
+        entry['description'] = emergency.description
+    if fieldset.wants('providers_note'):
+        entry['providers_note'] = emergency.providers_note
+    if fieldset.wants('concern_picture'):
+        entry['concern_picture'] = emergency.concern_picture.url if emergency.concern_picture else None
+    return _finish_entry(entry, req, fieldset)
+
+
+def _finish_entry(entry, req, fieldset):
+    """Helper function adding the keys every feed entry shares"""
+    if fieldset.expands('service_location'):
+        entry['service_location'] = _serialize_location(req)
+    if fieldset.wants('created_at'):
+        entry['created_at'] = req.created_at.isoformat()
+    if fieldset.wants('has_booking'):
+        entry['has_booking'] = req.has_booking
+    return entry
@@ -0,0 +1,73 @@
+"""
+Sparse fieldsets for booking and request payloads.
+
+Clients trim list payloads with two query parameters:
+- fields: comma-separated scalar keys to return (id is always included)
+- expand: comma-separated nested sections to include
+
+Without either parameter every key and section is returned, as before. Once
+one of them is given, only the named keys and sections are built, and views
+use the same Fieldset to skip the joins, prefetches and columns behind the
+parts that were left out.
+"""
+
+
+class InvalidFieldset(ValueError):
+    """Raised when fields or expand names something the endpoint does not offer"""
+
+
+class Fieldset:
+    """The scalar keys and nested sections a client asked for"""
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request, scalars, nested):
+        """
+        Read fields/expand from the query string.
+
+        Args:
+            request: DRF request
+            scalars: Scalar keys the endpoint can return
+            nested: Nested sections the endpoint can expand
+        """
+        fields = _parse_names(request.query_params.get('fields'), scalars, 'fields')
+        expand = _parse_names(request.query_params.get('expand'), nested, 'expand')
+        return cls(fields, expand)
+
+    @property
+    def is_full(self):
+        return self.fields is None and self.expand is None
+
+    def wants(self, key):
+        """Whether scalar `key` should be returned"""
+        return self.fields is None or key == 'id' or key in self.fields
+
+    def expands(self, section):
+        """Whether nested `section` should be built"""
+        if self.expand is None:
+            return self.fields is None
+        return section in self.expand
+
+    def trim(self, data, scalars):
+        """Drop the scalar keys of `data` that were not asked for"""
+        if self.fields is None:
+            return data
+        return {key: value for key, value in data.items() if key not in scalars or self.wants(key)}
+
+
+# A Fieldset that returns everything, used when the client sends no parameters
+FULL_FIELDSET = Fieldset()
+
+
+def _parse_names(value, allowed, param):
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise InvalidFieldset(
+            f'Unknown {param}: {", ".join(sorted(unknown))}. Must be among: {", ".join(allowed)}'
+        )
+    return names
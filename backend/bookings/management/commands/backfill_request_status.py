@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from bookings.models import Request, CustomRequest, DirectRequest
+
+
+class Command(BaseCommand):
+    help = "Backfill Request.request_status from the subtype rows and bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of request ids updated per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_id = Request.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        updated = 0
+
+        for start in range(1, max_id + 1, batch_size):
+            batch = Request.objects.filter(id__gte=start, id__lt=start + batch_size)
+            updated += self.backfill_batch(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled request_status for {updated} requests (up to id {max_id})'
+        ))
+
+    def backfill_batch(self, batch):
+        """Set the lifecycle status for one id range, one UPDATE per status"""
+        updated = batch.filter(booking__isnull=False).exclude(
+            request_status=Request.Status.BOOKED
+        ).update(request_status=Request.Status.BOOKED)
+
+        unbooked = batch.filter(booking__isnull=True)
+        for subtype_status in CustomRequest.Status.values:
+            updated += unbooked.filter(
+                customrequest__request_status=subtype_status
+            ).exclude(request_status=subtype_status).update(request_status=subtype_status)
+        for subtype_status in DirectRequest.Status.values:
+            updated += unbooked.filter(
+                directrequest__request_status=subtype_status
+            ).exclude(request_status=subtype_status).update(request_status=subtype_status)
+        updated += unbooked.filter(
+            request_type=Request.Type.EMERGENCY
+        ).exclude(request_status=Request.Status.PENDING).update(request_status=Request.Status.PENDING)
+
+        return updated
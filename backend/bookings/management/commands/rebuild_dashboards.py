@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from bookings.dashboard import refresh_dashboard
+from users.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every DashboardSummary from the bookings and requests, e.g. "
+        "after bulk updates that bypass the model signals"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of accounts loaded per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.select_related('client', 'mechanic', 'shopowner').order_by('id')
+        rebuilt = 0
+        for account in accounts.iterator(chunk_size=options['batch_size']):
+            if refresh_dashboard(account) is not None:
+                rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} dashboard summaries'))
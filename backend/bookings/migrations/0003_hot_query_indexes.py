@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:19
+
+from django.db import migrations, models
+
+from MainBackend.migration_operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0002_initial'),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='booking',
+            index=models.Index(fields=['status', '-booked_at'], name='booking_status_booked_idx'),
+        ),
+        AddIndexOnline(
+            model_name='customrequest',
+            index=models.Index(fields=['request_status'], name='customrequest_status_idx'),
+        ),
+        AddIndexOnline(
+            model_name='directrequest',
+            index=models.Index(fields=['request_status'], name='directrequest_status_idx'),
+        ),
+        AddIndexOnline(
+            model_name='request',
+            index=models.Index(fields=['client', '-created_at'], name='request_client_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='request',
+            index=models.Index(fields=['provider', '-created_at'], name='request_provider_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+from MainBackend.migration_operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    # Existing rows start as pending; 0007_backfill_request_status sets their status.
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='request_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('quoted', 'Quoted'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('booked', 'Booked')], default='pending', max_length=20),
+        ),
+        AddIndexOnline(
+            model_name='request',
+            index=models.Index(fields=['client', 'request_status', '-created_at'], name='request_client_status_idx'),
+        ),
+        AddIndexOnline(
+            model_name='request',
+            index=models.Index(fields=['provider', 'request_status', '-created_at'], name='request_provider_status_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_mechanic_bio_mechanicreview'),
+        ('bookings', '0004_request_lifecycle_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('client', 'Client'), ('mechanic', 'Mechanic'), ('shop_owner', 'Shop Owner')], max_length=20)),
+                ('current_booking_count', models.PositiveIntegerField(default=0)),
+                ('pending_request_count', models.PositiveIntegerField(default=0)),
+                ('current_booking_ids', models.JSONField(default=list)),
+                ('pending_request_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_summary', to='users.account')),
+            ],
+        ),
+    ]
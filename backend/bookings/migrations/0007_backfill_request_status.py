@@ -0,0 +1,55 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:00
+
+from django.db import migrations
+from django.db.models import Max
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_request_status(apps, schema_editor):
+    """
+    Derive request_status for the requests that 0004 started as pending:
+    booked when a booking exists, otherwise the status of the custom or
+    direct row. Same updates as `manage.py backfill_request_status`, which
+    can still be run after bulk changes.
+
+    Dashboard summaries built from the old statuses are dropped; they are
+    rebuilt on first use.
+    """
+    db = schema_editor.connection.alias
+    Request = apps.get_model('bookings', 'Request')
+    DashboardSummary = apps.get_model('bookings', 'DashboardSummary')
+    subtypes = [
+        ('customrequest', apps.get_model('bookings', 'CustomRequest')),
+        ('directrequest', apps.get_model('bookings', 'DirectRequest')),
+    ]
+
+    max_id = Request.objects.using(db).aggregate(max_id=Max('id'))['max_id'] or 0
+    updated = 0
+    for start in range(1, max_id + 1, BATCH_SIZE):
+        batch = Request.objects.using(db).filter(id__gte=start, id__lt=start + BATCH_SIZE)
+        updated += batch.filter(booking__isnull=False).exclude(
+            request_status='booked'
+        ).update(request_status='booked')
+
+        unbooked = batch.filter(booking__isnull=True)
+        for relation, model in subtypes:
+            for subtype_status, _ in model._meta.get_field('request_status').choices:
+                updated += unbooked.filter(
+                    **{f'{relation}__request_status': subtype_status}
+                ).exclude(request_status=subtype_status).update(request_status=subtype_status)
+
+    if updated:
+        DashboardSummary.objects.using(db).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_servicelocation_coordinates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_request_status, migrations.RunPython.noop),
+    ]
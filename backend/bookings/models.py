@@ -8,6 +8,10 @@ class ServiceLocation(models.Model):
     barangay = models.CharField(max_length=100)
     city_municipality = models.CharField(max_length=100)
     landmark = models.CharField(max_length=255, null=True, blank=True)
+    # Filled from users.PlaceCentroid when not given (see users.geocoding)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    grid_cell = models.BigIntegerField(null=True, blank=True, db_index=True)
 
 class Request(models.Model):
     class Type(models.TextChoices):
@@ -15,12 +19,29 @@ class Request(models.Model):
         DIRECT = "direct"
         EMERGENCY = "emergency"
 
+    class Status(models.TextChoices):
+        # Lifecycle status mirrored from the subtype row and the booking (see bookings/signals.py)
+        PENDING = "pending"
+        QUOTED = "quoted"
+        ACCEPTED = "accepted"
+        REJECTED = "rejected"
+        BOOKED = "booked"
+
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     provider = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="provided_requests", null=True, blank=True)
     request_type = models.CharField(max_length=20, choices=Type.choices)
+    request_status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     service_location = models.ForeignKey(ServiceLocation, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', '-created_at'], name='request_client_created_idx'),
+            models.Index(fields=['provider', '-created_at'], name='request_provider_created_idx'),
+            models.Index(fields=['client', 'request_status', '-created_at'], name='request_client_status_idx'),
+            models.Index(fields=['provider', 'request_status', '-created_at'], name='request_provider_status_idx'),
+        ]
+
 class CustomRequest(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending"
@@ -33,6 +54,11 @@ class CustomRequest(models.Model):
     quoted_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     providers_note = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['request_status'], name='customrequest_status_idx'),
+        ]
+
 class DirectRequest(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending"
@@ -42,6 +68,11 @@ class DirectRequest(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
     request_status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['request_status'], name='directrequest_status_idx'),
+        ]
+
 class DirectRequestAddOn(models.Model):
     request = models.ForeignKey(Request, on_delete=models.CASCADE)
     service_add_on = models.ForeignKey(ServiceAddOn, on_delete=models.CASCADE)
@@ -67,6 +98,11 @@ class Booking(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-booked_at'], name='booking_status_booked_idx'),
+        ]
+
 class ActiveBooking(models.Model):
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE)
     before_picture_service = models.ImageField(upload_to='bookings/before/', null=True, blank=True)
@@ -114,4 +150,21 @@ class CompleteBooking(models.Model):
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE)
     completed_at = models.DateTimeField(auto_now_add=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    notes = models.TextField(null=True, blank=True)
\ No newline at end of file
+    notes = models.TextField(null=True, blank=True)
+
+
+class DashboardSummary(models.Model):
+    """Materialized home page of an account, kept current by bookings.signals"""
+    class Role(models.TextChoices):
+        CLIENT = "client"
+        MECHANIC = "mechanic"
+        SHOP_OWNER = "shop_owner"
+
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name="dashboard_summary")
+    role = models.CharField(max_length=20, choices=Role.choices)
+    current_booking_count = models.PositiveIntegerField(default=0)
+    pending_request_count = models.PositiveIntegerField(default=0)
+    # Newest first, at most bookings.dashboard.DASHBOARD_SIZE ids each
+    current_booking_ids = models.JSONField(default=list)
+    pending_request_ids = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
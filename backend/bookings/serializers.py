@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from .models import (
     Booking, Request, CustomRequest, DirectRequest, EmergencyRequest,
@@ -7,10 +9,66 @@ from services.models import Service, ServiceAddOn
 from users.models import Account, Client
 
 
+# Serializer context key holding add-ons grouped by request id
+ADD_ONS_CONTEXT_KEY = 'add_ons_by_request'
+
+# Serializer context key holding the Fieldset (see bookings.fieldsets) to render
+FIELDSET_CONTEXT_KEY = 'fieldset'
+
+
+def request_add_ons_context(requests, context=None):
+    """
+    Load the add-ons of every direct request in `requests` with a single
+    query and store them in a serializer context.
+    
+    Pass the returned context to any serializer that nests RequestSerializer
+    (directly or through BookingSerializer) so DirectRequestSerializer reads
+    add-ons from it instead of querying once per object.
+    """
+    context = dict(context or {})
+    direct_ids = [req.id for req in requests if req.request_type == 'direct']
+    
+    add_ons_by_request = defaultdict(list)
+    if direct_ids:
+        add_ons = DirectRequestAddOn.objects.filter(
+            request_id__in=direct_ids
+        ).select_related('service_add_on')
+        for addon in add_ons:
+            add_ons_by_request[addon.request_id].append(addon.service_add_on)
+    
+    context[ADD_ONS_CONTEXT_KEY] = add_ons_by_request
+    return context
+
+
+class SparseFieldsetMixin:
+    """
+    Drops the fields left out by the Fieldset in the serializer context.
+    
+    Fields named in `fieldset_sections` are nested sections kept only when
+    expanded; every other field is a scalar kept only when asked for.
+    """
+    fieldset_sections = {}
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get(FIELDSET_CONTEXT_KEY)
+        if fieldset is None or fieldset.is_full:
+            return fields
+        
+        return {
+            name: field for name, field in fields.items()
+            if (fieldset.expands(self.fieldset_sections[name]) if name in self.fieldset_sections
+                else fieldset.wants(name))
+        }
+
+
 class ServiceLocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = ServiceLocation
-        fields = ['id', 'street_name', 'subdivision_village', 'barangay', 'city_municipality', 'landmark']
+        fields = [
+            'id', 'street_name', 'subdivision_village', 'barangay', 'city_municipality', 'landmark',
+            'latitude', 'longitude'
+        ]
 
 
 class ServiceBasicSerializer(serializers.ModelSerializer):
@@ -46,6 +104,10 @@ class DirectRequestSerializer(serializers.ModelSerializer):
         fields = ['id', 'service', 'request_status', 'add_ons']
     
     def get_add_ons(self, obj):
+        add_ons_by_request = self.context.get(ADD_ONS_CONTEXT_KEY)
+        if add_ons_by_request is not None:
+            return ServiceAddOnSerializer(add_ons_by_request.get(obj.request_id, []), many=True).data
+        
         add_ons = DirectRequestAddOn.objects.filter(request=obj.request).select_related('service_add_on')
         return ServiceAddOnSerializer([addon.service_add_on for addon in add_ons], many=True).data
 
@@ -56,7 +118,14 @@ class EmergencyRequestSerializer(serializers.ModelSerializer):
         fields = ['id', 'description', 'concern_picture', 'providers_note']
 
 
-class RequestSerializer(serializers.ModelSerializer):
+class RequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    fieldset_sections = {
+        'client': 'client',
+        'provider': 'provider',
+        'service_location': 'service_location',
+        'request_details': 'details',
+    }
+    
     client = AccountBasicSerializer(source='client.account', read_only=True)
     provider = AccountBasicSerializer(read_only=True)
     service_location = ServiceLocationSerializer(read_only=True)
@@ -70,19 +139,19 @@ class RequestSerializer(serializers.ModelSerializer):
         if obj.request_type == 'custom':
             try:
                 custom = obj.customrequest
-                return CustomRequestSerializer(custom).data
+                return CustomRequestSerializer(custom, context=self.context).data
             except CustomRequest.DoesNotExist:
                 return None
         elif obj.request_type == 'direct':
             try:
                 direct = obj.directrequest
-                return DirectRequestSerializer(direct).data
+                return DirectRequestSerializer(direct, context=self.context).data
             except DirectRequest.DoesNotExist:
                 return None
         elif obj.request_type == 'emergency':
             try:
                 emergency = obj.emergencyrequest
-                return EmergencyRequestSerializer(emergency).data
+                return EmergencyRequestSerializer(emergency, context=self.context).data
             except EmergencyRequest.DoesNotExist:
                 return None
         return None
@@ -97,7 +166,12 @@ class ActiveBookingSerializer(serializers.ModelSerializer):
         ]
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    fieldset_sections = {
+        'request': 'request',
+        'active_details': 'details',
+    }
+    
     request = RequestSerializer(read_only=True)
     active_details = serializers.SerializerMethodField()
     
@@ -112,7 +186,7 @@ class BookingSerializer(serializers.ModelSerializer):
         if obj.status == 'active':
             try:
                 active = obj.activebooking
-                return ActiveBookingSerializer(active).data
+                return ActiveBookingSerializer(active, context=self.context).data
             except ActiveBooking.DoesNotExist:
                 return None
         return None
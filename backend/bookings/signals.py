@@ -0,0 +1,178 @@
+"""
+Signal handlers for the bookings app.
+
+These signals keep the denormalized Request.request_status in sync:
+- Mirrors the custom/direct request status whenever the subtype row is saved
+- Marks the request as booked when a booking is created, and restores the
+  subtype status if the booking is deleted
+
+and then update the dashboard summaries of the client and provider involved
+(see bookings.dashboard). The request's state is read before each save and
+compared after it; the dashboard handlers are registered last so they see
+the synced status.
+
+Saving or deleting a booking's status detail row (active, cancel, rework,
+dispute, complete) also touches the booking's updated_at, which the
+conditional GET validators of get_booking_detail read.
+
+Service locations saved without coordinates are geocoded from their barangay
+and city (see users.geocoding).
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import (
+    Request, CustomRequest, DirectRequest, EmergencyRequest, Booking,
+    ActiveBooking, CancelBooking, ReworkBooking, DisputeBooking, CompleteBooking,
+    ServiceLocation
+)
+from .dashboard import (
+    apply_request_change, refresh_dashboards, refresh_request_dashboards, request_state
+)
+from users.models import Client
+from users.geocoding import locate
+
+
+def lifecycle_status_for(subtype):
+    """
+    Returns the Request.Status matching a custom, direct or emergency row.
+    Emergency requests have no status of their own and stay pending.
+    
+    Args:
+        subtype: CustomRequest, DirectRequest or EmergencyRequest instance
+    """
+    return getattr(subtype, 'request_status', Request.Status.PENDING)
+
+
+def sync_request_status(request_id, new_status):
+    """
+    Writes the lifecycle status of a request in a single UPDATE.
+    Booked requests keep their status until the booking goes away.
+    """
+    Request.objects.filter(id=request_id).exclude(
+        request_status__in=[Request.Status.BOOKED, new_status]
+    ).update(request_status=new_status)
+
+
+@receiver(post_save, sender=CustomRequest)
+@receiver(post_save, sender=DirectRequest)
+@receiver(post_save, sender=EmergencyRequest)
+def request_subtype_saved(sender, instance, **kwargs):
+    """
+    Signal handler: Mirrors the subtype status onto its request.
+    
+    Why signals? Statuses change from views, the admin and the shell alike,
+    and pending-request queries filter on the denormalized column in SQL.
+    """
+    sync_request_status(instance.request_id, lifecycle_status_for(instance))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    """
+    Signal handler: Marks the request as booked when its booking is created.
+    """
+    if created:
+        Request.objects.filter(id=instance.request_id).update(request_status=Request.Status.BOOKED)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """
+    Signal handler: Restores the subtype status when a booking is removed.
+    """
+    request = Request.objects.filter(id=instance.request_id).select_related(
+        'customrequest', 'directrequest'
+    ).first()
+    if request is None:
+        return
+    
+    new_status = Request.Status.PENDING
+    for relation in ['customrequest', 'directrequest']:
+        if hasattr(request, relation):
+            new_status = lifecycle_status_for(getattr(request, relation))
+    
+    Request.objects.filter(id=request.id).update(request_status=new_status)
+
+
+def changed_request_id(sender, instance):
+    """Helper function returning the id of the request a saved or deleted row belongs to"""
+    return instance.id if sender is Request else instance.request_id
+
+
+@receiver(pre_save, sender=Request)
+@receiver(pre_save, sender=CustomRequest)
+@receiver(pre_save, sender=DirectRequest)
+@receiver(pre_save, sender=EmergencyRequest)
+@receiver(pre_save, sender=Booking)
+def remember_dashboard_state(sender, instance, **kwargs):
+    """
+    Signal handler: Reads the request's dashboard state before the save, so
+    the summaries can be moved by what the save changed.
+    """
+    if sender is Request and instance._state.adding:
+        instance._dashboard_state = None
+    else:
+        instance._dashboard_state = request_state(changed_request_id(sender, instance))
+
+
+@receiver(post_save, sender=Request)
+@receiver(post_save, sender=CustomRequest)
+@receiver(post_save, sender=DirectRequest)
+@receiver(post_save, sender=EmergencyRequest)
+@receiver(post_save, sender=Booking)
+def update_dashboards_on_save(sender, instance, **kwargs):
+    """
+    Signal handler: Updates the dashboards of the request's client and provider.
+    """
+    apply_request_change(changed_request_id(sender, instance), instance._dashboard_state)
+
+
+@receiver(post_delete, sender=CustomRequest)
+@receiver(post_delete, sender=DirectRequest)
+@receiver(post_delete, sender=EmergencyRequest)
+@receiver(post_delete, sender=Booking)
+def refresh_dashboards_on_change(sender, instance, **kwargs):
+    """
+    Signal handler: Refreshes the dashboards of the request's client and provider.
+    """
+    refresh_request_dashboards(changed_request_id(sender, instance))
+
+
+@receiver(post_delete, sender=Request)
+def refresh_dashboards_on_request_delete(sender, instance, **kwargs):
+    """
+    Signal handler: Refreshes the dashboards of a deleted request's client and provider.
+    """
+    client_account_ids = list(
+        Client.objects.filter(id=instance.client_id).values_list('account_id', flat=True)
+    )
+    refresh_dashboards(client_account_ids + [instance.provider_id])
+
+
+@receiver(post_save, sender=ActiveBooking)
+@receiver(post_save, sender=CancelBooking)
+@receiver(post_save, sender=ReworkBooking)
+@receiver(post_save, sender=DisputeBooking)
+@receiver(post_save, sender=CompleteBooking)
+@receiver(post_delete, sender=ActiveBooking)
+@receiver(post_delete, sender=CancelBooking)
+@receiver(post_delete, sender=ReworkBooking)
+@receiver(post_delete, sender=DisputeBooking)
+@receiver(post_delete, sender=CompleteBooking)
+def touch_booking_on_detail_change(sender, instance, **kwargs):
+    """
+    Signal handler: Bumps Booking.updated_at when its status detail row changes,
+    so get_booking_detail's validators see the change.
+    """
+    Booking.objects.filter(id=instance.booking_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=ServiceLocation)
+def service_location_saving(sender, instance, **kwargs):
+    """
+    Signal handler: Fills in a service location's coordinates from its
+    barangay and city when they are missing, and sets its grid cell.
+    """
+    locate(instance)
@@ -1,3 +1,835 @@
-from django.test import TestCase
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.core.management import call_command
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from MainBackend.db_router import PIN_COOKIE_NAME, ReplicaRoutingMiddleware, replica_read
+from users.models import Account, Client, Mechanic
+from services.models import Service, ServiceAddOn, MechanicService
+from services.snapshot import get_catalog_snapshot
+from .models import (
+    Booking, Request, CustomRequest, DirectRequest, EmergencyRequest, DirectRequestAddOn,
+    ServiceLocation, ActiveBooking, DashboardSummary
+)
+from .dashboard import DASHBOARD_SIZE, get_dashboard_summary, refresh_dashboard
+from .views.client_booking_views import BOOKING_STATUSES
+
+
+def create_account(username, **extra):
+    return Account.objects.create(
+        firstname=username.title(),
+        lastname='Tester',
+        email=f'{username}@example.com',
+        username=username,
+        password='unused',
+        **extra
+    )
+
+
+def create_requests(client, provider, service, add_ons, count):
+    """Create `count` requests cycling through custom, direct and emergency"""
+    location = ServiceLocation.objects.create(
+        street_name='Rizal St', barangay='Poblacion', city_municipality='Davao City'
+    )
+    types = ['custom', 'direct', 'emergency']
+    requests = [
+        Request.objects.create(
+            client=client, provider=provider, request_type=types[i % 3], service_location=location
+        )
+        for i in range(count)
+    ]
+    CustomRequest.objects.bulk_create([
+        CustomRequest(request=req, description='Engine noise')
+        for req in requests if req.request_type == 'custom'
+    ])
+    DirectRequest.objects.bulk_create([
+        DirectRequest(request=req, service=service)
+        for req in requests if req.request_type == 'direct'
+    ])
+    EmergencyRequest.objects.bulk_create([
+        EmergencyRequest(request=req, description='Flat tire')
+        for req in requests if req.request_type == 'emergency'
+    ])
+    DirectRequestAddOn.objects.bulk_create([
+        DirectRequestAddOn(request=req, service_add_on=add_on)
+        for req in requests if req.request_type == 'direct'
+        for add_on in add_ons
+    ])
+    return requests
+
+
+class BookingsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account('client')
+        self.client_profile = Client.objects.create(account=self.account)
+        self.provider = create_account('provider')
+        self.service = Service.objects.create(name='Oil change', description='Full synthetic', price=1500)
+        self.add_ons = [
+            ServiceAddOn.objects.create(service=self.service, name='Filter', description='Oil filter', price=300),
+            ServiceAddOn.objects.create(service=self.service, name='Flush', description='Engine flush', price=500),
+        ]
+
+    def login(self, account):
+        session = self.client.session
+        session['account_id'] = account.id
+        session.save()
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries), response
+
+
+class ListRequestsTests(BookingsTestCase):
+    def test_query_count_is_flat_from_one_to_a_thousand_requests(self):
+        self.login(self.account)
+        url = reverse('list-requests')
+
+        create_requests(self.client_profile, self.provider, self.service, self.add_ons, 1)
+        single_count, _ = self.count_queries(url)
+
+        create_requests(self.client_profile, self.provider, self.service, self.add_ons, 999)
+        bulk_count, response = self.count_queries(url)
+
+        self.assertEqual(single_count, bulk_count)
+        self.assertEqual(response.data['total_count'], 1000)
+        direct = response.data['direct_requests'][0]
+        self.assertEqual(len(direct['add_ons']), 2)
+        self.assertEqual(direct['service']['name'], 'Oil change')
+        self.assertFalse(direct['has_booking'])
+
+
+class GetMechanicsTests(BookingsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mechanics = []
+        for i in range(12):
+            mechanic = Mechanic.objects.create(
+                account=create_account(f'mechanic{i}'),
+                status=Mechanic.Status.WORKING if i % 2 else Mechanic.Status.AVAILABLE
+            )
+            MechanicService.objects.create(mechanic=mechanic, service=self.service)
+            self.mechanics.append(mechanic)
+
+    def test_catalog_query_count_does_not_grow_with_mechanics(self):
+        count, response = self.count_queries(reverse('get-mechanics'))
+        self.assertLessEqual(count, 3)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(response.data['mechanics'][0]['services'][0]['name'], 'Oil change')
+
+    def test_filters_and_pagination(self):
+        other = Service.objects.create(name='Tune up', description='Spark plugs', price=900)
+        MechanicService.objects.create(mechanic=self.mechanics[0], service=other)
+
+        _, response = self.count_queries(reverse('get-mechanics'), service_id=other.id)
+        self.assertEqual([m['id'] for m in response.data['mechanics']], [self.mechanics[0].account.id])
+
+        _, first = self.count_queries(reverse('get-mechanics'), status='working', page_size=4)
+        _, second = self.count_queries(
+            reverse('get-mechanics'), status='working', page_size=4, cursor=first.data['next_cursor']
+        )
+        self.assertEqual(first.data['count'], 4)
+        self.assertEqual(second.data['count'], 2)
+        self.assertIsNone(second.data['next_cursor'])
+        working_ids = [m.account.id for m in self.mechanics if m.status == Mechanic.Status.WORKING]
+        self.assertEqual(
+            [m['id'] for m in first.data['mechanics'] + second.data['mechanics']], working_ids
+        )
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse('get-mechanics'), {'status': 'sleeping'})
+        self.assertEqual(response.status_code, 400)
+
+
+class GetMechanicServicesTests(BookingsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mechanic = Mechanic.objects.create(account=create_account('mechanic'))
+        for i in range(5):
+            service = Service.objects.create(name=f'Service {i}', description='', price=100)
+            ServiceAddOn.objects.create(service=service, name='Extra', description='', price=50)
+            MechanicService.objects.create(mechanic=self.mechanic, service=service)
+        self.url = reverse('get-mechanic-services', args=[self.mechanic.account.id])
+
+    def test_add_ons_load_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'include': 'addons'})
+        add_on_reads = [
+            q for q in ctx.captured_queries if q['sql'].startswith('SELECT "services_serviceaddon"')
+        ]
+        plain = self.client.get(self.url)
+
+        self.assertEqual(len(add_on_reads), 1)
+        self.assertEqual(len(response.data['services'][0]['add_ons']), 1)
+        self.assertNotIn('add_ons', plain.data['services'][0])
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ACTION='raise')
+    def test_cold_menu_stays_within_the_budget(self):
+        cache.clear()
+        self.login(self.account)
+        response = self.client.get(self.url, {'include': 'addons'})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(int(response['X-Query-Count']), 6)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_menu_is_cached_until_the_mechanic_services_change(self):
+        cold, _ = self.count_queries(self.url, include='addons')
+        warm, response = self.count_queries(self.url, include='addons')
+        # Only the conditional GET validator is left
+        self.assertEqual(warm, cold - 2)
+
+        service = Service.objects.create(name='Brakes', description='', price=900)
+        with self.captureOnCommitCallbacks(execute=True):
+            MechanicService.objects.create(mechanic=self.mechanic, service=service)
+        self.assertEqual(len(self.client.get(self.url).data['services']), 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            service.price = 950
+            service.save()
+        self.assertEqual(self.client.get(self.url).data['services'][-1]['price'], 950.0)
+
+
+class CreateMechanicDirectRequestTests(BookingsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mechanic = Mechanic.objects.create(account=self.provider)
+        MechanicService.objects.create(mechanic=self.mechanic, service=self.service)
+        self.login(self.account)
+
+    def create(self, **data):
+        payload = {
+            'provider_id': self.provider.id,
+            'service_id': self.service.id,
+            'service_location': {'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City'},
+            'add_on_ids': [add_on.id for add_on in self.add_ons],
+        }
+        payload.update(data)
+        return self.client.post(
+            reverse('create-mechanic-direct-request'), payload, content_type='application/json'
+        )
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_request_is_priced_from_the_menu(self):
+        self.client.get(reverse('get-mechanic-services', args=[self.provider.id]))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.create(add_on_ids=[self.add_ons[0].id, 999])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total_amount'], 1800.0)
+        self.assertEqual(DirectRequestAddOn.objects.get().service_add_on, self.add_ons[0])
+        catalog_reads = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith(('SELECT "services_', 'SELECT 1 AS "a" FROM "services_'))
+        ]
+        self.assertEqual(catalog_reads, [])
+
+    def test_services_outside_the_menu_are_refused(self):
+        other = Service.objects.create(name='Brakes', description='', price=900)
+        self.assertEqual(self.create(service_id=other.id).status_code, 400)
+        self.assertEqual(self.create(service_id=9999).status_code, 404)
+        self.assertEqual(self.create(provider_id=self.account.id).status_code, 400)
+        self.assertEqual(self.create(provider_id=9999).status_code, 404)
+
+
+class CreateDirectRequestTests(BookingsTestCase):
+    def test_catalog_rows_come_from_the_snapshot(self):
+        self.login(self.account)
+        payload = {
+            'provider_id': self.provider.id,
+            'service_id': self.service.id,
+            'service_location': {'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City'},
+            'add_on_ids': [add_on.id for add_on in self.add_ons] + [999],
+        }
+        url = reverse('create-direct-request')
+        self.client.post(url, payload, content_type='application/json')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(DirectRequestAddOn.objects.filter(request_id=response.data['request_id']).count(), 2)
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "services_' in q['sql']])
+        payload['service_id'] = 999
+        self.assertEqual(self.client.post(url, payload, content_type='application/json').status_code, 404)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class DeletedCatalogRowTests(TransactionTestCase):
+    """Requests built from a menu or snapshot read just before a deletion"""
+    def setUp(self):
+        cache.clear()
+        self.account = create_account('client')
+        Client.objects.create(account=self.account)
+        self.provider = create_account('provider')
+        self.service = Service.objects.create(name='Oil change', description='Full synthetic', price=1500)
+        MechanicService.objects.create(mechanic=Mechanic.objects.create(account=self.provider), service=self.service)
+        session = self.client.session
+        session['account_id'] = self.account.id
+        session.save()
+
+    def delete_service(self):
+        # As if the version bump had not reached this worker yet
+        with mock.patch('services.signals.bump_version_on_commit'):
+            Service.objects.filter(id=self.service.id).delete()
+
+    def post(self, name):
+        payload = {
+            'provider_id': self.provider.id,
+            'service_id': self.service.id,
+            'service_location': {'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City'},
+        }
+        return self.client.post(reverse(name), payload, content_type='application/json')
+
+    def test_stale_menu_is_refused(self):
+        self.client.get(reverse('get-mechanic-services', args=[self.provider.id]))
+        self.delete_service()
+
+        response = self.post('create-mechanic-direct-request')
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertFalse(Request.objects.exists())
+        self.assertFalse(ServiceLocation.objects.exists())
+
+    def test_stale_snapshot_is_refused(self):
+        get_catalog_snapshot()
+        self.delete_service()
+
+        response = self.post('create-direct-request')
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertFalse(Request.objects.exists())
+
+
+class ListClientBookingsTests(BookingsTestCase):
+    def create_bookings(self, per_status):
+        requests = create_requests(
+            self.client_profile, self.provider, self.service, self.add_ons, per_status * len(BOOKING_STATUSES)
+        )
+        for i, req in enumerate(requests):
+            Booking.objects.create(request=req, status=BOOKING_STATUSES[i % len(BOOKING_STATUSES)], amount_fee=1500)
+
+    def test_grouped_mode_query_count_is_flat(self):
+        self.login(self.account)
+        url = reverse('list-client-bookings')
+
+        self.create_bookings(1)
+        small_count, _ = self.count_queries(url)
+        self.create_bookings(20)
+        large_count, response = self.count_queries(url)
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(response.data['total_count'], 105)
+        self.assertEqual(response.data['active']['count'], 21)
+        self.assertEqual(len(response.data['active']['bookings']), 21)
+
+    def test_grouped_mode_limit_trims_buckets_but_not_counts(self):
+        self.login(self.account)
+        self.create_bookings(4)
+
+        _, response = self.count_queries(reverse('list-client-bookings'), limit=2)
+
+        for booking_status in BOOKING_STATUSES:
+            self.assertEqual(len(response.data[booking_status]['bookings']), 2)
+            self.assertEqual(response.data[booking_status]['count'], 4)
+        newest = response.data['active']['bookings']
+        self.assertGreater(newest[0]['id'], newest[1]['id'])
+
+
+class HomePageAddOnsTests(BookingsTestCase):
+    def test_add_ons_for_whole_page_load_in_one_query(self):
+        self.login(self.account)
+        requests = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 30)
+        for req in requests[:6]:
+            Booking.objects.create(request=req, status='active', amount_fee=1500)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home-page'))
+
+        add_on_queries = [q for q in ctx.captured_queries if 'bookings_directrequestaddon' in q['sql']]
+        self.assertEqual(len(add_on_queries), 1)
+        pending_direct = [
+            req for req in response.data['pending_requests'] if req['request_type'] == 'direct'
+        ]
+        self.assertEqual(len(pending_direct[0]['request_details']['add_ons']), 2)
+
+
+def full_table_scans(sql):
+    """Return the plan lines of `sql` that read a bookings table without using an index"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[3] for row in cursor.fetchall() if row[3].startswith('SCAN bookings_')]
+        if connection.vendor == 'postgresql':
+            # With sequential scans disabled, any left in the plan had no usable index
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return [row[0] for row in cursor.fetchall() if 'Seq Scan on bookings_' in row[0]]
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql)
+            columns = [column[0] for column in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [
+                f"{row['table']}: {row['type']}" for row in plan
+                if row['type'] == 'ALL' and str(row['table']).startswith('bookings_')
+            ]
+    return []
+
+
+class HotQueryPlanTests(BookingsTestCase):
+    def setUp(self):
+        super().setUp()
+        other = Client.objects.create(account=create_account('other'))
+        for client in (self.client_profile, other):
+            requests = create_requests(client, self.provider, self.service, self.add_ons, 150)
+            for i, req in enumerate(requests[:100]):
+                Booking.objects.create(
+                    request=req, status=BOOKING_STATUSES[i % len(BOOKING_STATUSES)], amount_fee=1500
+                )
+
+    def test_hot_endpoints_avoid_full_table_scans(self):
+        self.login(self.account)
+        for name in ['home-page', 'list-requests', 'list-client-bookings']:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+
+            for query in ctx.captured_queries:
+                if 'bookings_' in query['sql'] and query['sql'].startswith('SELECT'):
+                    self.assertEqual(full_table_scans(query['sql']), [], (name, query['sql']))
+
+
+class RequestLifecycleStatusTests(BookingsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.custom, self.direct, self.emergency = create_requests(
+            self.client_profile, self.provider, self.service, self.add_ons, 3
+        )
+
+    def status_of(self, req):
+        return Request.objects.values_list('request_status', flat=True).get(id=req.id)
+
+    def test_status_follows_subtype_and_booking(self):
+        custom = self.custom.customrequest
+        custom.request_status = CustomRequest.Status.QUOTED
+        custom.save()
+        self.assertEqual(self.status_of(self.custom), Request.Status.QUOTED)
+
+        booking = Booking.objects.create(request=self.custom, amount_fee=1500)
+        self.assertEqual(self.status_of(self.custom), Request.Status.BOOKED)
+
+        custom.request_status = CustomRequest.Status.REJECTED
+        custom.save()
+        self.assertEqual(self.status_of(self.custom), Request.Status.BOOKED)
+
+        booking.delete()
+        self.assertEqual(self.status_of(self.custom), Request.Status.REJECTED)
+
+    def test_home_page_lists_only_pending_requests(self):
+        self.login(self.account)
+        direct = self.direct.directrequest
+        direct.request_status = DirectRequest.Status.ACCEPTED
+        direct.save()
+        Booking.objects.create(request=self.emergency, amount_fee=500)
+
+        response = self.client.get(reverse('home-page'))
+
+        self.assertEqual([req['id'] for req in response.data['pending_requests']], [self.custom.id])
+
+    def test_backfill_command(self):
+        DirectRequest.objects.filter(request=self.direct).update(request_status=DirectRequest.Status.REJECTED)
+        Booking.objects.bulk_create([Booking(request=self.emergency, amount_fee=500)])
+
+        call_command('backfill_request_status', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(self.status_of(self.custom), Request.Status.PENDING)
+        self.assertEqual(self.status_of(self.direct), Request.Status.REJECTED)
+        self.assertEqual(self.status_of(self.emergency), Request.Status.BOOKED)
+
+    def test_backfill_migration(self):
+        backfill = import_module('bookings.migrations.0007_backfill_request_status').backfill_request_status
+        DirectRequest.objects.filter(request=self.direct).update(request_status=DirectRequest.Status.REJECTED)
+        Booking.objects.bulk_create([Booking(request=self.emergency, amount_fee=500)])
+        get_dashboard_summary(Account.objects.get(id=self.account.id))
+        self.assertTrue(DashboardSummary.objects.exists())
+
+        # RunPython only reads the connection of its schema editor
+        backfill(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(self.status_of(self.direct), Request.Status.REJECTED)
+        self.assertEqual(self.status_of(self.emergency), Request.Status.BOOKED)
+        self.assertFalse(DashboardSummary.objects.exists())
+
+
+class DashboardSummaryTests(BookingsTestCase):
+    def summary_of(self, account):
+        return DashboardSummary.objects.get(account=account)
+
+    def build_summaries(self):
+        """Build the summaries of the client and provider, as their first home page read does"""
+        for account in Account.objects.filter(id__in=[self.account.id, self.provider.id]):
+            get_dashboard_summary(account)
+
+    def test_summary_follows_requests_and_bookings(self):
+        Mechanic.objects.create(account=self.provider)
+        self.build_summaries()
+        custom, direct = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 2)
+        self.assertEqual(self.summary_of(self.account).pending_request_ids, [direct.id, custom.id])
+        self.assertEqual(self.summary_of(self.provider).pending_request_count, 2)
+
+        subtype = direct.directrequest
+        subtype.request_status = DirectRequest.Status.ACCEPTED
+        subtype.save()
+        self.assertEqual(self.summary_of(self.account).pending_request_ids, [custom.id])
+
+        booking = Booking.objects.create(request=custom, status='active', amount_fee=1500)
+        for account in (self.account, self.provider):
+            summary = self.summary_of(account)
+            self.assertEqual(summary.current_booking_ids, [booking.id])
+            self.assertEqual(summary.pending_request_count, 0)
+
+        booking.status = 'completed'
+        booking.save()
+        self.assertEqual(self.summary_of(self.account).current_booking_count, 0)
+
+        custom.delete()
+        self.assertEqual(self.summary_of(self.account).current_booking_ids, [])
+
+    def test_home_page_lists_newest_page_with_full_counts(self):
+        self.login(self.account)
+        requests = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 60)
+        for req in requests[:30]:
+            Booking.objects.create(request=req, status='active', amount_fee=1500)
+
+        response = self.client.get(reverse('home-page'))
+
+        self.assertEqual(response.data['current_booking_count'], 30)
+        self.assertEqual(response.data['pending_request_count'], 30)
+        self.assertEqual(len(response.data['current_bookings']), DASHBOARD_SIZE)
+        self.assertEqual(
+            [req['id'] for req in response.data['pending_requests']],
+            [req.id for req in reversed(requests[30:])][:DASHBOARD_SIZE]
+        )
+
+    def test_home_page_query_count_is_flat(self):
+        self.login(self.account)
+        requests = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 6)
+        for req in requests[:3]:
+            Booking.objects.create(request=req, status='active', amount_fee=1500)
+        # The first read builds the summary; later reads only look it up
+        self.client.get(reverse('home-page'))
+        small, _ = self.count_queries(reverse('home-page'))
+
+        requests = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 200)
+        for req in requests[:100]:
+            Booking.objects.create(request=req, status='active', amount_fee=1500)
+        large, _ = self.count_queries(reverse('home-page'))
+
+        self.assertEqual(large, small)
+
+    def test_saves_move_the_summaries_like_a_rebuild(self):
+        Mechanic.objects.create(account=self.provider)
+        self.build_summaries()
+        requests = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 30)
+        for req in requests[:25]:
+            Booking.objects.create(request=req, status='active', amount_fee=1500)
+        for subtype in DirectRequest.objects.filter(request__in=requests[25:]):
+            subtype.request_status = DirectRequest.Status.ACCEPTED
+            subtype.save()
+        booking = requests[0].booking
+        booking.status = 'completed'
+        booking.save()
+        requests[1].booking.delete()
+
+        for account in (self.account, self.provider):
+            summary = self.summary_of(account)
+            rebuilt = refresh_dashboard(Account.objects.get(id=account.id))
+            for field in ('current_booking_count', 'pending_request_count', 'current_booking_ids', 'pending_request_ids'):
+                self.assertEqual(getattr(summary, field), getattr(rebuilt, field), field)
+
+    def test_saves_that_change_no_list_write_nothing(self):
+        Mechanic.objects.create(account=self.provider)
+        self.build_summaries()
+        req, = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 1)
+        with CaptureQueriesContext(connection) as ctx:
+            req.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'bookings_dashboardsummary' in q['sql']])
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ACTION='raise')
+    def test_request_creation_updates_summaries_in_place(self):
+        Mechanic.objects.create(account=self.provider)
+        MechanicService.objects.create(mechanic=self.provider.mechanic, service=self.service)
+        create_requests(self.client_profile, self.provider, self.service, self.add_ons, 1)
+        self.build_summaries()
+        self.login(self.account)
+        payload = {
+            'provider_id': self.provider.id,
+            'service_id': self.service.id,
+            'service_location': {'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City'},
+            'add_on_ids': [add_on.id for add_on in self.add_ons],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('create-mechanic-direct-request'), payload, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertNotIn('X-Query-Budget', response)
+        # One read of both summaries and one UPDATE each, no rebuild
+        summary_queries = [q for q in ctx.captured_queries if 'bookings_dashboardsummary' in q['sql']]
+        self.assertEqual(len(summary_queries), 3)
+        self.assertEqual(self.summary_of(self.provider).pending_request_ids[0], response.data['request_id'])
+        self.assertEqual(self.summary_of(self.account).pending_request_count, 2)
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ACTION='raise')
+    def test_writes_leave_missing_summaries_to_the_first_read(self):
+        Mechanic.objects.create(account=self.provider)
+        MechanicService.objects.create(mechanic=self.provider.mechanic, service=self.service)
+        create_requests(self.client_profile, self.provider, self.service, self.add_ons, 1)
+        self.login(self.account)
+        payload = {
+            'provider_id': self.provider.id,
+            'service_id': self.service.id,
+            'service_location': {'street_name': 'Rizal St', 'barangay': 'Poblacion', 'city_municipality': 'Davao City'},
+            'add_on_ids': [add_on.id for add_on in self.add_ons],
+        }
+        response = self.client.post(
+            reverse('create-mechanic-direct-request'), payload, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertNotIn('X-Query-Budget', response)
+        self.assertFalse(DashboardSummary.objects.exists())
+
+        response = self.client.get(reverse('home-page'))
+        self.assertEqual(response.data['pending_request_count'], 2)
+        self.assertEqual(self.summary_of(self.account).pending_request_count, 2)
+
+    def test_rebuild_command_restores_bulk_changes(self):
+        self.login(self.account)
+        req, = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 1)
+        self.build_summaries()
+        Booking.objects.bulk_create([Booking(request=req, status='active', amount_fee=1500)])
+        self.assertEqual(self.summary_of(self.account).current_booking_count, 0)
+
+        call_command('rebuild_dashboards', stdout=StringIO())
+
+        self.assertEqual(self.summary_of(self.account).current_booking_count, 1)
+
+
+class KeysetPaginationTests(BookingsTestCase):
+    def test_pages_cover_every_request_once_at_constant_cost(self):
+        self.login(self.account)
+        create_requests(self.client_profile, self.provider, self.service, self.add_ons, 45)
+        url = reverse('list-requests')
+
+        seen, costs, cursor = [], [], ''
+        while True:
+            cost, response = self.count_queries(url, page_size=10, cursor=cursor)
+            costs.append(cost)
+            for key in ['custom_requests', 'direct_requests', 'emergency_requests']:
+                seen.extend(req['id'] for req in response.data[key])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(costs), 5)
+        self.assertEqual(sorted(seen), sorted(Request.objects.values_list('id', flat=True)))
+        self.assertEqual(len(set(costs[1:])), 1)
+
+    def test_no_cursor_keeps_full_listing(self):
+        self.login(self.account)
+        create_requests(self.client_profile, self.provider, self.service, self.add_ons, 30)
+        _, response = self.count_queries(reverse('list-requests'))
+        self.assertEqual(response.data['total_count'], 30)
+        self.assertNotIn('next_cursor', response.data)
+
+    def test_invalid_cursor_is_rejected(self):
+        self.login(self.account)
+        response = self.client.get(reverse('list-requests'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsetTests(BookingsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.account)
+        requests = create_requests(self.client_profile, self.provider, self.service, self.add_ons, 9)
+        for req in requests[:6]:
+            booking = Booking.objects.create(request=req, status='active', amount_fee=1500)
+            ActiveBooking.objects.create(booking=booking)
+
+    def capture(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [q['sql'] for q in ctx.captured_queries], response
+
+    def test_booking_list_trims_payload_and_query(self):
+        url = reverse('list-client-bookings')
+        full_sql, full = self.capture(url, status='active')
+        sparse_sql, sparse = self.capture(url, status='active', fields='status', expand='provider')
+
+        booking = sparse.data['bookings'][0]
+        self.assertEqual(set(booking), {'id', 'status', 'provider'})
+        self.assertEqual(booking['provider']['name'], 'Provider Tester')
+        self.assertIn('active_details', full.data['bookings'][0])
+        self.assertLess(len(sparse_sql), len(full_sql))
+        self.assertFalse(any('bookings_activebooking' in sql for sql in sparse_sql))
+        self.assertFalse(any('amount_fee' in sql for sql in sparse_sql))
+
+    def test_booking_detail_honours_fieldset(self):
+        booking = Booking.objects.first()
+        _, response = self.capture(
+            reverse('get-booking-detail', args=[booking.id]), fields='status,amount_fee'
+        )
+        self.assertEqual(response.data['booking'], {'id': booking.id, 'status': 'active', 'amount_fee': 1500.0})
+
+    def test_request_feed_trims_payload_and_query(self):
+        sql, response = self.capture(reverse('list-requests'), fields='status', expand='provider')
+
+        direct = response.data['direct_requests'][0]
+        self.assertEqual(set(direct), {'id', 'status', 'provider'})
+        self.assertEqual(set(response.data['emergency_requests'][0]), {'id', 'provider'})
+        self.assertFalse(any('bookings_directrequestaddon' in q for q in sql))
+        self.assertFalse(any('concern_picture' in q for q in sql))
+
+    def test_home_page_serializers_honour_fieldset(self):
+        sql, response = self.capture(reverse('home-page'), fields='status', expand='request,provider')
+
+        booking = response.data['current_bookings'][0]
+        self.assertEqual(set(booking), {'id', 'status', 'request'})
+        self.assertEqual(set(booking['request']), {'id', 'provider'})
+        self.assertEqual(set(response.data['pending_requests'][0]), {'id', 'provider'})
+        self.assertFalse(any('bookings_activebooking' in q for q in sql))
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('list-client-bookings'), {'fields': 'status,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.data['error'])
+
+
+def has_separate_replica():
+    """Whether DATABASES defines a replica that is its own database rather than a test mirror"""
+    replica = settings.DATABASES.get('replica')
+    return bool(replica) and not replica.get('TEST', {}).get('MIRROR')
+
+
+@skipUnless(has_separate_replica(), 'needs a separate "replica" database, e.g. a second SQLite file')
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRoutingTests(TestCase):
+    """
+    Run with DATABASES holding two databases, e.g. two SQLite files. Each
+    gets a different service so responses show which one served the read.
+    """
+    databases = {'default', 'replica'} if has_separate_replica() else {'default'}
+
+    def setUp(self):
+        Service.objects.create(name='Primary service', description='Written to default', price=100)
+        Service.objects.using('replica').create(name='Replica service', description='Replicated', price=100)
+
+    def service_names(self, **cookies):
+        self.client.cookies.load(cookies)
+        # Paged listings skip the catalog cache, which is always built from the primary
+        response = self.client.get(reverse('list_services'), {'page_size': 50})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [service['name'] for service in response.data['services']]
+
+    def test_replica_safe_views_read_from_replica(self):
+        self.assertEqual(self.service_names(), ['Replica service'])
+
+    def test_reads_after_a_write_use_primary(self):
+        @replica_read
+        def write_then_read(request):
+            Service.objects.create(name='New service', description='Just written', price=100)
+            return HttpResponse(','.join(sorted(Service.objects.values_list('name', flat=True))))
+
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        self.assertEqual(route(write_then_read, request).content, b'New service,Primary service')
+
+    def test_writers_are_pinned_to_primary(self):
+        def write(request):
+            Service.objects.create(name='New service', description='Just written', price=100)
+            return HttpResponse()
+
+        response = route(write, RequestFactory().post('/'))
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(
+            response.cookies[PIN_COOKIE_NAME]['max-age'], settings.REPLICA_PIN_SECONDS
+        )
+        self.assertEqual(
+            sorted(self.service_names(**{PIN_COOKIE_NAME: '1'})), ['New service', 'Primary service']
+        )
+
+
+def route(view, request):
+    """Run `view` behind ReplicaRoutingMiddleware the way the handler does"""
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    if not hasattr(request, 'session'):
+        request.session = {}
+    middleware = ReplicaRoutingMiddleware(get_response)
+    return middleware(request)
+
+
+def reads_from(request):
+    """View answering with the database its reads would use"""
+    return HttpResponse(router.db_for_read(Service))
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRouterTests(TestCase):
+    """
+    Routing decisions with a replica configured. Nothing connects to the
+    replica: the views only report where the router sends their reads.
+    """
+    def setUp(self):
+        patcher = mock.patch.dict(settings.DATABASES, {'replica': settings.DATABASES['default']})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_replica_safe_gets_read_from_replica(self):
+        safe_view = replica_read(lambda request: reads_from(request))
+        self.assertEqual(route(safe_view, RequestFactory().get('/')).content, b'replica')
+        self.assertEqual(route(safe_view, RequestFactory().head('/')).content, b'replica')
+        self.assertEqual(route(safe_view, RequestFactory().post('/')).content, b'default')
+        self.assertEqual(route(reads_from, RequestFactory().get('/')).content, b'default')
+
+    def test_reads_after_a_write_use_primary(self):
+        @replica_read
+        def write_then_read(request):
+            router.db_for_write(Service)
+            return reads_from(request)
+
+        response = route(write_then_read, RequestFactory().get('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]['max-age'], settings.REPLICA_PIN_SECONDS)
+
+    def test_pinned_clients_read_from_primary(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        self.assertEqual(route(replica_read(lambda request: reads_from(request)), request).content, b'default')
+
+    def test_routing_state_ends_with_the_request(self):
+        route(replica_read(lambda request: reads_from(request)), RequestFactory().get('/'))
+        self.assertEqual(router.db_for_read(Service), 'default')
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_no_replica_configured(self):
+        response = route(replica_read(lambda request: reads_from(request)), RequestFactory().get('/'))
+        self.assertEqual(response.content, b'default')
+
+        def write(request):
+            router.db_for_write(Service)
+            return HttpResponse()
+        self.assertNotIn(PIN_COOKIE_NAME, route(write, RequestFactory().post('/')).cookies)
@@ -2,16 +2,33 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Prefetch, Q
+from django.db.models import Count, F, Prefetch, Q, Window
+from django.db.models.functions import RowNumber
 
 from ..models import (
     Booking, Request, ActiveBooking, CancelBooking, 
     ReworkBooking, DisputeBooking, CompleteBooking
 )
 from ..serializers import BookingSerializer
+from ..fieldsets import FULL_FIELDSET, Fieldset, InvalidFieldset
+from users.middleware import get_session_account
+from MainBackend.pagination import InvalidCursor, wants_pagination, get_page_params, keyset_page
+from MainBackend.db_router import replica_read
+from MainBackend.query_budget import query_budget
+from MainBackend.conditional import conditional_get, table_state
 from users.models import Account
 
 
+# Booking statuses in the order they are returned by the grouped listing
+BOOKING_STATUSES = ['active', 'completed', 'cancelled', 'reworked', 'disputed']
+
+# Keys a client can pick with ?fields= and sections it can pick with ?expand=
+BOOKING_FIELDS = ['id', 'status', 'amount_fee', 'booked_at', 'updated_at', 'completed_at']
+BOOKING_SECTIONS = ['request', 'provider', 'service_location', 'details']
+
+
+@query_budget(12)
+@replica_read
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_client_bookings(request):
@@ -21,6 +38,15 @@ def list_client_bookings(request):
     Query Parameters:
     - status: Filter by booking status (active, completed, cancelled, reworked, disputed)
               If not provided, returns all bookings grouped by status
+    - limit: Only used when grouped. Maximum number of bookings returned per
+             status; counts still reflect every booking.
+    - cursor, page_size: Only used with status. Return one page of bookings,
+             newest first, plus a next_cursor for the following page.
+    - fields: Comma-separated booking keys to return (id is always included)
+    - expand: Comma-separated sections to include: request, provider,
+              service_location, details (status-specific details)
+              e.g. ?fields=status&expand=provider for a list screen.
+              Without fields or expand every key and section is returned.
     
     Returns bookings with full details including:
     - Request information (service location, provider details)
@@ -36,7 +62,7 @@ def list_client_bookings(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         # Check if user is a client
         if not hasattr(account, 'client'):
@@ -45,80 +71,61 @@ def list_client_bookings(request):
             }, status=status.HTTP_403_FORBIDDEN)
         
         client = account.client
+        fieldset = Fieldset.from_request(request, BOOKING_FIELDS, BOOKING_SECTIONS)
         
         # Get status filter from query params
         status_filter = request.query_params.get('status', None)
         
         # Base queryset - all bookings for this client
-        bookings_queryset = Booking.objects.filter(
-            request__client=client
-        ).select_related(
-            'request',
-            'request__client',
-            'request__client__account',
-            'request__provider',
-            'request__service_location'
-        ).prefetch_related(
-            Prefetch('activebooking', queryset=ActiveBooking.objects.all()),
-            Prefetch('cancelbooking', queryset=CancelBooking.objects.select_related('cancelled_by')),
-            Prefetch('reworkbooking', queryset=ReworkBooking.objects.select_related('requested_by')),
-            Prefetch('disputebooking', queryset=DisputeBooking.objects.select_related(
-                'complainer', 'complaint_against', 'admin'
-            )),
-            Prefetch('completebooking', queryset=CompleteBooking.objects.all())
-        ).order_by('-booked_at')
+        bookings_queryset = _client_bookings_queryset(client, fieldset).order_by('-booked_at', '-id')
         
         # Apply status filter if provided
         if status_filter:
-            valid_statuses = ['active', 'completed', 'cancelled', 'reworked', 'disputed']
-            if status_filter.lower() not in valid_statuses:
+            if status_filter.lower() not in BOOKING_STATUSES:
                 return Response({
-                    'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'
+                    'error': f'Invalid status. Must be one of: {", ".join(BOOKING_STATUSES)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             bookings_queryset = bookings_queryset.filter(status=status_filter.lower())
             
+            next_cursor = None
+            if wants_pagination(request):
+                bookings_queryset, next_cursor = keyset_page(
+                    bookings_queryset, **get_page_params(request), field='booked_at'
+                )
+            
             # Serialize and return filtered bookings
-            bookings_data = _serialize_bookings(bookings_queryset)
+            bookings_data = _serialize_bookings(bookings_queryset, fieldset)
             
-            return Response({
+            response_data = {
                 'status': status_filter.lower(),
                 'bookings': bookings_data,
                 'count': len(bookings_data)
-            }, status=status.HTTP_200_OK)
+            }
+            if wants_pagination(request):
+                response_data['next_cursor'] = next_cursor
+            
+            return Response(response_data, status=status.HTTP_200_OK)
         
         # If no filter, return bookings grouped by status
         else:
-            active_bookings = bookings_queryset.filter(status='active')
-            completed_bookings = bookings_queryset.filter(status='completed')
-            cancelled_bookings = bookings_queryset.filter(status='cancelled')
-            reworked_bookings = bookings_queryset.filter(status='reworked')
-            disputed_bookings = bookings_queryset.filter(status='disputed')
+            limit = request.query_params.get('limit')
+            if limit is not None:
+                if not limit.isdigit() or int(limit) < 1:
+                    return Response({
+                        'error': 'limit must be a positive integer'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                limit = int(limit)
             
-            return Response({
-                'active': {
-                    'bookings': _serialize_bookings(active_bookings),
-                    'count': active_bookings.count()
-                },
-                'completed': {
-                    'bookings': _serialize_bookings(completed_bookings),
-                    'count': completed_bookings.count()
-                },
-                'cancelled': {
-                    'bookings': _serialize_bookings(cancelled_bookings),
-                    'count': cancelled_bookings.count()
-                },
-                'reworked': {
-                    'bookings': _serialize_bookings(reworked_bookings),
-                    'count': reworked_bookings.count()
-                },
-                'disputed': {
-                    'bookings': _serialize_bookings(disputed_bookings),
-                    'count': disputed_bookings.count()
-                },
-                'total_count': bookings_queryset.count()
-            }, status=status.HTTP_200_OK)
+            return Response(
+                _group_bookings_by_status(client, bookings_queryset, limit, fieldset),
+                status=status.HTTP_200_OK
+            )
     
+    except (InvalidCursor, InvalidFieldset) as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Account.DoesNotExist:
         return Response({
             'error': 'Account not found'
@@ -129,6 +136,24 @@ def list_client_bookings(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _booking_detail_states(request, booking_id):
+    """
+    Helper function returning the validator states of a client's booking.
+    Saving a booking's status detail row touches Booking.updated_at (see
+    bookings.signals).
+    """
+    account_id = request.session.get('account_id')
+    if not account_id:
+        return None
+    return [table_state(
+        Booking.objects.filter(id=booking_id, request__client__account_id=account_id),
+        'updated_at', 'request__provider__updated_at'
+    )]
+
+
+@query_budget(11)
+@replica_read
+@conditional_get(_booking_detail_states)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_booking_detail(request, booking_id):
@@ -138,7 +163,11 @@ def get_booking_detail(request, booking_id):
     Path Parameters:
     - booking_id: ID of the booking to retrieve
     
+    Query Parameters:
+    - fields, expand: Trim the booking as in list_client_bookings
+    
     Returns complete booking details with all related information.
+    Supports conditional GET (ETag / Last-Modified).
     """
     # Get account_id from session
     account_id = request.session.get('account_id')
@@ -149,7 +178,7 @@ def get_booking_detail(request, booking_id):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         # Check if user is a client
         if not hasattr(account, 'client'):
@@ -158,31 +187,22 @@ def get_booking_detail(request, booking_id):
             }, status=status.HTTP_403_FORBIDDEN)
         
         client = account.client
+        fieldset = Fieldset.from_request(request, BOOKING_FIELDS, BOOKING_SECTIONS)
         
         # Get booking and verify it belongs to this client
-        booking = Booking.objects.select_related(
-            'request',
-            'request__client',
-            'request__client__account',
-            'request__provider',
-            'request__service_location'
-        ).prefetch_related(
-            Prefetch('activebooking', queryset=ActiveBooking.objects.all()),
-            Prefetch('cancelbooking', queryset=CancelBooking.objects.select_related('cancelled_by')),
-            Prefetch('reworkbooking', queryset=ReworkBooking.objects.select_related('requested_by')),
-            Prefetch('disputebooking', queryset=DisputeBooking.objects.select_related(
-                'complainer', 'complaint_against', 'admin'
-            )),
-            Prefetch('completebooking', queryset=CompleteBooking.objects.all())
-        ).get(id=booking_id, request__client=client)
+        booking = _client_bookings_queryset(client, fieldset).get(id=booking_id)
         
         # Serialize booking
-        booking_data = _serialize_single_booking(booking)
+        booking_data = _serialize_single_booking(booking, fieldset)
         
         return Response({
             'booking': booking_data
         }, status=status.HTTP_200_OK)
     
+    except InvalidFieldset as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Account.DoesNotExist:
         return Response({
             'error': 'Account not found'
@@ -197,43 +217,138 @@ def get_booking_detail(request, booking_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _serialize_bookings(bookings_queryset):
+def _client_bookings_queryset(client, fieldset=FULL_FIELDSET):
+    """
+    Helper function returning a client's bookings with the details `fieldset`
+    asks for loaded.
+    
+    Joins and prefetches behind sections that were not expanded are skipped,
+    and a trimmed fieldset only selects the columns it serializes.
+    """
+    bookings = Booking.objects.filter(request__client=client)
+    
+    related = []
+    columns = ['id', 'status', 'booked_at']
+    columns += [key for key in BOOKING_FIELDS if key != 'id' and fieldset.wants(key)]
+    if fieldset.expands('request'):
+        related.append('request')
+        columns += ['request__id', 'request__request_type', 'request__created_at']
+    if fieldset.expands('provider'):
+        related.append('request__provider')
+        columns += ['request__provider__id', 'request__provider__firstname',
+                    'request__provider__lastname', 'request__provider__email']
+    if fieldset.expands('service_location'):
+        related.append('request__service_location')
+        columns += ['request__service_location__' + column for column in (
+            'id', 'street_name', 'subdivision_village', 'barangay', 'city_municipality', 'landmark'
+        )]
+    if related:
+        bookings = bookings.select_related(*related)
+        columns.append('request')
+    if not fieldset.is_full:
+        bookings = bookings.only(*columns)
+    
+    if fieldset.expands('details'):
+        bookings = bookings.prefetch_related(
+            Prefetch('activebooking', queryset=ActiveBooking.objects.all()),
+            Prefetch('cancelbooking', queryset=CancelBooking.objects.select_related('cancelled_by')),
+            Prefetch('reworkbooking', queryset=ReworkBooking.objects.select_related('requested_by')),
+            Prefetch('disputebooking', queryset=DisputeBooking.objects.select_related(
+                'complainer', 'complaint_against', 'admin'
+            )),
+            Prefetch('completebooking', queryset=CompleteBooking.objects.all())
+        )
+    return bookings
+
+
+def _group_bookings_by_status(client, bookings_queryset, limit=None, fieldset=FULL_FIELDSET):
+    """
+    Helper function to build the grouped booking listing.
+    
+    Bookings are fetched once and bucketed in Python, and every count comes
+    from a single conditional aggregate. With a limit, only the newest
+    `limit` bookings of each status are fetched.
+    """
+    if limit:
+        bookings_queryset = bookings_queryset.annotate(
+            status_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('status')],
+                order_by=[F('booked_at').desc(), F('id').desc()]
+            )
+        ).filter(status_rank__lte=limit)
+    
+    buckets = {booking_status: [] for booking_status in BOOKING_STATUSES}
+    for booking in bookings_queryset:
+        if booking.status in buckets:
+            buckets[booking.status].append(_serialize_single_booking(booking, fieldset))
+    
+    counts = Booking.objects.filter(request__client=client).aggregate(
+        total_count=Count('id'),
+        **{
+            booking_status: Count('id', filter=Q(status=booking_status))
+            for booking_status in BOOKING_STATUSES
+        }
+    )
+    
+    grouped = {
+        booking_status: {
+            'bookings': buckets[booking_status],
+            'count': counts[booking_status]
+        }
+        for booking_status in BOOKING_STATUSES
+    }
+    grouped['total_count'] = counts['total_count']
+    return grouped
+
+
+def _serialize_bookings(bookings_queryset, fieldset=FULL_FIELDSET):
     """Helper function to serialize a queryset of bookings"""
     bookings_data = []
     
     for booking in bookings_queryset:
-        bookings_data.append(_serialize_single_booking(booking))
+        bookings_data.append(_serialize_single_booking(booking, fieldset))
     
     return bookings_data
 
 
-def _serialize_single_booking(booking):
-    """Helper function to serialize a single booking with all details"""
-    booking_data = {
-        'id': booking.id,
-        'status': booking.status,
-        'amount_fee': float(booking.amount_fee),
-        'booked_at': booking.booked_at.isoformat(),
-        'updated_at': booking.updated_at.isoformat(),
-        'completed_at': booking.completed_at.isoformat() if booking.completed_at else None,
-        'request': {
+def _serialize_single_booking(booking, fieldset=FULL_FIELDSET):
+    """Helper function to serialize a single booking with the details `fieldset` asks for"""
+    booking_data = {'id': booking.id}
+    if fieldset.wants('status'):
+        booking_data['status'] = booking.status
+    if fieldset.wants('amount_fee'):
+        booking_data['amount_fee'] = float(booking.amount_fee)
+    if fieldset.wants('booked_at'):
+        booking_data['booked_at'] = booking.booked_at.isoformat()
+    if fieldset.wants('updated_at'):
+        booking_data['updated_at'] = booking.updated_at.isoformat()
+    if fieldset.wants('completed_at'):
+        booking_data['completed_at'] = booking.completed_at.isoformat() if booking.completed_at else None
+    
+    if fieldset.expands('request'):
+        booking_data['request'] = {
             'id': booking.request.id,
             'type': booking.request.request_type,
             'created_at': booking.request.created_at.isoformat(),
-        },
-        'provider': {
+        }
+    if fieldset.expands('provider'):
+        booking_data['provider'] = {
             'id': booking.request.provider.id,
             'name': f"{booking.request.provider.firstname} {booking.request.provider.lastname}",
             'email': booking.request.provider.email,
-        } if booking.request.provider else None,
-        'service_location': {
+        } if booking.request.provider else None
+    if fieldset.expands('service_location'):
+        booking_data['service_location'] = {
             'street_name': booking.request.service_location.street_name,
             'subdivision_village': booking.request.service_location.subdivision_village,
             'barangay': booking.request.service_location.barangay,
             'city_municipality': booking.request.service_location.city_municipality,
             'landmark': booking.request.service_location.landmark,
-        } if booking.request.service_location else None,
-    }
+        } if booking.request.service_location else None
+    
+    if not fieldset.expands('details'):
+        return booking_data
     
     # Add status-specific details
     if booking.status == 'active' and hasattr(booking, 'activebooking'):
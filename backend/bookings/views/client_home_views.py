@@ -8,16 +8,41 @@ from ..models import (
     Booking, Request, CustomRequest, DirectRequest, EmergencyRequest, 
     ActiveBooking
 )
-from ..serializers import BookingSerializer, RequestSerializer
+from ..dashboard import CURRENT_BOOKING_STATUSES, get_dashboard_summary
+from ..serializers import (
+    BookingSerializer, RequestSerializer, request_add_ons_context, FIELDSET_CONTEXT_KEY
+)
+from ..fieldsets import Fieldset, InvalidFieldset
+from users.middleware import get_session_account
+from MainBackend.query_budget import query_budget
 from users.models import Account
 
 
+# Keys a client can pick with ?fields= and sections it can pick with ?expand=
+HOME_FIELDS = [
+    'id', 'status', 'amount_fee', 'booked_at', 'updated_at', 'completed_at',
+    'request_type', 'created_at'
+]
+HOME_SECTIONS = ['request', 'client', 'provider', 'service_location', 'details']
+
+
+# An account's first read builds its dashboard summary, about ten queries
+@query_budget(25)
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Changed to AllowAny for testing
 def home_page(request):
     """
     Get current bookings and pending requests for the authenticated user.
     Works for clients, mechanics, and shop owners.
+    
+    Served from the account's dashboard summary: the newest 20 of each are
+    listed, and current_booking_count / pending_request_count give the totals.
+    
+    Query Parameters:
+    - fields: Comma-separated booking/request keys to return (id is always included)
+    - expand: Comma-separated sections to include: request, client, provider,
+              service_location, details (booking and request details)
+              Without fields or expand every key and section is returned.
     """
     # Get account_id from session
     account_id = request.session.get('account_id')
@@ -31,7 +56,7 @@ def home_page(request):
         }, status=status.HTTP_200_OK)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
     except Account.DoesNotExist:
         return Response({
             'current_bookings': [],
@@ -39,149 +64,68 @@ def home_page(request):
             'error': 'Account not found'
         }, status=status.HTTP_200_OK)
     
-    # Determine user type and get relevant data
     try:
-        # Check if user is a client
-        if hasattr(account, 'client'):
-            client = account.client
-            
-            # Get current bookings (active, reworked)
-            current_bookings = Booking.objects.filter(
-                request__client=client,
-                status__in=['active', 'reworked']
-            ).select_related(
-                'request',
-                'request__client',
-                'request__client__account',
-                'request__provider',
-                'request__service_location'
-            ).prefetch_related(
-                Prefetch('activebooking', queryset=ActiveBooking.objects.all())
-            ).order_by('-booked_at')
-            
-            # Get pending requests (custom: pending/quoted, direct: pending, emergency)
-            pending_requests = Request.objects.filter(
-                client=client
-            ).exclude(
-                # Exclude requests that already have bookings
-                booking__isnull=False
-            ).select_related(
-                'client',
-                'client__account',
-                'provider',
-                'service_location'
-            ).prefetch_related(
-                Prefetch('customrequest', queryset=CustomRequest.objects.filter(
-                    request_status__in=['pending', 'quoted']
-                )),
-                Prefetch('directrequest', queryset=DirectRequest.objects.filter(
-                    request_status='pending'
-                )),
-                Prefetch('emergencyrequest', queryset=EmergencyRequest.objects.all())
-            ).order_by('-created_at')
-            
-            # Filter to only include requests with pending status
-            filtered_pending_requests = []
-            for req in pending_requests:
-                if req.request_type == 'custom':
-                    if hasattr(req, 'customrequest') and req.customrequest.request_status in ['pending', 'quoted']:
-                        filtered_pending_requests.append(req)
-                elif req.request_type == 'direct':
-                    if hasattr(req, 'directrequest') and req.directrequest.request_status == 'pending':
-                        filtered_pending_requests.append(req)
-                elif req.request_type == 'emergency':
-                    if hasattr(req, 'emergencyrequest'):
-                        filtered_pending_requests.append(req)
-        
-        # Check if user is a mechanic
-        elif hasattr(account, 'mechanic'):
-            mechanic = account.mechanic
-            
-            # Get current bookings where mechanic is the provider
-            current_bookings = Booking.objects.filter(
-                request__provider=account,
-                status__in=['active', 'reworked']
-            ).select_related(
-                'request',
-                'request__client',
-                'request__client__account',
-                'request__provider',
-                'request__service_location'
-            ).prefetch_related(
-                Prefetch('activebooking', queryset=ActiveBooking.objects.all())
-            ).order_by('-booked_at')
-            
-            # Get pending requests assigned to this mechanic
-            pending_requests = Request.objects.filter(
-                provider=account
-            ).exclude(
-                booking__isnull=False
-            ).select_related(
-                'client',
-                'client__account',
-                'provider',
-                'service_location'
-            ).prefetch_related(
-                Prefetch('customrequest', queryset=CustomRequest.objects.filter(
-                    request_status='pending'
-                )),
-                Prefetch('directrequest', queryset=DirectRequest.objects.filter(
-                    request_status='pending'
-                )),
-                Prefetch('emergencyrequest', queryset=EmergencyRequest.objects.all())
-            ).order_by('-created_at')
-            
-            filtered_pending_requests = list(pending_requests)
-        
-        # Check if user is a shop owner
-        elif hasattr(account, 'shopowner'):
-            shop_owner = account.shopowner
-            
-            # Get current bookings where shop owner is the provider
-            current_bookings = Booking.objects.filter(
-                request__provider=account,
-                status__in=['active', 'reworked']
-            ).select_related(
-                'request',
-                'request__client',
-                'request__client__account',
-                'request__provider',
-                'request__service_location'
-            ).prefetch_related(
-                Prefetch('activebooking', queryset=ActiveBooking.objects.all())
-            ).order_by('-booked_at')
-            
-            # Get pending requests assigned to this shop owner
-            pending_requests = Request.objects.filter(
-                provider=account
-            ).exclude(
-                booking__isnull=False
-            ).select_related(
-                'client',
-                'client__account',
-                'provider',
-                'service_location'
-            ).prefetch_related(
-                Prefetch('customrequest', queryset=CustomRequest.objects.filter(
-                    request_status='pending'
-                )),
-                Prefetch('directrequest', queryset=DirectRequest.objects.filter(
-                    request_status='pending'
-                )),
-                Prefetch('emergencyrequest', queryset=EmergencyRequest.objects.all())
-            ).order_by('-created_at')
-            
-            filtered_pending_requests = list(pending_requests)
-        
-        else:
+        fieldset = Fieldset.from_request(request, HOME_FIELDS, HOME_SECTIONS)
+    except InvalidFieldset as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # One indexed lookup of the materialized summary (see bookings.dashboard)
+        summary = get_dashboard_summary(account)
+        if summary is None:
             return Response({
                 'error': 'User does not have a valid role (client, mechanic, or shop owner)'
             }, status=status.HTTP_403_FORBIDDEN)
         
+        # Hydrate the bounded id lists, keeping the summary's newest-first order
+        current_bookings = Booking.objects.filter(
+            id__in=summary.current_booking_ids,
+            status__in=CURRENT_BOOKING_STATUSES
+        ).select_related(
+            'request',
+            'request__client',
+            'request__client__account',
+            'request__provider',
+            'request__service_location'
+        ).prefetch_related(
+            *_booking_prefetches()
+        )
+        
+        filtered_pending_requests = Request.objects.filter(
+            id__in=summary.pending_request_ids
+        ).select_related(
+            'client',
+            'client__account',
+            'provider',
+            'service_location'
+        ).prefetch_related(
+            Prefetch('customrequest', queryset=CustomRequest.objects.all()),
+            Prefetch('directrequest', queryset=DirectRequest.objects.select_related('service')),
+            Prefetch('emergencyrequest', queryset=EmergencyRequest.objects.all())
+        )
+        
+        current_bookings, filtered_pending_requests = _trim_to_fieldset(
+            current_bookings, filtered_pending_requests, fieldset
+        )
+        current_bookings = _in_id_order(current_bookings, summary.current_booking_ids)
+        filtered_pending_requests = _in_id_order(filtered_pending_requests, summary.pending_request_ids)
+        
+        # Load add-ons for every listed request in one query before serializing
+        context = {FIELDSET_CONTEXT_KEY: fieldset}
+        if fieldset.expands('details'):
+            context = request_add_ons_context(
+                [booking.request for booking in current_bookings] + filtered_pending_requests,
+                context
+            )
+        
         # Serialize the data
         data = {
-            'current_bookings': BookingSerializer(current_bookings, many=True).data,
-            'pending_requests': RequestSerializer(filtered_pending_requests, many=True).data
+            'current_bookings': BookingSerializer(current_bookings, many=True, context=context).data,
+            'pending_requests': RequestSerializer(filtered_pending_requests, many=True, context=context).data,
+            'current_booking_count': summary.current_booking_count,
+            'pending_request_count': summary.pending_request_count
         }
         
         return Response(data, status=status.HTTP_200_OK)
@@ -190,3 +134,51 @@ def home_page(request):
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _in_id_order(queryset, ids):
+    """Helper function returning the rows of `queryset` in the order of `ids`"""
+    position = {row_id: index for index, row_id in enumerate(ids)}
+    return sorted(queryset, key=lambda row: position[row.id])
+
+
+def _booking_prefetches():
+    """Helper function listing the related rows BookingSerializer reads for each booking"""
+    return [
+        Prefetch('activebooking', queryset=ActiveBooking.objects.all()),
+        Prefetch('request__customrequest', queryset=CustomRequest.objects.all()),
+        Prefetch('request__directrequest', queryset=DirectRequest.objects.select_related('service')),
+        Prefetch('request__emergencyrequest', queryset=EmergencyRequest.objects.all()),
+    ]
+
+
+def _trim_to_fieldset(bookings, requests, fieldset):
+    """
+    Helper function to drop the joins and prefetches behind the sections
+    `fieldset` leaves out of the booking and request querysets.
+    """
+    if fieldset.is_full:
+        return bookings, requests
+    
+    request_related = []
+    if fieldset.expands('client'):
+        request_related += ['client', 'client__account']
+    if fieldset.expands('provider'):
+        request_related.append('provider')
+    if fieldset.expands('service_location'):
+        request_related.append('service_location')
+    
+    booking_related = []
+    if fieldset.expands('request'):
+        booking_related = ['request'] + ['request__' + path for path in request_related]
+    
+    bookings = bookings.select_related(None)
+    if booking_related:
+        bookings = bookings.select_related(*booking_related)
+    requests = requests.select_related(None)
+    if request_related:
+        requests = requests.select_related(*request_related)
+    if not fieldset.expands('details'):
+        bookings = bookings.prefetch_related(None)
+        requests = requests.prefetch_related(None)
+    return bookings, requests
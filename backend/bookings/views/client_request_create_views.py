@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -7,8 +8,10 @@ from ..models import (
     Request, CustomRequest, DirectRequest, EmergencyRequest,
     ServiceLocation, DirectRequestAddOn
 )
+from users.middleware import get_session_account
 from users.models import Account
-from services.models import Service, ServiceAddOn
+from services.snapshot import get_catalog_snapshot
+from MainBackend.query_budget import query_budget
 
 
 @api_view(['POST'])
@@ -27,7 +30,7 @@ def create_custom_request(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         if not hasattr(account, 'client'):
             return Response({
@@ -58,29 +61,30 @@ def create_custom_request(request):
                     'error': 'Provider not found'
                 }, status=status.HTTP_404_NOT_FOUND)
         
-        # Create service location
-        service_location = ServiceLocation.objects.create(
-            street_name=service_location_data.get('street_name'),
-            subdivision_village=service_location_data.get('subdivision_village'),
-            barangay=service_location_data.get('barangay'),
-            city_municipality=service_location_data.get('city_municipality'),
-            landmark=service_location_data.get('landmark')
-        )
+        with transaction.atomic():
+            # Create service location
+            service_location = ServiceLocation.objects.create(
+                street_name=service_location_data.get('street_name'),
+                subdivision_village=service_location_data.get('subdivision_village'),
+                barangay=service_location_data.get('barangay'),
+                city_municipality=service_location_data.get('city_municipality'),
+                landmark=service_location_data.get('landmark')
+            )
         
-        # Create request
-        new_request = Request.objects.create(
-            client=client,
-            provider=provider,
-            request_type='custom',
-            service_location=service_location
-        )
+            # Create request
+            new_request = Request.objects.create(
+                client=client,
+                provider=provider,
+                request_type='custom',
+                service_location=service_location
+            )
         
-        # Create custom request
-        custom_request = CustomRequest.objects.create(
-            request=new_request,
-            description=description,
-            concern_picture=concern_picture
-        )
+            # Create custom request
+            custom_request = CustomRequest.objects.create(
+                request=new_request,
+                description=description,
+                concern_picture=concern_picture
+            )
         
         return Response({
             'message': 'Custom request created successfully',
@@ -92,12 +96,19 @@ def create_custom_request(request):
         return Response({
             'error': 'Account not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError:
+        # A row read before the request was created has since been deleted
+        return Response({
+            'error': 'The selected provider no longer exists'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Reloading this worker's catalog snapshot adds five queries
+@query_budget(24)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def create_direct_request(request):
@@ -114,7 +125,7 @@ def create_direct_request(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         if not hasattr(account, 'client'):
             return Response({
@@ -135,53 +146,54 @@ def create_direct_request(request):
                 'error': 'Provider, service, and service location are required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get provider and service
+        # Get provider, and the service and add-ons from the catalog snapshot
+        catalog = get_catalog_snapshot(request)
         try:
             provider = Account.objects.get(id=provider_id)
-            service = Service.objects.get(id=service_id)
         except Account.DoesNotExist:
             return Response({
                 'error': 'Provider not found'
             }, status=status.HTTP_404_NOT_FOUND)
-        except Service.DoesNotExist:
+        
+        service = catalog.get_service(service_id)
+        if service is None:
             return Response({
                 'error': 'Service not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Create service location
-        service_location = ServiceLocation.objects.create(
-            street_name=service_location_data.get('street_name'),
-            subdivision_village=service_location_data.get('subdivision_village'),
-            barangay=service_location_data.get('barangay'),
-            city_municipality=service_location_data.get('city_municipality'),
-            landmark=service_location_data.get('landmark')
-        )
+        # Skip invalid add-on IDs
+        add_ons = [catalog.get_add_on(add_on_id) for add_on_id in add_on_ids or []]
+        add_ons = [add_on for add_on in add_ons if add_on is not None]
+        
+        with transaction.atomic():
+            # Create service location
+            service_location = ServiceLocation.objects.create(
+                street_name=service_location_data.get('street_name'),
+                subdivision_village=service_location_data.get('subdivision_village'),
+                barangay=service_location_data.get('barangay'),
+                city_municipality=service_location_data.get('city_municipality'),
+                landmark=service_location_data.get('landmark')
+            )
         
-        # Create request
-        new_request = Request.objects.create(
-            client=client,
-            provider=provider,
-            request_type='direct',
-            service_location=service_location
-        )
+            # Create request
+            new_request = Request.objects.create(
+                client=client,
+                provider=provider,
+                request_type='direct',
+                service_location=service_location
+            )
         
-        # Create direct request
-        direct_request = DirectRequest.objects.create(
-            request=new_request,
-            service=service
-        )
+            # Create direct request
+            direct_request = DirectRequest.objects.create(
+                request=new_request,
+                service_id=service.id
+            )
         
-        # Add service add-ons if provided
-        if add_on_ids:
-            for add_on_id in add_on_ids:
-                try:
-                    add_on = ServiceAddOn.objects.get(id=add_on_id)
-                    DirectRequestAddOn.objects.create(
-                        request=new_request,
-                        service_add_on=add_on
-                    )
-                except ServiceAddOn.DoesNotExist:
-                    pass  # Skip invalid add-on IDs
+            # Add service add-ons if provided
+            DirectRequestAddOn.objects.bulk_create([
+                DirectRequestAddOn(request=new_request, service_add_on_id=add_on.id)
+                for add_on in add_ons
+            ])
         
         return Response({
             'message': 'Direct request created successfully',
@@ -193,6 +205,11 @@ def create_direct_request(request):
         return Response({
             'error': 'Account not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError:
+        # A row read before the request was created has since been deleted
+        return Response({
+            'error': 'The selected provider, service or add-on no longer exists'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
@@ -215,7 +232,7 @@ def create_emergency_request(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         if not hasattr(account, 'client'):
             return Response({
@@ -246,29 +263,30 @@ def create_emergency_request(request):
                     'error': 'Provider not found'
                 }, status=status.HTTP_404_NOT_FOUND)
         
-        # Create service location
-        service_location = ServiceLocation.objects.create(
-            street_name=service_location_data.get('street_name'),
-            subdivision_village=service_location_data.get('subdivision_village'),
-            barangay=service_location_data.get('barangay'),
-            city_municipality=service_location_data.get('city_municipality'),
-            landmark=service_location_data.get('landmark')
-        )
+        with transaction.atomic():
+            # Create service location
+            service_location = ServiceLocation.objects.create(
+                street_name=service_location_data.get('street_name'),
+                subdivision_village=service_location_data.get('subdivision_village'),
+                barangay=service_location_data.get('barangay'),
+                city_municipality=service_location_data.get('city_municipality'),
+                landmark=service_location_data.get('landmark')
+            )
         
-        # Create request
-        new_request = Request.objects.create(
-            client=client,
-            provider=provider,
-            request_type='emergency',
-            service_location=service_location
-        )
+            # Create request
+            new_request = Request.objects.create(
+                client=client,
+                provider=provider,
+                request_type='emergency',
+                service_location=service_location
+            )
         
-        # Create emergency request
-        emergency_request = EmergencyRequest.objects.create(
-            request=new_request,
-            description=description,
-            concern_picture=concern_picture
-        )
+            # Create emergency request
+            emergency_request = EmergencyRequest.objects.create(
+                request=new_request,
+                description=description,
+                concern_picture=concern_picture
+            )
         
         return Response({
             'message': 'Emergency request created successfully',
@@ -279,6 +297,11 @@ def create_emergency_request(request):
         return Response({
             'error': 'Account not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError:
+        # A row read before the request was created has since been deleted
+        return Response({
+            'error': 'The selected provider no longer exists'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
@@ -7,87 +7,124 @@ from ..models import (
     Request, DirectRequest, DirectRequestAddOn,
     ServiceLocation
 )
+from ..catalog import build_mechanic_catalog
+from users.middleware import get_session_account
+from MainBackend.pagination import InvalidCursor, wants_pagination, get_page_params
+from MainBackend.db_router import replica_read
+from MainBackend.query_budget import query_budget
+from MainBackend.single_flight import single_flight
+from MainBackend.conditional import conditional_get
 from users.models import Account, Mechanic
-from services.models import Service, ServiceAddOn, MechanicService
-from django.db.models import Q
+from services.models import Service, MechanicService
+from services.catalog import get_mechanic_menu, get_service_add_ons, find_menu_service
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
 
 
+@query_budget(6)
+@replica_read
 @api_view(['GET'])
+@single_flight
 @permission_classes([AllowAny])
 def get_mechanics(request):
     """
-    Get list of available mechanics with their services
+    Get list of available mechanics with their services.
+    Identical concurrent requests share one response (see MainBackend/single_flight.py).
+    
+    Query Parameters:
+    - service_id: Only mechanics offering this service
+    - status: Only mechanics with this status (available, working)
+    - shop_id: Only mechanics working for this shop
+    - cursor, page_size: Return one page of mechanics plus a next_cursor for
+      the following page. If neither is provided, all matching mechanics are returned.
     """
     try:
-        mechanics = Mechanic.objects.select_related('account').all()
+        filters = {}
+        for param in ['service_id', 'shop_id']:
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            if not value.isdigit() or int(value) < 1:
+                return Response({
+                    'error': f'{param} must be a positive integer'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            filters[param] = int(value)
         
-        mechanics_data = []
-        for mechanic in mechanics:
-            account = mechanic.account
-            
-            # Get mechanic services
-            mechanic_services = MechanicService.objects.filter(mechanic=mechanic).select_related('service')
-            services = [
-                {
-                    'id': ms.service.id,
-                    'name': ms.service.name,
-                    'price': float(ms.service.price)
-                }
-                for ms in mechanic_services
-            ]
-            
-            mechanics_data.append({
-                'id': account.id,
-                'name': f"{account.firstname} {account.lastname}",
-                'full_name': f"{account.lastname}, {account.firstname} {account.middlename or ''}".strip(),
-                'services': services
-            })
+        status_filter = request.query_params.get('status')
+        if status_filter is not None:
+            if status_filter.lower() not in Mechanic.Status.values:
+                return Response({
+                    'error': f'Invalid status. Must be one of: {", ".join(Mechanic.Status.values)}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            filters['status'] = status_filter.lower()
         
-        return Response({
-            'mechanics': mechanics_data
-        }, status=status.HTTP_200_OK)
+        if wants_pagination(request):
+            filters.update(paginate=True, **get_page_params(request))
+        
+        catalog = build_mechanic_catalog(**filters)
+        
+        return Response(catalog, status=status.HTTP_200_OK)
         
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _mechanic_services_states(request, mechanic_id):
+    """
+    Helper function returning the validator states of a mechanic's services.
+    MechanicService rows carry no timestamp, so their max id stands in for one.
+    """
+    aggregates = {
+        'count': Count('pk', distinct=True),
+        'last_id': Max('id'),
+        'newest': Max('service__updated_at'),
+    }
+    if 'addons' in request.GET.get('include', '').split(','):
+        aggregates['add_on_count'] = Count('service__serviceaddon', distinct=True)
+        aggregates['newest_add_on'] = Max('service__serviceaddon__updated_at')
+    state = MechanicService.objects.filter(mechanic__account_id=mechanic_id).aggregate(**aggregates)
+    return [tuple(state.values())]
+
+
+@query_budget(6)
+@replica_read
+@conditional_get(_mechanic_services_states, last_modified=False)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_mechanic_services(request, mechanic_id):
     """
-    Get services offered by a specific mechanic with their add-ons
+    Get services offered by a specific mechanic
+    
+    Query Parameters:
+    - include: Comma-separated extras to embed. Pass include=addons to get
+      each service's add-ons.
+    
+    Served from the mechanic's cached menu (see services/catalog.py).
+    Supports conditional GET (ETag).
     """
     try:
-        mechanic = Mechanic.objects.get(account__id=mechanic_id)
+        menu = get_mechanic_menu(mechanic_id)
         
-        # Get mechanic services
-        mechanic_services = MechanicService.objects.filter(mechanic=mechanic).select_related('service')
+        includes = request.query_params.get('include', '').split(',')
+        include_add_ons = 'addons' in includes
         
         services_data = []
-        for ms in mechanic_services:
-            service = ms.service
-            
-            # Get add-ons for this service
-            add_ons = ServiceAddOn.objects.filter(service=service)
-            add_ons_data = [
-                {
-                    'id': addon.id,
-                    'name': addon.name,
-                    'description': addon.description,
-                    'price': float(addon.price)
-                }
-                for addon in add_ons
-            ]
-            
-            services_data.append({
-                'id': service.id,
-                'name': service.name,
-                'description': service.description,
-                'price': float(service.price),
-                'add_ons': add_ons_data
-            })
+        for service in menu['services']:
+            service_data = {
+                'id': service['id'],
+                'name': service['name'],
+                'description': service['description'],
+                'price': service['price']
+            }
+            if include_add_ons:
+                service_data['add_ons'] = service['add_ons']
+            services_data.append(service_data)
         
         return Response({
             'services': services_data
@@ -103,25 +140,16 @@ def get_mechanic_services(request, mechanic_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(6)
+@replica_read
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_service_addons(request, service_id):
     """
-    Get add-ons for a specific service
+    Get add-ons for a specific service, served from the catalog cache
     """
     try:
-        service = Service.objects.get(id=service_id)
-        add_ons = ServiceAddOn.objects.filter(service=service)
-        
-        add_ons_data = [
-            {
-                'id': addon.id,
-                'name': addon.name,
-                'description': addon.description,
-                'price': float(addon.price)
-            }
-            for addon in add_ons
-        ]
+        add_ons_data = get_service_add_ons(service_id)
         
         return Response({
             'add_ons': add_ons_data
@@ -153,7 +181,7 @@ def create_mechanic_direct_request(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         if not hasattr(account, 'client'):
             return Response({
@@ -185,71 +213,71 @@ def create_mechanic_direct_request(request):
                 'error': 'Service location is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get provider and service
+        # Validate the provider, service and add-ons against the mechanic's
+        # cached menu
         try:
-            provider = Account.objects.get(id=provider_id)
-            service = Service.objects.get(id=service_id)
-        except Account.DoesNotExist:
+            service_id = int(service_id)
+            menu = get_mechanic_menu(int(provider_id))
+        except (TypeError, ValueError):
             return Response({
-                'error': 'Provider not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        except Service.DoesNotExist:
-            return Response({
-                'error': 'Service not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Verify provider is a mechanic and offers the service
-        if not hasattr(provider, 'mechanic'):
+                'error': 'provider_id and service_id must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Mechanic.DoesNotExist:
+            if not Account.objects.filter(id=provider_id).exists():
+                return Response({
+                    'error': 'Provider not found'
+                }, status=status.HTTP_404_NOT_FOUND)
             return Response({
                 'error': 'Selected provider is not a mechanic'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        mechanic_service_exists = MechanicService.objects.filter(
-            mechanic=provider.mechanic,
-            service=service
-        ).exists()
-        
-        if not mechanic_service_exists:
+        service = find_menu_service(menu, service_id)
+        if service is None:
+            if not Service.objects.filter(id=service_id).exists():
+                return Response({
+                    'error': 'Service not found'
+                }, status=status.HTTP_404_NOT_FOUND)
             return Response({
                 'error': 'Selected mechanic does not offer this service'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create service location
-        service_location = ServiceLocation.objects.create(
-            street_name=service_location_data.get('street_name', ''),
-            subdivision_village=service_location_data.get('subdivision_village'),
-            barangay=service_location_data.get('barangay', ''),
-            city_municipality=service_location_data.get('city_municipality', ''),
-            landmark=service_location_data.get('landmark')
-        )
+        # Invalid add-on ids are skipped
+        menu_add_ons = {str(add_on['id']): add_on for add_on in service['add_ons']}
+        add_ons = [
+            menu_add_ons[str(add_on_id)] for add_on_id in add_on_ids
+            if str(add_on_id) in menu_add_ons
+        ]
+        
+        with transaction.atomic():
+            # Create service location
+            service_location = ServiceLocation.objects.create(
+                street_name=service_location_data.get('street_name', ''),
+                subdivision_village=service_location_data.get('subdivision_village'),
+                barangay=service_location_data.get('barangay', ''),
+                city_municipality=service_location_data.get('city_municipality', ''),
+                landmark=service_location_data.get('landmark')
+            )
         
-        # Create request
-        new_request = Request.objects.create(
-            client=client,
-            provider=provider,
-            request_type='direct',
-            service_location=service_location
-        )
+            # Create request
+            new_request = Request.objects.create(
+                client=client,
+                provider_id=provider_id,
+                request_type='direct',
+                service_location=service_location
+            )
         
-        # Create direct request
-        direct_request = DirectRequest.objects.create(
-            request=new_request,
-            service=service
-        )
+            # Create direct request
+            direct_request = DirectRequest.objects.create(
+                request=new_request,
+                service_id=service_id
+            )
         
-        # Add service add-ons if provided
-        total_amount = float(service.price)
-        if add_on_ids:
-            for add_on_id in add_on_ids:
-                try:
-                    add_on = ServiceAddOn.objects.get(id=add_on_id, service=service)
-                    DirectRequestAddOn.objects.create(
-                        request=new_request,
-                        service_add_on=add_on
-                    )
-                    total_amount += float(add_on.price)
-                except ServiceAddOn.DoesNotExist:
-                    pass  # Skip invalid add-on IDs
+            # Add service add-ons if provided
+            DirectRequestAddOn.objects.bulk_create([
+                DirectRequestAddOn(request=new_request, service_add_on_id=add_on['id'])
+                for add_on in add_ons
+            ])
+        total_amount = service['price'] + sum(add_on['price'] for add_on in add_ons)
         
         return Response({
             'message': 'Direct request created successfully',
@@ -263,6 +291,11 @@ def create_mechanic_direct_request(request):
         return Response({
             'error': 'Account not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError:
+        # A row read before the request was created has since been deleted
+        return Response({
+            'error': 'The selected provider, service or add-on no longer exists'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
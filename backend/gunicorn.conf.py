@@ -0,0 +1,12 @@
+"""
+Gunicorn hooks. Settings stay on the command line in start.sh.
+"""
+
+
+def post_worker_init(worker):
+    """Fill the caches before the worker accepts requests (see MainBackend/warmup.py)"""
+    from django.conf import settings
+    from MainBackend.warmup import warm_caches
+
+    if settings.WARMUP_ENABLED:
+        warm_caches()
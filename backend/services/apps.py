@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class ServicesConfig(AppConfig):
     name = 'services'
+    
+    def ready(self):
+        """
+        Import signal handlers when Django starts.
+        This ensures signals are registered and active.
+        """
+        import services.signals  # noqa: F401
@@ -0,0 +1,151 @@
+"""
+Cached service catalog.
+
+list_services and list_service_categories serve these payloads from the
+versioned cache (see MainBackend/versioned_cache.py). services.signals bumps
+CATALOG_NAMESPACE whenever a Service, ServiceCategory, ServiceAddOn,
+Specialty, Tag or ServiceTag is saved or deleted, so the next request rebuilds them once.
+
+The direct booking flow reads per-mechanic menus: the services a mechanic
+offers with their prices and add-ons. A menu is keyed by its mechanic's
+namespace, bumped when one of the mechanic's MechanicService rows changes,
+and by the catalog version, so service and add-on edits reach every menu.
+"""
+
+from MainBackend.versioned_cache import get_or_build, get_version
+from users.models import Mechanic
+from .models import Service, ServiceCategory, ServiceAddOn, MechanicService
+
+
+CATALOG_NAMESPACE = 'catalog'
+
+
+def serialize_service(service):
+    """Catalog entry of one service, its category selected with it"""
+    return {
+        'id': service.id,
+        'name': service.name,
+        'description': service.description,
+        'service_picture': service.service_picture.url if service.service_picture else None,
+        'category': service.category.name if service.category else None,
+        'category_id': service.category.id if service.category else None,
+        'price': float(service.price),
+    }
+
+
+# Rebuilds read the primary: the version is bumped as soon as a change commits,
+# and a lagging replica could otherwise be cached as the new version
+CATALOG_DATABASE = 'default'
+
+
+def build_services():
+    """Every service as listed by list_services"""
+    services = Service.objects.using(CATALOG_DATABASE).select_related('category').all()
+    return [serialize_service(service) for service in services]
+
+
+def build_service_categories():
+    """Every category as listed by list_service_categories"""
+    return [
+        {
+            'id': category.id,
+            'name': category.name,
+            'worth_token': float(category.worth_token),
+        }
+        for category in ServiceCategory.objects.using(CATALOG_DATABASE).all()
+    ]
+
+
+def get_services():
+    """The cached list_services payload"""
+    return get_or_build(CATALOG_NAMESPACE, 'services', build_services)
+
+
+def get_service_categories():
+    """The cached list_service_categories payload"""
+    return get_or_build(CATALOG_NAMESPACE, 'categories', build_service_categories)
+
+
+def menu_namespace(mechanic_account_id):
+    """Version namespace of the menu of the mechanic with this account id"""
+    return f'menu:{mechanic_account_id}'
+
+
+def serialize_add_on(add_on):
+    """Menu entry of one service add-on"""
+    return {
+        'id': add_on.id,
+        'name': add_on.name,
+        'description': add_on.description,
+        'price': float(add_on.price),
+    }
+
+
+def build_mechanic_menu(mechanic_account_id):
+    """
+    The services a mechanic offers, each with its add-ons, in two queries.
+    Raises Mechanic.DoesNotExist when the account is not a mechanic.
+    """
+    services = [
+        mechanic_service.service for mechanic_service in MechanicService.objects.using(CATALOG_DATABASE).filter(
+            mechanic__account_id=mechanic_account_id
+        ).select_related('service')
+    ]
+    add_ons = {service.id: [] for service in services}
+    if add_ons:
+        for add_on in ServiceAddOn.objects.using(CATALOG_DATABASE).filter(service_id__in=add_ons):
+            add_ons[add_on.service_id].append(serialize_add_on(add_on))
+    elif not Mechanic.objects.using(CATALOG_DATABASE).filter(account_id=mechanic_account_id).exists():
+        # Only a mechanic without services needs telling apart from a non-mechanic
+        raise Mechanic.DoesNotExist('Mechanic not found')
+
+    return {
+        'services': [
+            {
+                'id': service.id,
+                'name': service.name,
+                'description': service.description,
+                'price': float(service.price),
+                'add_ons': add_ons[service.id],
+            }
+            for service in services
+        ]
+    }
+
+
+def get_mechanic_menu(mechanic_account_id):
+    """
+    The cached menu of the mechanic with this account id.
+    Raises Mechanic.DoesNotExist when the account is not a mechanic.
+    """
+    return get_or_build(
+        menu_namespace(mechanic_account_id),
+        f'catalog-{get_version(CATALOG_NAMESPACE)}',
+        lambda: build_mechanic_menu(mechanic_account_id)
+    )
+
+
+def find_menu_service(menu, service_id):
+    """The menu entry of `service_id`, or None when the mechanic does not offer it"""
+    for service in menu['services']:
+        if service['id'] == service_id:
+            return service
+    return None
+
+
+def build_service_add_ons(service_id):
+    """
+    The add-ons of one service as listed by get_service_add_ons.
+    Raises Service.DoesNotExist when there is no such service.
+    """
+    if not Service.objects.using(CATALOG_DATABASE).filter(id=service_id).exists():
+        raise Service.DoesNotExist('Service not found')
+    return [
+        serialize_add_on(add_on)
+        for add_on in ServiceAddOn.objects.using(CATALOG_DATABASE).filter(service_id=service_id)
+    ]
+
+
+def get_service_add_ons(service_id):
+    """The cached add-ons of one service. Raises Service.DoesNotExist for unknown services."""
+    return get_or_build(CATALOG_NAMESPACE, f'add-ons:{service_id}', lambda: build_service_add_ons(service_id))
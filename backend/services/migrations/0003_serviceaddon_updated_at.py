@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serviceaddon',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -22,6 +22,7 @@ class ServiceAddOn(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
 class MechanicService(models.Model):
     mechanic = models.ForeignKey(Mechanic, on_delete=models.CASCADE)
@@ -0,0 +1,52 @@
+"""
+Signal handlers for the services app.
+
+These signals invalidate the cached service catalog (see
+services/catalog.py) and the per-worker catalog snapshots (see
+services/snapshot.py) whenever a catalog row is saved or deleted, and a
+mechanic's cached menu whenever the services it offers change.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from MainBackend.versioned_cache import bump_version_on_commit
+from users.models import Mechanic
+from .catalog import CATALOG_NAMESPACE, menu_namespace
+from .models import Service, ServiceCategory, ServiceAddOn, Specialty, Tag, ServiceTag, MechanicService
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_save, sender=ServiceAddOn)
+@receiver(post_save, sender=Specialty)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=ServiceTag)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceAddOn)
+@receiver(post_delete, sender=Specialty)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=ServiceTag)
+def invalidate_catalog(sender, instance, **kwargs):
+    """
+    Signal handler: Bumps the catalog version when a catalog row changes.
+    """
+    bump_version_on_commit(CATALOG_NAMESPACE)
+
+
+@receiver(post_save, sender=MechanicService)
+@receiver(post_delete, sender=MechanicService)
+def invalidate_mechanic_menu(sender, instance, **kwargs):
+    """
+    Signal handler: Bumps the menu version of the mechanic offering the service.
+    """
+    for account_id in Mechanic.objects.filter(id=instance.mechanic_id).values_list('account_id', flat=True):
+        bump_version_on_commit(menu_namespace(account_id))
+
+
+@receiver(post_delete, sender=Mechanic)
+def invalidate_deleted_mechanic_menu(sender, instance, **kwargs):
+    """
+    Signal handler: Bumps the menu version of a deleted mechanic.
+    """
+    bump_version_on_commit(menu_namespace(instance.account_id))
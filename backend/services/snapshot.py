@@ -0,0 +1,153 @@
+"""
+Per-worker in-memory snapshot of the small catalog tables.
+
+Service, ServiceAddOn, ServiceCategory, Specialty and Tag change a few times a
+day but are read by every request-creation view. Each worker keeps all of
+their rows as compact __slots__ records indexed by id, and request code reads
+them instead of querying row by row.
+
+The snapshot is tagged with the shared catalog version (see
+services/catalog.py), which services.signals bumps on commit whenever one of
+these tables changes. get_catalog_snapshot compares the two at most once per
+request and reloads lazily after a change. The version only reaches every
+worker through a shared cache, so a snapshot is also reloaded once it is
+older than settings.CATALOG_SNAPSHOT_MAX_SECONDS. Snapshots are never
+modified once built, so threads can share them without locking.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+from MainBackend.versioned_cache import get_version
+from .catalog import CATALOG_NAMESPACE, CATALOG_DATABASE
+from .models import Service, ServiceAddOn, ServiceCategory, Specialty, Tag
+
+
+class ServiceRecord:
+    __slots__ = ('id', 'name', 'description', 'category_id', 'price')
+
+    def __init__(self, id, name, description, category_id, price):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.category_id = category_id
+        self.price = price
+
+
+class AddOnRecord:
+    __slots__ = ('id', 'service_id', 'name', 'description', 'price')
+
+    def __init__(self, id, service_id, name, description, price):
+        self.id = id
+        self.service_id = service_id
+        self.name = name
+        self.description = description
+        self.price = price
+
+
+class CategoryRecord:
+    __slots__ = ('id', 'name', 'worth_token')
+
+    def __init__(self, id, name, worth_token):
+        self.id = id
+        self.name = name
+        self.worth_token = worth_token
+
+
+class SpecialtyRecord:
+    __slots__ = ('id', 'name', 'description')
+
+    def __init__(self, id, name, description):
+        self.id = id
+        self.name = name
+        self.description = description
+
+
+class TagRecord:
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+def _index(record_class, queryset, fields):
+    """Records of every row of `queryset`, keyed by id"""
+    return {
+        row[0]: record_class(*row)
+        for row in queryset.using(CATALOG_DATABASE).values_list(*fields)
+    }
+
+
+def _lookup(index, record_id):
+    """The record with `record_id` from a client-supplied id, or None"""
+    try:
+        return index.get(int(record_id))
+    except (TypeError, ValueError):
+        return None
+
+
+class CatalogSnapshot:
+    """Every catalog row of one catalog version, indexed by id"""
+    __slots__ = ('version', 'loaded_at', 'services', 'add_ons', 'categories', 'specialties', 'tags', 'add_ons_by_service')
+
+    def __init__(self, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.services = _index(
+            ServiceRecord, Service.objects.all(),
+            ('id', 'name', 'description', 'category_id', 'price')
+        )
+        self.add_ons = _index(
+            AddOnRecord, ServiceAddOn.objects.order_by('id'),
+            ('id', 'service_id', 'name', 'description', 'price')
+        )
+        self.categories = _index(CategoryRecord, ServiceCategory.objects.all(), ('id', 'name', 'worth_token'))
+        self.specialties = _index(SpecialtyRecord, Specialty.objects.all(), ('id', 'name', 'description'))
+        self.tags = _index(TagRecord, Tag.objects.all(), ('id', 'name'))
+
+        self.add_ons_by_service = {}
+        for add_on in self.add_ons.values():
+            self.add_ons_by_service.setdefault(add_on.service_id, []).append(add_on)
+
+    def get_service(self, service_id):
+        return _lookup(self.services, service_id)
+
+    def get_add_on(self, add_on_id):
+        return _lookup(self.add_ons, add_on_id)
+
+    def is_current(self, version):
+        return (
+            self.version == version
+            and time.monotonic() - self.loaded_at < settings.CATALOG_SNAPSHOT_MAX_SECONDS
+        )
+
+
+_snapshot = None
+_reload_lock = threading.Lock()
+
+
+def get_catalog_snapshot(request=None):
+    """
+    This worker's catalog snapshot, reloaded first if the shared catalog
+    version moved or it is too old. Pass the request to check the version only once for it.
+    """
+    global _snapshot
+    http_request = getattr(request, '_request', request)
+    checked = getattr(http_request, '_catalog_snapshot', None)
+    if checked is not None:
+        return checked
+
+    version = get_version(CATALOG_NAMESPACE)
+    snapshot = _snapshot
+    if snapshot is None or not snapshot.is_current(version):
+        with _reload_lock:
+            snapshot = _snapshot
+            if snapshot is None or not snapshot.is_current(version):
+                snapshot = _snapshot = CatalogSnapshot(version)
+
+    if http_request is not None:
+        http_request._catalog_snapshot = snapshot
+    return snapshot
@@ -1,3 +1,166 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from django.test import RequestFactory
+
+from MainBackend.versioned_cache import get_or_build, get_version
+from .catalog import CATALOG_NAMESPACE
+from .models import Service, ServiceCategory, ServiceAddOn, Specialty, Tag, ServiceTag
+from .snapshot import get_catalog_snapshot
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = ServiceCategory.objects.create(name='Maintenance', worth_token=2)
+        self.service = Service.objects.create(
+            name='Oil change', description='Full synthetic', category=self.category, price=1500
+        )
+
+    def get(self, name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, len(ctx.captured_queries)
+
+    def test_catalog_is_served_from_cache(self):
+        first, first_queries = self.get('list_services')
+        second, second_queries = self.get('list_services')
+
+        self.assertEqual(first.data, second.data)
+        self.assertGreater(first_queries, 1)
+        # Only the conditional GET validator query is left
+        self.assertEqual(second_queries, 1)
+        self.assertEqual(self.get('list_service_categories')[0].data['categories'][0]['worth_token'], 2.0)
+        self.assertEqual(self.get('list_service_categories')[1], 0)
+
+    def test_catalog_changes_bump_the_version(self):
+        changes = [
+            lambda: Service.objects.filter(id=self.service.id).first().save(),
+            lambda: ServiceCategory.objects.create(name='Repair'),
+            lambda: ServiceAddOn.objects.create(service=self.service, name='Filter', description='', price=300),
+            lambda: ServiceTag.objects.create(service=self.service, tag=Tag.objects.create(name='Fast')),
+            lambda: Tag.objects.all().delete(),
+        ]
+        for change in changes:
+            version = get_version(CATALOG_NAMESPACE)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertGreater(get_version(CATALOG_NAMESPACE), version)
+
+    def test_renamed_service_is_listed_after_commit(self):
+        self.get('list_services')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.name = 'Synthetic oil change'
+            self.service.save()
+
+        response, _ = self.get('list_services')
+        self.assertEqual(response.data['services'][0]['name'], 'Synthetic oil change')
+
+    def test_paged_listing_reads_the_database(self):
+        self.get('list_services')
+        response = self.client.get(reverse('list_services'), {'page_size': 1})
+        self.assertEqual(response.data['next_cursor'], None)
+        self.assertEqual(response.data['services'][0]['id'], self.service.id)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_per_process_cache_is_not_trusted(self):
+        self.get('list_services')
+        # A bump in another worker would not reach this one, so a change made
+        # without one must still show up
+        Service.objects.filter(id=self.service.id).update(name='Synthetic oil change')
+
+        response, queries = self.get('list_services')
+        self.assertEqual(response.data['services'][0]['name'], 'Synthetic oil change')
+        self.assertGreater(queries, 1)
+
+
+@override_settings(CACHE_IS_SHARED=True, CACHE_REBUILD_WAIT_SECONDS=5)
+class VersionedCacheStampedeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_only_one_worker_rebuilds_a_missing_entry(self):
+        builds = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_build():
+            builds.append(1)
+            started.set()
+            release.wait(5)
+            return ['catalog']
+
+        results = []
+        rebuilder = threading.Thread(target=lambda: results.append(get_or_build('test', 'entry', slow_build)))
+        rebuilder.start()
+        started.wait(5)
+
+        waiters = [
+            threading.Thread(target=lambda: results.append(get_or_build('test', 'entry', slow_build)))
+            for _ in range(5)
+        ]
+        for waiter in waiters:
+            waiter.start()
+        release.set()
+        for thread in [rebuilder] + waiters:
+            thread.join(10)
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [['catalog']] * 6)
+
+    def test_waiters_build_themselves_when_the_rebuild_stalls(self):
+        with override_settings(CACHE_REBUILD_WAIT_SECONDS=0.1):
+            cache.add(f"test:{get_version('test')}:entry:lock", 1)
+            build = mock.Mock(return_value=['fresh'])
+            self.assertEqual(get_or_build('test', 'entry', build), ['fresh'])
+            build.assert_called_once()
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = Service.objects.create(name='Oil change', description='Full synthetic', price=1500)
+        self.add_on = ServiceAddOn.objects.create(service=self.service, name='Filter', description='', price=300)
+        Specialty.objects.create(name='Engines', description='')
+
+    def test_snapshot_is_reused_until_the_catalog_changes(self):
+        snapshot = get_catalog_snapshot()
+        self.assertEqual(snapshot.get_service(str(self.service.id)).name, 'Oil change')
+        self.assertEqual(snapshot.add_ons_by_service[self.service.id][0].id, self.add_on.id)
+        self.assertIsNone(snapshot.get_add_on('not-an-id'))
+        self.assertEqual(len(snapshot.specialties), 1)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog_snapshot(), snapshot)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.name = 'Synthetic oil change'
+            self.service.save()
+        reloaded = get_catalog_snapshot()
+        self.assertIsNot(reloaded, snapshot)
+        self.assertEqual(reloaded.get_service(self.service.id).name, 'Synthetic oil change')
+
+    def test_version_is_checked_once_per_request(self):
+        request = RequestFactory().get('/')
+        snapshot = get_catalog_snapshot(request)
+        with mock.patch('services.snapshot.get_version') as get_version_mock:
+            self.assertIs(get_catalog_snapshot(request), snapshot)
+        get_version_mock.assert_not_called()
+
+    @override_settings(CATALOG_SNAPSHOT_MAX_SECONDS=0)
+    def test_old_snapshot_is_reloaded_without_a_version_change(self):
+        snapshot = get_catalog_snapshot()
+        # A change whose version bump never reached this worker
+        Service.objects.filter(id=self.service.id).update(name='Synthetic oil change')
+
+        reloaded = get_catalog_snapshot()
+        self.assertIsNot(reloaded, snapshot)
+        self.assertEqual(reloaded.get_service(self.service.id).name, 'Synthetic oil change')
@@ -2,60 +2,84 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import DatabaseError
 
-from ..models import Service, ServiceCategory
+from MainBackend.pagination import InvalidCursor, wants_pagination, get_page_params, keyset_page
+from MainBackend.db_router import replica_read
+from MainBackend.query_budget import query_budget
+from MainBackend.stale_fallback import stale_fallback
+from MainBackend.conditional import conditional_get, table_state
 
+from ..models import Service
+from ..catalog import serialize_service, get_services, get_service_categories
 
+
+def _catalog_states(request):
+    """Helper function returning the validator states of the service listing"""
+    return [table_state(Service.objects.all(), 'updated_at', 'category__updated_at')]
+
+
+@query_budget(5)
+@replica_read
+@stale_fallback
+@conditional_get(_catalog_states)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_services(request):
     """
     Get list of all services
-    Returns service details including category and pricing
+    Returns service details including category and pricing, served from the
+    catalog cache (see services/catalog.py) unless a page is requested.
+    Supports conditional GET (ETag / Last-Modified). While the database is
+    failing the last good payload is served with X-Stale: true.
+    
+    Query Parameters:
+    - cursor, page_size: Return one page, oldest first, plus a next_cursor
+      for the following page. Without them every row is returned.
     """
     try:
-        services = Service.objects.select_related('category').all()
-        services_data = []
-        
-        for service in services:
-            service_info = {
-                'id': service.id,
-                'name': service.name,
-                'description': service.description,
-                'service_picture': service.service_picture.url if service.service_picture else None,
-                'category': service.category.name if service.category else None,
-                'category_id': service.category.id if service.category else None,
-                'price': float(service.price),
-            }
-            services_data.append(service_info)
+        if wants_pagination(request):
+            services, next_cursor = keyset_page(
+                Service.objects.select_related('category').all(),
+                **get_page_params(request),
+                descending=False
+            )
+            services_data = [serialize_service(service) for service in services]
+            return Response({
+                'services': services_data,
+                'count': len(services_data),
+                'next_cursor': next_cursor
+            }, status=status.HTTP_200_OK)
         
+        # The full catalog comes from the versioned cache
+        services_data = get_services()
         return Response({
             'services': services_data,
             'count': len(services_data)
         }, status=status.HTTP_200_OK)
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except DatabaseError:
+        # Answered from the last good payload by @stale_fallback
+        raise
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(5)
+@replica_read
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_service_categories(request):
     """
-    Get list of all service categories
+    Get list of all service categories, served from the catalog cache
     """
     try:
-        categories = ServiceCategory.objects.all()
-        categories_data = []
-        
-        for category in categories:
-            category_info = {
-                'id': category.id,
-                'name': category.name,
-                'worth_token': float(category.worth_token),
-            }
-            categories_data.append(category_info)
+        categories_data = get_service_categories()
         
         return Response({
             'categories': categories_data,
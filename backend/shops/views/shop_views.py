@@ -2,19 +2,47 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import DatabaseError
+
+from MainBackend.pagination import InvalidCursor, wants_pagination, get_page_params, keyset_page
+from MainBackend.db_router import replica_read
+from MainBackend.query_budget import query_budget
+from MainBackend.stale_fallback import stale_fallback
+from MainBackend.single_flight import single_flight
+from MainBackend.conditional import conditional_get, table_state
 
 from ..models import Shop
 
 
+def _shop_states(request):
+    """Helper function returning the validator states of the shop listing"""
+    return [table_state(Shop.objects.all(), 'updated_at', 'shop_owner__account__updated_at')]
+
+
+@query_budget(5)
+@replica_read
+@stale_fallback
+@conditional_get(_shop_states)
 @api_view(['GET'])
+@single_flight
 @permission_classes([AllowAny])
 def list_shops(request):
     """
     Get list of all shops
-    Returns shop details including owner info and status
+    Returns shop details including owner info and status.
+    Supports conditional GET (ETag / Last-Modified). Identical concurrent
+    requests share one response (see MainBackend/single_flight.py). While the
+    database is failing the last good payload is served with X-Stale: true.
+    
+    Query Parameters:
+    - cursor, page_size: Return one page, oldest first, plus a next_cursor
+      for the following page. Without them every row is returned.
     """
     try:
         shops = Shop.objects.select_related('shop_owner__account').all()
+        next_cursor = None
+        if wants_pagination(request):
+            shops, next_cursor = keyset_page(shops, **get_page_params(request), descending=False)
         shops_data = []
         
         for shop in shops:
@@ -32,10 +60,21 @@ def list_shops(request):
             }
             shops_data.append(shop_info)
         
-        return Response({
+        response_data = {
             'shops': shops_data,
             'count': len(shops_data)
-        }, status=status.HTTP_200_OK)
+        }
+        if wants_pagination(request):
+            response_data['next_cursor'] = next_cursor
+        
+        return Response(response_data, status=status.HTTP_200_OK)
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except DatabaseError:
+        # Answered from the last good payload by @stale_fallback
+        raise
     except Exception as e:
         return Response({
             'error': str(e)
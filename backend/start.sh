@@ -1,4 +1,5 @@
 #!/usr/bin/env bash
 python manage.py migrate
+python manage.py load_place_centroids
 python manage.py collectstatic --noinput
-gunicorn MainBackend.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
+gunicorn MainBackend.wsgi:application --config gunicorn.conf.py --bind 0.0.0.0:$PORT --threads ${GUNICORN_THREADS:-4}
\ No newline at end of file
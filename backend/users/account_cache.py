@@ -0,0 +1,87 @@
+"""
+Short-lived cache of the account facts needed to authenticate a request.
+
+SessionAuthentication only needs to know that the session's account exists,
+is active and is not banned. That slim record is cached for
+settings.ACCOUNT_RECORD_SECONDS, so authenticating costs no query and the
+full account (see users.loaders) is only loaded by views that use it. On a
+miss the record is built from the request's full account, which the view
+then reuses.
+
+users.signals drops the record whenever the Account, one of its AccountRole
+rows or its AccountBan is saved or deleted, so deactivations and bans apply
+on the next request. Queryset .update() calls skip those signals; call
+invalidate_account_record after them.
+
+Dropping an entry only reaches every worker through a shared cache, so the
+record is only cached when settings.CACHE_IS_SHARED is on. Otherwise it is
+built from the full account on every request.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .loaders import get_role_names
+from .middleware import get_session_account
+from .models import Account
+
+
+def _record_key(account_id):
+    return f'account-record:{account_id}'
+
+
+class AccountRecord:
+    """Authenticated account as seen by DRF, without the full model row"""
+    __slots__ = ('id', 'is_active', 'is_banned', 'roles')
+
+    # Lets DRF permission classes treat the record as a logged in user
+    is_authenticated = True
+
+    def __init__(self, id, is_active, is_banned, roles):
+        self.id = id
+        self.is_active = is_active
+        self.is_banned = is_banned
+        self.roles = roles
+
+
+def get_account_record(request):
+    """
+    The cached record of the session's account, built from the full account
+    on a miss. None when the session has no account or it no longer exists.
+    """
+    account_id = request.session.get('account_id')
+    if not account_id:
+        return None
+
+    key = _record_key(account_id)
+    if settings.CACHE_IS_SHARED:
+        cached = cache.get(key)
+        if cached is not None:
+            return AccountRecord(*cached)
+
+    try:
+        account = get_session_account(request)
+    except Account.DoesNotExist:
+        return None
+    record = AccountRecord(
+        account.id, account.is_active, hasattr(account, 'accountban'), get_role_names(account)
+    )
+    if settings.CACHE_IS_SHARED:
+        cache.set(
+            key,
+            (record.id, record.is_active, record.is_banned, record.roles),
+            settings.ACCOUNT_RECORD_SECONDS
+        )
+    return record
+
+
+def invalidate_account_record(account_id):
+    """
+    Drop the cached record of an account now and again once the current
+    transaction commits, so a request running meanwhile cannot cache the
+    state from before the change.
+    """
+    key = _record_key(account_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -1,11 +1,18 @@
 from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
-from .models import Account
+from .account_cache import get_account_record
 
 
 class SessionAuthentication(BaseAuthentication):
     """
     Custom session-based authentication
+    
+    Checks the short-lived account record cache (see users.account_cache)
+    instead of loading the account, so authenticating usually costs no
+    query. Views get the full account from request.account as before.
+    
+    A session whose account was deleted, deactivated or banned is flushed
+    and the request continues anonymously, so AllowAny endpoints such as
+    login and logout keep working; protected views refuse it as usual.
     """
     def authenticate(self, request):
         account_id = request.session.get('account_id')
@@ -13,12 +20,15 @@ class SessionAuthentication(BaseAuthentication):
         if not account_id:
             return None
         
-        try:
-            account = Account.objects.get(id=account_id)
-        except Account.DoesNotExist:
-            raise AuthenticationFailed('Invalid session')
-        
-        if not account.is_active:
-            raise AuthenticationFailed('Account is deactivated')
+        record = get_account_record(request)
+        if record is None or not record.is_active or record.is_banned:
+            self.end_stale_session(request)
+            return None
         
-        return (account, None)
+        return (record, None)
+    
+    def end_stale_session(self, request):
+        """Log the session out and forget the account already resolved for it"""
+        http_request = getattr(request, '_request', request)
+        http_request.session.flush()
+        http_request._session_account = None
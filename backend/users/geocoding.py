@@ -0,0 +1,94 @@
+"""
+Offline geocoding of Philippine addresses from barangay and city names.
+
+PlaceCentroid holds the centre of each barangay, and of each city or
+municipality as a fallback; `manage.py load_place_centroids` fills it from a
+CSV (a short list of major cities ships with the app in
+users/data/place_centroids.csv). No external geocoding service is used.
+
+Lookups are cached in the 'places' version namespace, which the loader bumps.
+AccountAddress and ServiceLocation rows are geocoded when saved without
+coordinates, and again when their barangay or city changes (see the pre_save
+handlers in users.signals and bookings.signals).
+"""
+
+import re
+
+from MainBackend.geo import grid_cell
+from MainBackend.versioned_cache import get_or_build
+from .models import PlaceCentroid
+
+
+PLACES_NAMESPACE = 'places'
+
+_PUNCTUATION = re.compile(r'[^\w\s-]')
+_SPACES = re.compile(r'\s+')
+_BARANGAY_PREFIX = re.compile(r'^(barangay|brgy|bgy)\s+')
+_CITY_AFFIX = re.compile(r'^city of\s+|\s+city$')
+
+
+def place_key(name, city=False):
+    """
+    Normalized form of a barangay or (with city=True) city name, so that
+    "Brgy. Poblacion" matches "poblacion" and "City of Davao" matches
+    "Davao City".
+    """
+    key = _SPACES.sub(' ', _PUNCTUATION.sub(' ', (name or '').lower())).strip()
+    key = _BARANGAY_PREFIX.sub('', key)
+    if city:
+        key = _CITY_AFFIX.sub('', key)
+    return key
+
+
+def build_place(city_key, barangay_key):
+    """(latitude, longitude) of the barangay, else of the city, else ()"""
+    centroids = {
+        centroid.barangay_key: (centroid.latitude, centroid.longitude)
+        for centroid in PlaceCentroid.objects.filter(city_key=city_key, barangay_key__in={barangay_key, ''})
+    }
+    return centroids.get(barangay_key) or centroids.get('') or ()
+
+
+def geocode(barangay, city_municipality):
+    """(latitude, longitude) of a barangay in a city, or None when unknown"""
+    city_key = place_key(city_municipality, city=True)
+    if not city_key:
+        return None
+    barangay_key = place_key(barangay)
+    place = get_or_build(
+        PLACES_NAMESPACE, f'{city_key}|{barangay_key}', lambda: build_place(city_key, barangay_key)
+    )
+    return place or None
+
+
+def moved_place(location):
+    """
+    Whether a stored location is being saved with another barangay or city
+    but its stored coordinates, which then belong to the old place.
+    Coordinates changed along with the place are taken as given.
+    """
+    if location._state.adding or location.pk is None:
+        return False
+    stored = type(location)._default_manager.filter(pk=location.pk).values_list(
+        'barangay', 'city_municipality', 'latitude', 'longitude'
+    ).first()
+    if stored is None:
+        return False
+    barangay, city_municipality, latitude, longitude = stored
+    same_place = (
+        place_key(barangay) == place_key(location.barangay)
+        and place_key(city_municipality, city=True) == place_key(location.city_municipality, city=True)
+    )
+    return not same_place and (latitude, longitude) == (location.latitude, location.longitude)
+
+
+def locate(location):
+    """
+    Fill in the coordinates of an AccountAddress or ServiceLocation from its
+    barangay and city when they are missing or the place changed, and set
+    its grid cell. A move to an unknown place clears the old coordinates.
+    """
+    if location.latitude is None or location.longitude is None or moved_place(location):
+        place = geocode(location.barangay, location.city_municipality)
+        location.latitude, location.longitude = place or (None, None)
+    location.grid_cell = grid_cell(location.latitude, location.longitude)
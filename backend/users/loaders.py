@@ -0,0 +1,54 @@
+"""
+Account loading helpers for the users app.
+
+An account loaded through these helpers carries its address, every role
+profile (client, mechanic, shop owner, admin), its ban and its role rows,
+fetched in two queries. Missing profiles are cached as absent, so `hasattr(account,
+'mechanic')` and friends never hit the database afterwards.
+"""
+
+from .models import Account
+
+
+# Reverse one-to-one profile relation on Account -> role name used in the API
+ROLE_PROFILE_RELATIONS = {
+    'client': 'client',
+    'mechanic': 'mechanic',
+    'shopowner': 'shop_owner',
+    'admin': 'admin',
+}
+
+
+def account_queryset():
+    """Account queryset that loads the address, role profiles, ban and role rows up front"""
+    return Account.objects.select_related(
+        'accountaddress',
+        'accountban',
+        *ROLE_PROFILE_RELATIONS
+    ).prefetch_related('accountrole_set')
+
+
+def load_account(**lookup):
+    """
+    Fetch a single account with its profiles and roles.
+
+    Raises Account.DoesNotExist like Account.objects.get.
+    """
+    return account_queryset().get(**lookup)
+
+
+def get_role_profiles(account):
+    """
+    Return the role profiles an account has, keyed by role name
+    (client, mechanic, shop_owner, admin) in that order.
+    """
+    profiles = {}
+    for relation, role in ROLE_PROFILE_RELATIONS.items():
+        if hasattr(account, relation):
+            profiles[role] = getattr(account, relation)
+    return profiles
+
+
+def get_role_names(account):
+    """Return the account's role names, using prefetched role rows when available"""
+    return [role.account_role for role in account.accountrole_set.all()]
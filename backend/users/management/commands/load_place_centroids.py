@@ -0,0 +1,87 @@
+import csv
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import ServiceLocation
+from MainBackend.versioned_cache import bump_version
+from users.geocoding import PLACES_NAMESPACE, locate, place_key
+from users.models import AccountAddress, PlaceCentroid
+
+
+DEFAULT_CENTROIDS = Path(__file__).resolve().parents[2] / 'data' / 'place_centroids.csv'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load barangay and city centroids for offline geocoding from a CSV "
+        "(barangay, city_municipality, province, latitude, longitude; an "
+        "empty barangay marks a city centroid), then geocode the addresses "
+        "and service locations that have no coordinates yet"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(DEFAULT_CENTROIDS),
+            help='CSV file to load (default: the major cities shipped in users/data/)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows geocoded per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as source:
+                centroids = [
+                    PlaceCentroid(
+                        barangay=row['barangay'].strip(),
+                        city_municipality=row['city_municipality'].strip(),
+                        province=row.get('province', '').strip(),
+                        latitude=Decimal(row['latitude']),
+                        longitude=Decimal(row['longitude']),
+                        barangay_key=place_key(row['barangay']),
+                        city_key=place_key(row['city_municipality'], city=True),
+                    )
+                    for row in csv.DictReader(source)
+                ]
+        except (OSError, KeyError, ArithmeticError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e!r}")
+
+        PlaceCentroid.objects.bulk_create(
+            centroids,
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['city_key', 'barangay_key'],
+            update_fields=['barangay', 'city_municipality', 'province', 'latitude', 'longitude'],
+        )
+        bump_version(PLACES_NAMESPACE)
+        self.stdout.write(f'Loaded {len(centroids)} place centroids')
+
+        for model, label in ((AccountAddress, 'account addresses'), (ServiceLocation, 'service locations')):
+            located = self.backfill(model, options['batch_size'])
+            self.stdout.write(f'Geocoded {located} {label}')
+
+    def backfill(self, model, batch_size):
+        """Geocode the rows of `model` without coordinates, batch by batch"""
+        missing = model.objects.filter(latitude__isnull=True).order_by('id')
+        last_id = 0
+        located = 0
+
+        while True:
+            batch = list(missing.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for location in batch:
+                locate(location)
+            changed = [location for location in batch if location.latitude is not None]
+            model.objects.bulk_update(changed, ['latitude', 'longitude', 'grid_cell'])
+            located += len(changed)
+            last_id = batch[-1].id
+
+        return located
@@ -0,0 +1,64 @@
+"""
+Request-scoped account context.
+
+SessionAccountMiddleware exposes the logged in account as `request.account`.
+The account is resolved lazily, at most once per request, through the account
+loader so its role profiles and roles come along. Views, permission classes
+and the DRF authentication class all share that single lookup.
+"""
+
+from django.utils.functional import SimpleLazyObject
+
+from .loaders import load_account
+from .models import Account
+
+
+_NOT_LOADED = object()
+
+
+def _resolve_session_account(request):
+    """Load the session's account once and cache it on the Django request"""
+    http_request = getattr(request, '_request', request)
+    account = getattr(http_request, '_session_account', _NOT_LOADED)
+
+    if account is _NOT_LOADED:
+        account = None
+        account_id = http_request.session.get('account_id')
+        if account_id:
+            try:
+                account = load_account(id=account_id)
+            except Account.DoesNotExist:
+                pass
+        http_request._session_account = account
+
+    return account
+
+
+def get_session_account(request):
+    """
+    Return the account logged in on this request's session.
+
+    Accepts a Django or DRF request. Raises Account.DoesNotExist when the
+    session has no account or the account no longer exists, so views can
+    keep their existing error handling.
+    """
+    account = _resolve_session_account(request)
+    if account is None:
+        raise Account.DoesNotExist('No account for this session')
+    return account
+
+
+class SessionAccountMiddleware:
+    """
+    Attach the session account to every request as `request.account`.
+
+    `request.account` is a lazy object that evaluates to the account, or to
+    None when nobody is logged in; test it with `if request.account:`.
+    Must be placed after SessionMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.account = SimpleLazyObject(lambda: _resolve_session_account(request))
+        return self.get_response(request)
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_account_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountaddress',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='accountaddress',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='accountaddress',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.CreateModel(
+            name='PlaceCentroid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barangay', models.CharField(blank=True, max_length=100)),
+                ('city_municipality', models.CharField(max_length=100)),
+                ('province', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('barangay_key', models.CharField(blank=True, max_length=100)),
+                ('city_key', models.CharField(max_length=100)),
+            ],
+            options={
+                'unique_together': {('city_key', 'barangay_key')},
+            },
+        ),
+    ]
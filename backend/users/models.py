@@ -14,6 +14,12 @@ class Account(models.Model):
     is_active = models.BooleanField(default=True)
     is_verified = models.BooleanField(default=False)
     last_login = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_authenticated(self):
+        """Lets DRF permission classes treat a session account as a logged in user"""
+        return True
 
 class AccountAddress(models.Model):
     account = models.OneToOneField(Account, on_delete=models.CASCADE)
@@ -25,9 +31,34 @@ class AccountAddress(models.Model):
     province = models.CharField(max_length=100)
     region = models.CharField(max_length=100)
     postal_code = models.CharField(max_length=20, null=True, blank=True)
+    # Filled from PlaceCentroid when not given (see users.geocoding); grid_cell
+    # is the MainBackend.geo cell of the coordinates, used for nearby searches
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    grid_cell = models.BigIntegerField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+class PlaceCentroid(models.Model):
+    """
+    Offline geocoding table: the centre of a barangay, or of a whole city or
+    municipality when barangay is empty. The *_key columns hold the names
+    normalized by users.geocoding.place_key.
+    """
+    barangay = models.CharField(max_length=100, blank=True)
+    city_municipality = models.CharField(max_length=100)
+    province = models.CharField(max_length=100, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    barangay_key = models.CharField(max_length=100, blank=True)
+    city_key = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = [['city_key', 'barangay_key']]
+
+    def __str__(self):
+        return f"{self.barangay + ', ' if self.barangay else ''}{self.city_municipality}"
+
 class AccountRole(models.Model):
     class Role(models.TextChoices):
         CLIENT = "client"
@@ -0,0 +1,37 @@
+"""
+K-nearest available mechanics, located by their account address.
+
+The search reads the grid cells (see MainBackend.geo) around the origin in
+growing squares: the origin's 3x3 block first, then twice as many rings each
+round. It stops once k mechanics lie within the radius the rings read so far
+are sure to cover, or that radius passes max_km. Only mechanics in nearby
+cells are loaded, so the cost follows how many mechanics are close by rather
+than how many there are.
+"""
+
+from MainBackend.geo import covered_km, distance_km, ring_cells
+from .models import Mechanic
+
+
+def find_nearest_mechanics(latitude, longitude, k, max_km):
+    """
+    Up to `k` available mechanics within `max_km` of the point, nearest
+    first, as (distance in km, mechanic) pairs. Each mechanic comes with its
+    account and account address loaded.
+    """
+    found = []
+    inner, outer = 0, 1
+    while True:
+        mechanics = Mechanic.objects.filter(
+            status=Mechanic.Status.AVAILABLE,
+            account__accountaddress__grid_cell__in=ring_cells(latitude, longitude, inner, outer)
+        ).select_related('account__accountaddress')
+        for mechanic in mechanics:
+            address = mechanic.account.accountaddress
+            found.append((distance_km(latitude, longitude, address.latitude, address.longitude), mechanic))
+
+        radius = min(covered_km(latitude, outer), max_km)
+        if radius >= max_km or sum(distance <= radius for distance, _ in found) >= k:
+            found.sort(key=lambda pair: pair[0])
+            return [pair for pair in found if pair[0] <= max_km][:k]
+        inner, outer = outer + 1, outer * 2
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission
 
+from .loaders import get_role_names
+
 
 class IsAccountOwner(BasePermission):
     """
@@ -10,49 +12,43 @@ class IsAccountOwner(BasePermission):
         return obj.id == account_id
 
 
-class IsClient(BasePermission):
+class HasRole(BasePermission):
     """
-    Permission to only allow clients.
+    Base permission that only allows active, unbanned accounts holding
+    `role`. Uses the account already resolved for this request.
     """
+    role = None
+
     def has_permission(self, request, view):
-        account_id = request.session.get('account_id')
-        if not account_id:
+        account = request.account
+        if not account or not account.is_active or hasattr(account, 'accountban'):
             return False
-        roles = request.session.get('roles', [])
-        return 'client' in roles
+        return self.role in get_role_names(account)
+
+
+class IsClient(HasRole):
+    """
+    Permission to only allow clients.
+    """
+    role = 'client'
 
 
-class IsMechanic(BasePermission):
+class IsMechanic(HasRole):
     """
     Permission to only allow mechanics.
     """
-    def has_permission(self, request, view):
-        account_id = request.session.get('account_id')
-        if not account_id:
-            return False
-        roles = request.session.get('roles', [])
-        return 'mechanic' in roles
+    role = 'mechanic'
 
 
-class IsShopOwner(BasePermission):
+class IsShopOwner(HasRole):
     """
     Permission to only allow shop owners.
     """
-    def has_permission(self, request, view):
-        account_id = request.session.get('account_id')
-        if not account_id:
-            return False
-        roles = request.session.get('roles', [])
-        return 'shop_owner' in roles
+    role = 'shop_owner'
 
 
-class IsAdmin(BasePermission):
+class IsAdmin(HasRole):
     """
     Permission to only allow admins.
     """
-    def has_permission(self, request, view):
-        account_id = request.session.get('account_id')
-        if not account_id:
-            return False
-        roles = request.session.get('roles', [])
-        return 'admin' in roles
+    role = 'admin'
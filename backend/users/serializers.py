@@ -3,6 +3,7 @@ from .models import (
     Account, AccountAddress, AccountRole, Client, 
     Mechanic, ShopOwner, Admin, PasswordReset
 )
+from .loaders import load_account, get_role_profiles, get_role_names
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
 import re
@@ -13,7 +14,8 @@ class AccountAddressSerializer(serializers.ModelSerializer):
         model = AccountAddress
         fields = [
             'house_building_number', 'street_name', 'subdivision_village',
-            'barangay', 'city_municipality', 'province', 'region', 'postal_code'
+            'barangay', 'city_municipality', 'province', 'region', 'postal_code',
+            'latitude', 'longitude'
         ]
 
 
@@ -50,6 +52,15 @@ class AdminSerializer(serializers.ModelSerializer):
         fields = ['profile_photo', 'contact_number']
 
 
+# Profile serializer for each role name returned by get_role_profiles
+ROLE_PROFILE_SERIALIZERS = {
+    'client': ClientSerializer,
+    'mechanic': MechanicSerializer,
+    'shop_owner': ShopOwnerSerializer,
+    'admin': AdminSerializer,
+}
+
+
 class AccountSerializer(serializers.ModelSerializer):
     address = AccountAddressSerializer(source='accountaddress', read_only=True)
     roles = AccountRoleSerializer(source='accountrole_set', many=True, read_only=True)
@@ -66,17 +77,8 @@ class AccountSerializer(serializers.ModelSerializer):
 
     def get_profile(self, obj):
         """Get the profile data based on the user's role"""
-        try:
-            if hasattr(obj, 'client'):
-                return ClientSerializer(obj.client).data
-            elif hasattr(obj, 'mechanic'):
-                return MechanicSerializer(obj.mechanic).data
-            elif hasattr(obj, 'shopowner'):
-                return ShopOwnerSerializer(obj.shopowner).data
-            elif hasattr(obj, 'admin'):
-                return AdminSerializer(obj.admin).data
-        except:
-            pass
+        for role, profile in get_role_profiles(obj).items():
+            return ROLE_PROFILE_SERIALIZERS[role](profile).data
         return None
 
 
@@ -103,12 +105,11 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
     
     def get_user_type(self, obj):
         """Get all user types/roles"""
-        roles = obj.accountrole_set.values_list('account_role', flat=True)
-        return list(roles)
+        return get_role_names(obj)
     
     def get_available_roles(self, obj):
         """Get available roles for switching"""
-        roles = obj.accountrole_set.values_list('account_role', flat=True)
+        roles = get_role_names(obj)
         role_list = []
         for role in roles:
             role_list.append({
@@ -119,16 +120,10 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
     
     def get_current_role_profile(self, obj):
         """Get current role profile data"""
-        profiles = {}
-        if hasattr(obj, 'client'):
-            profiles['client'] = ClientSerializer(obj.client).data
-        if hasattr(obj, 'mechanic'):
-            profiles['mechanic'] = MechanicSerializer(obj.mechanic).data
-        if hasattr(obj, 'shopowner'):
-            profiles['shop_owner'] = ShopOwnerSerializer(obj.shopowner).data
-        if hasattr(obj, 'admin'):
-            profiles['admin'] = AdminSerializer(obj.admin).data
-        return profiles
+        return {
+            role: ROLE_PROFILE_SERIALIZERS[role](profile).data
+            for role, profile in get_role_profiles(obj).items()
+        }
 
 
 class RoleSwitchSerializer(serializers.Serializer):
@@ -289,7 +284,7 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         try:
-            account = Account.objects.get(username=username)
+            account = load_account(username=username)
         except Account.DoesNotExist:
             raise serializers.ValidationError({"username": "Invalid credentials"})
 
@@ -299,9 +294,12 @@ class LoginSerializer(serializers.Serializer):
         if not account.is_active:
             raise serializers.ValidationError({"account": "Account is deactivated"})
 
+        if hasattr(account, 'accountban'):
+            raise serializers.ValidationError({"account": "Account is banned"})
+
         # Update last login
         account.last_login = timezone.now()
-        account.save()
+        account.save(update_fields=['last_login'])
 
         data['account'] = account
         return data
@@ -3,13 +3,18 @@ Signal handlers for the users app.
 
 These signals automatically update cached values when related data changes:
 - Updates Mechanic.average_rating when reviews are created, updated, or deleted
+- Drops the cached authentication record of an account when the account, its
+  roles or its ban change
+- Geocodes account addresses saved without coordinates (see users.geocoding)
 """
 
 from decimal import Decimal
 from django.db.models import Avg
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import MechanicReview, Mechanic
+from .models import MechanicReview, Mechanic, Account, AccountAddress, AccountRole, AccountBan
+from .account_cache import invalidate_account_record
+from .geocoding import locate
 
 
 def update_mechanic_average_rating(mechanic):
@@ -30,7 +35,8 @@ def update_mechanic_average_rating(mechanic):
         # No reviews yet, set to 0
         mechanic.average_rating = Decimal('0.00')
     
-    mechanic.save(update_fields=['average_rating'])
+    # updated_at moves too, so list_mechanics' ETag changes with the rating
+    mechanic.save(update_fields=['average_rating', 'updated_at'])
 
 
 @receiver(post_save, sender=MechanicReview)
@@ -52,3 +58,33 @@ def mechanic_review_deleted(sender, instance, **kwargs):
     Why signals? Automatically maintains data consistency when reviews are removed.
     """
     update_mechanic_average_rating(instance.mechanic)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def account_changed(sender, instance, **kwargs):
+    """
+    Signal handler: Drops the cached authentication record of a changed account.
+    """
+    invalidate_account_record(instance.id)
+
+
+@receiver(post_save, sender=AccountRole)
+@receiver(post_delete, sender=AccountRole)
+@receiver(post_save, sender=AccountBan)
+@receiver(post_delete, sender=AccountBan)
+def account_access_changed(sender, instance, **kwargs):
+    """
+    Signal handler: Drops the cached authentication record when an account's
+    roles or ban change, so bans apply on the next request.
+    """
+    invalidate_account_record(instance.account_id)
+
+
+@receiver(pre_save, sender=AccountAddress)
+def account_address_saving(sender, instance, **kwargs):
+    """
+    Signal handler: Fills in an address's coordinates from its barangay and
+    city when they are missing, and keeps its grid cell current.
+    """
+    locate(instance)
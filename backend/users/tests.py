@@ -1,3 +1,361 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from MainBackend.geo import distance_km, grid_cell
+from MainBackend.versioned_cache import bump_version
+from .account_cache import invalidate_account_record
+from .geocoding import PLACES_NAMESPACE, geocode, place_key
+from .models import Account, AccountAddress, AccountBan, AccountRole, Client, Mechanic, PlaceCentroid
+
+
+def create_account(username, password='Secret123', roles=('client',)):
+    account = Account.objects.create(
+        firstname=username.title(),
+        lastname='Tester',
+        email=f'{username}@example.com',
+        username=username,
+        password=make_password(password),
+    )
+    AccountAddress.objects.create(
+        account=account, street_name='Rizal St', barangay='Poblacion',
+        city_municipality='Davao City', province='Davao del Sur', region='XI'
+    )
+    for role in roles:
+        AccountRole.objects.create(account=account, account_role=role)
+    if 'client' in roles:
+        Client.objects.create(account=account)
+    if 'mechanic' in roles:
+        Mechanic.objects.create(account=account)
+    return account
+
+
+class UsersTestCase(TestCase):
+    def login(self, account):
+        self.drop_flushed_session_cookie()
+        session = self.client.session
+        session['account_id'] = account.id
+        session['roles'] = [role.account_role for role in account.accountrole_set.all()]
+        session.save()
+
+    def drop_flushed_session_cookie(self):
+        """Forget the emptied cookie of a flushed session, so client.session starts a new one"""
+        cookie = self.client.cookies.get(settings.SESSION_COOKIE_NAME)
+        if cookie is not None and not cookie.value:
+            del self.client.cookies[settings.SESSION_COOKIE_NAME]
+
+    def account_queries(self, method, url, data=None):
+        """Run a request and return it with the queries it made outside the session table"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, content_type='application/json')
+        queries = [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' not in q['sql'] and q['sql'].startswith('SELECT')
+        ]
+        return response, queries
+
+
+class AccountLoaderTests(UsersTestCase):
+    def setUp(self):
+        self.account = create_account('juan', roles=('client', 'mechanic'))
+
+    def test_login_reads_account_in_two_queries(self):
+        response, queries = self.account_queries(
+            'post', reverse('login'), {'username': 'juan', 'password': 'Secret123'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 2, queries)
+        self.assertEqual(response.data['account']['profile'], {'profile_photo': None, 'contact_number': None})
+        self.assertEqual(self.client.session['roles'], ['client', 'mechanic'])
+
+    def test_session_and_profile_views_read_account_in_two_queries(self):
+        self.login(self.account)
+        for name in ['check_session', 'get_profile_details']:
+            response, queries = self.account_queries('get', reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            self.assertLessEqual(len(queries), 2, (name, queries))
+
+        profile = response.data['profile']
+        self.assertEqual(profile['user_type'], ['client', 'mechanic'])
+        self.assertEqual(set(profile['current_role_profile']), {'client', 'mechanic'})
+
+
+class SessionAccountMiddlewareTests(UsersTestCase):
+    def setUp(self):
+        self.account = create_account('maria')
+
+    def test_account_is_loaded_once_per_request(self):
+        self.login(self.account)
+        for url in [reverse('list-client-bookings'), reverse('get_profile_details'), reverse('get_current_user')]:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            account_queries = [
+                q['sql'] for q in ctx.captured_queries if 'FROM "users_account"' in q['sql']
+            ]
+            self.assertEqual(len(account_queries), 1, (url, account_queries))
+
+    def test_deactivated_account_is_rejected(self):
+        self.login(self.account)
+        Account.objects.filter(id=self.account.id).update(is_active=False)
+        # Queryset updates skip the signals that drop the cached record
+        invalidate_account_record(self.account.id)
+        response = self.client.get(reverse('get_current_user'))
+        self.assertEqual(response.status_code, 403)
+
+
+class StaleSessionTests(UsersTestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account('maria')
+        self.login(self.account)
+
+    def log_in(self, username='maria'):
+        return self.client.post(
+            reverse('login'), {'username': username, 'password': 'Secret123'}, content_type='application/json'
+        )
+
+    def test_banned_session_can_log_out_but_not_back_in(self):
+        AccountBan.objects.create(account=self.account, reason_ban='Spam')
+
+        self.assertEqual(self.client.post(reverse('logout')).status_code, 200)
+        self.login(self.account)
+        response = self.log_in()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['account'][0], 'Account is banned')
+        self.assertNotIn('account_id', self.client.session)
+
+    def test_deleted_account_session_can_log_out_and_log_in_again(self):
+        other = create_account('pedro')
+        account_id = self.account.id
+        self.account.delete()
+
+        self.assertEqual(self.client.post(reverse('logout')).status_code, 200)
+        self.drop_flushed_session_cookie()
+        session = self.client.session
+        session['account_id'] = account_id
+        session.save()
+        response = self.log_in('pedro')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.session['account_id'], other.id)
+
+    def test_stale_session_is_refused_by_protected_views(self):
+        AccountBan.objects.create(account=self.account, reason_ban='Spam')
+        self.assertEqual(self.client.get(reverse('get_current_user')).status_code, 403)
+        self.assertNotIn('account_id', self.client.session)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class AccountRecordCacheTests(UsersTestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account('maria')
+        self.login(self.account)
+
+    def account_reads(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if 'users_account' in q['sql']]
+
+    def test_authenticating_a_cached_account_costs_no_query(self):
+        self.account_reads(reverse('list_services'))
+        response, reads = self.account_reads(reverse('list_services'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(reads, [])
+
+    def test_bans_and_deactivations_apply_on_the_next_request(self):
+        self.assertEqual(self.client.get(reverse('get_current_user')).status_code, 200)
+        ban = AccountBan.objects.create(account=self.account, reason_ban='Spam')
+        self.assertEqual(self.client.get(reverse('get_current_user')).status_code, 403)
+
+        ban.delete()
+        self.login(self.account)
+        self.assertEqual(self.client.get(reverse('get_current_user')).status_code, 200)
+        self.account.is_active = False
+        self.account.save()
+        self.assertEqual(self.client.get(reverse('get_current_user')).status_code, 403)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_per_process_cache_is_not_trusted(self):
+        self.client.get(reverse('get_current_user'))
+        # A ban saved by another worker only clears that worker's cache
+        AccountBan.objects.bulk_create([AccountBan(account=self.account, reason_ban='Spam')])
+        self.assertEqual(self.client.get(reverse('get_current_user')).status_code, 403)
+        self.assertIsNone(cache.get(f'account-record:{self.account.id}'))
+
+
+class SessionWriteTests(UsersTestCase):
+    def setUp(self):
+        self.account = create_account('maria', roles=('client', 'mechanic'))
+        self.login(self.account)
+
+    def session_writes(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response, [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')
+        ]
+
+    def test_role_reads_do_not_save_the_session(self):
+        for url in [reverse('get_active_role'), reverse('get_role_status')]:
+            response, writes = self.session_writes(url)
+            self.assertEqual(response.data['active_role'], 'client', url)
+            self.assertEqual(writes, [], url)
+        self.assertNotIn('active_role', self.client.session)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_sessions_skip_the_session_table(self):
+        cache.clear()
+        self.login(self.account)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('get_active_role'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'django_session' in q['sql']])
+
+        # Writes still reach the database
+        self.client.post(reverse('switch_role'), {'role': 'mechanic'}, content_type='application/json')
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('get_active_role')).data['active_role'], 'mechanic')
+
+
+class PurgeExpiredSessionsTests(TestCase):
+    def test_expired_sessions_are_purged_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+            for i in range(25)
+        ] + [Session(session_key='current', session_data='', expire_date=now + timedelta(days=1))])
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('purge_expired_sessions', batch_size=10, stdout=out)
+
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current'])
+        self.assertIn('Purged 25 expired sessions', out.getvalue())
+        deletes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+
+
+class NearestMechanicsTests(UsersTestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('load_place_centroids', stdout=StringIO())
+
+    def create_mechanic(self, username, latitude, longitude, status=Mechanic.Status.AVAILABLE):
+        account = create_account(username, roles=('mechanic',))
+        AccountAddress.objects.filter(account=account).delete()
+        AccountAddress.objects.create(
+            account=account, street_name='Rizal St', barangay='Poblacion',
+            city_municipality='Davao City', province='Davao del Sur', region='XI',
+            latitude=latitude, longitude=longitude
+        )
+        Mechanic.objects.filter(account=account).update(status=status)
+        return account
+
+    def test_place_names_are_normalized(self):
+        self.assertEqual(place_key('Brgy. Poblacion'), 'poblacion')
+        self.assertEqual(place_key('City of Davao', city=True), place_key('Davao City', city=True))
+        self.assertEqual(geocode('Anywhere', 'City of Davao'), (Decimal('7.073100'), Decimal('125.612800')))
+        self.assertIsNone(geocode('Poblacion', 'Atlantis'))
+
+        PlaceCentroid.objects.create(
+            barangay='Poblacion', city_municipality='Davao City', latitude='7.065000', longitude='125.608000',
+            barangay_key='poblacion', city_key='davao'
+        )
+        bump_version(PLACES_NAMESPACE)
+        self.assertEqual(geocode('Brgy. Poblacion', 'Davao City'), (Decimal('7.065000'), Decimal('125.608000')))
+
+    def test_addresses_are_geocoded_when_saved(self):
+        address = create_account('juan').accountaddress
+        self.assertEqual((address.latitude, address.longitude), (Decimal('7.073100'), Decimal('125.612800')))
+        self.assertEqual(address.grid_cell, grid_cell(address.latitude, address.longitude))
+
+    def test_changing_the_place_geocodes_the_address_again(self):
+        account = create_account('juan')
+        self.login(account)
+        response = self.client.patch(
+            reverse('update_profile'), {'city_municipality': 'Cebu City'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        address = AccountAddress.objects.get(account=account)
+        self.assertEqual((address.latitude, address.longitude), (Decimal('10.315700'), Decimal('123.885400')))
+        self.assertEqual(address.grid_cell, grid_cell(address.latitude, address.longitude))
+
+        # Coordinates sent along with the new place are kept
+        address.city_municipality = 'Davao City'
+        address.latitude, address.longitude = Decimal('7.100000'), Decimal('125.600000')
+        address.save()
+        address.refresh_from_db()
+        self.assertEqual(address.latitude, Decimal('7.100000'))
+
+        self.client.patch(reverse('update_profile'), {'city_municipality': 'Atlantis'}, content_type='application/json')
+        address.refresh_from_db()
+        self.assertEqual((address.latitude, address.grid_cell), (None, None))
+
+    def test_loader_backfills_missing_coordinates(self):
+        account = create_account('juan')
+        AccountAddress.objects.filter(account=account).update(
+            city_municipality='Digos', latitude=None, longitude=None, grid_cell=None
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('barangay,city_municipality,province,latitude,longitude\n,Digos,Davao del Sur,6.749800,125.357200\n')
+        self.addCleanup(os.remove, source.name)
+
+        out = StringIO()
+        call_command('load_place_centroids', source.name, stdout=out)
+
+        address = AccountAddress.objects.get(account=account)
+        self.assertEqual(address.latitude, Decimal('6.749800'))
+        self.assertIsNotNone(address.grid_cell)
+        self.assertIn('Geocoded 1 account addresses', out.getvalue())
+
+    def test_returns_the_k_nearest_available_mechanics(self):
+        origin = (7.0731, 125.6128)
+        points = [(7.0731 + 0.01 * i, 125.6128 - 0.013 * i) for i in range(1, 9)]
+        for i, (latitude, longitude) in enumerate(points):
+            self.create_mechanic(f'mechanic{i}', latitude, longitude)
+        self.create_mechanic('busy', 7.0732, 125.6129, status=Mechanic.Status.WORKING)
+        self.create_mechanic('cebu', 10.3157, 123.8854)
+
+        # The 3x3 cells around the origin hold only three of them, so the
+        # search widens once and never reads the cells around Cebu
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('nearest_mechanics'), {
+                'latitude': origin[0], 'longitude': origin[1], 'k': 5
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['name'] for m in response.data['mechanics']], [f'Mechanic{i} Tester' for i in range(5)])
+        distances = [m['distance_km'] for m in response.data['mechanics']]
+        self.assertEqual(distances, sorted(distances))
+        self.assertAlmostEqual(distances[0], distance_km(*origin, *points[0]), places=2)
+
+    def test_search_stops_at_the_maximum_distance(self):
+        self.create_mechanic('cebu', 10.3157, 123.8854)
+        response = self.client.get(reverse('nearest_mechanics'), {'barangay': 'Poblacion', 'city_municipality': 'Davao City'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(response.data['origin'], {'latitude': 7.0731, 'longitude': 125.6128})
+
+    def test_invalid_locations_are_rejected(self):
+        url = reverse('nearest_mechanics')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'latitude': 'north', 'longitude': 1}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'latitude': 95, 'longitude': 1}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'latitude': 7, 'longitude': 125, 'k': 0}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'city_municipality': 'Atlantis'}).status_code, 404)
@@ -26,6 +26,7 @@ urlpatterns = [
     
     # Discovery endpoints
     path('mechanics/', views.list_mechanics, name='list_mechanics'),
+    path('mechanics/nearest/', views.nearest_mechanics, name='nearest_mechanics'),
     
     # Role registration
     path('register-mechanic/', views.register_mechanic, name='register_mechanic'),
@@ -31,4 +31,5 @@ __all__ = [
     
     # Discovery views
     'list_mechanics',
+    'nearest_mechanics',
 ]
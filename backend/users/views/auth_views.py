@@ -3,7 +3,9 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
+from ..middleware import get_session_account
 from ..models import Account, AccountRole
+from ..loaders import get_role_names
 from ..serializers import (
     RegisterSerializer, LoginSerializer, AccountSerializer
 )
@@ -52,7 +54,7 @@ def login(request):
         request.session['username'] = account.username
         
         # Get user roles
-        roles = list(account.accountrole_set.values_list('account_role', flat=True))
+        roles = get_role_names(account)
         request.session['roles'] = roles
         
         return Response({
@@ -92,7 +94,7 @@ def check_session(request):
                 'authenticated': False
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         return Response({
             'authenticated': True,
             'account': AccountSerializer(account).data
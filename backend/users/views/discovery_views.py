@@ -2,20 +2,51 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.db import DatabaseError
+
+from MainBackend.pagination import InvalidCursor, wants_pagination, get_page_params, keyset_page
+from MainBackend.db_router import replica_read
+from MainBackend.query_budget import query_budget
+from MainBackend.stale_fallback import stale_fallback
+from MainBackend.single_flight import single_flight
+from MainBackend.conditional import conditional_get, table_state
 
 from ..models import Mechanic
+from ..geocoding import geocode
+from ..nearby import find_nearest_mechanics
 from ..serializers import MechanicSerializer
 
 
+def _mechanic_states(request):
+    """Helper function returning the validator states of the mechanic listing"""
+    return [table_state(Mechanic.objects.all(), 'updated_at', 'account__updated_at')]
+
+
+@query_budget(5)
+@replica_read
+@stale_fallback
+@conditional_get(_mechanic_states)
 @api_view(['GET'])
+@single_flight
 @permission_classes([AllowAny])
 def list_mechanics(request):
     """
     Get list of all available mechanics
-    Returns mechanic details including profile, ratings, and services
+    Returns mechanic details including profile, ratings, and services.
+    Supports conditional GET (ETag / Last-Modified). Identical concurrent
+    requests share one response (see MainBackend/single_flight.py). While the
+    database is failing the last good payload is served with X-Stale: true.
+    
+    Query Parameters:
+    - cursor, page_size: Return one page, oldest first, plus a next_cursor
+      for the following page. Without them every row is returned.
     """
     try:
         mechanics = Mechanic.objects.select_related('account').all()
+        next_cursor = None
+        if wants_pagination(request):
+            mechanics, next_cursor = keyset_page(mechanics, **get_page_params(request), descending=False)
         mechanics_data = []
         
         for mechanic in mechanics:
@@ -31,7 +62,96 @@ def list_mechanics(request):
             }
             mechanics_data.append(mechanic_info)
         
+        response_data = {
+            'mechanics': mechanics_data,
+            'count': len(mechanics_data)
+        }
+        if wants_pagination(request):
+            response_data['next_cursor'] = next_cursor
+        
+        return Response(response_data, status=status.HTTP_200_OK)
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except DatabaseError:
+        # Answered from the last good payload by @stale_fallback
+        raise
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@query_budget(6)
+@replica_read
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def nearest_mechanics(request):
+    """
+    Get the available mechanics nearest to a point, nearest first.
+    Mechanics are located by their account address (see users/nearby.py).
+    
+    Query Parameters:
+    - latitude, longitude: The point to search from, or
+    - barangay, city_municipality: A place to search from, geocoded offline
+    - k: Number of mechanics to return (default 10, at most 50)
+    """
+    try:
+        latitude = request.query_params.get('latitude')
+        longitude = request.query_params.get('longitude')
+        if latitude is not None or longitude is not None:
+            try:
+                latitude, longitude = float(latitude), float(longitude)
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'latitude and longitude must both be numbers'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return Response({
+                    'error': 'latitude or longitude is out of range'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            city_municipality = request.query_params.get('city_municipality')
+            if not city_municipality:
+                return Response({
+                    'error': 'Provide latitude and longitude, or barangay and city_municipality'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            place = geocode(request.query_params.get('barangay'), city_municipality)
+            if place is None:
+                return Response({
+                    'error': 'Location not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            latitude, longitude = map(float, place)
+        
+        k = request.query_params.get('k')
+        if k is None:
+            k = settings.NEAREST_MECHANICS_DEFAULT_K
+        elif not k.isdigit() or int(k) < 1:
+            return Response({
+                'error': 'k must be a positive integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        k = min(int(k), settings.NEAREST_MECHANICS_MAX_K)
+        
+        nearest = find_nearest_mechanics(latitude, longitude, k, settings.NEAREST_MECHANICS_MAX_KM)
+        mechanics_data = []
+        
+        for distance, mechanic in nearest:
+            address = mechanic.account.accountaddress
+            mechanics_data.append({
+                'id': mechanic.id,
+                'account_id': mechanic.account.id,
+                'name': f"{mechanic.account.firstname} {mechanic.account.lastname}",
+                'profile_photo': mechanic.profile_photo.url if mechanic.profile_photo else None,
+                'contact_number': mechanic.contact_number,
+                'average_rating': float(mechanic.average_rating),
+                'barangay': address.barangay,
+                'city_municipality': address.city_municipality,
+                'distance_km': round(distance, 2),
+            })
+        
         return Response({
+            'origin': {'latitude': latitude, 'longitude': longitude},
             'mechanics': mechanics_data,
             'count': len(mechanics_data)
         }, status=status.HTTP_200_OK)
@@ -7,6 +7,7 @@ from django.utils import timezone
 from datetime import timedelta
 import secrets
 
+from ..middleware import get_session_account
 from ..models import Account, PasswordReset
 from ..serializers import (
     ChangePasswordSerializer, PasswordResetRequestSerializer,
@@ -26,8 +27,7 @@ def change_password(request):
     - confirm_password
     """
     try:
-        account_id = request.session.get('account_id')
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         serializer = ChangePasswordSerializer(
             data=request.data,
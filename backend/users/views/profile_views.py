@@ -3,7 +3,11 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
+from MainBackend.conditional import conditional_get
+
+from ..middleware import get_session_account
 from ..models import Account
+from ..loaders import ROLE_PROFILE_RELATIONS
 from ..serializers import AccountSerializer
 
 
@@ -14,8 +18,7 @@ def get_current_user(request):
     Get current logged in user details
     """
     try:
-        account_id = request.session.get('account_id')
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         return Response({
             'account': AccountSerializer(account).data
         }, status=status.HTTP_200_OK)
@@ -32,8 +35,7 @@ def update_profile(request):
     Update current user's profile information
     """
     try:
-        account_id = request.session.get('account_id')
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         # Update account fields
         allowed_fields = ['firstname', 'lastname', 'middlename', 'date_of_birth', 'gender']
@@ -87,6 +89,26 @@ def update_profile(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _profile_states(request):
+    """
+    Helper function returning the validator states of the session account's
+    profile, read from the account the loader already fetched for the view.
+    """
+    try:
+        account = get_session_account(request)
+    except Account.DoesNotExist:
+        return None
+    
+    states = [(1, account.updated_at)]
+    for relation in ['accountaddress', *ROLE_PROFILE_RELATIONS]:
+        profile = getattr(account, relation, None)
+        states.append((1, profile.updated_at) if profile else (0, None))
+    roles = account.accountrole_set.all()
+    states.append((len(roles), max((role.appointed_at for role in roles), default=None)))
+    return states
+
+
+@conditional_get(_profile_states)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_profile_details(request):
@@ -98,6 +120,8 @@ def get_profile_details(request):
     - Available roles for switching
     - Profile data for each role
     - Address information
+    
+    Supports conditional GET (ETag / Last-Modified).
     """
     # Get account_id from session
     account_id = request.session.get('account_id')
@@ -108,7 +132,7 @@ def get_profile_details(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         from ..serializers import ProfileDetailSerializer
         serializer = ProfileDetailSerializer(account)
@@ -149,7 +173,7 @@ def update_profile_settings(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         from ..serializers import ProfileSettingsSerializer
         serializer = ProfileSettingsSerializer(data=request.data, partial=True)
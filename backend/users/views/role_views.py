@@ -3,6 +3,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
+from ..middleware import get_session_account
 from ..models import Account, Mechanic, AccountRole
 from ..serializers import MechanicSerializer
 
@@ -28,7 +29,7 @@ def switch_role(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         from ..serializers import RoleSwitchSerializer
         serializer = RoleSwitchSerializer(
@@ -91,10 +92,10 @@ def get_active_role(request):
         active_role = request.session.get('active_role')
         roles = request.session.get('roles', [])
         
-        # If no active role is set, use the first available role
+        # If no active role is set, use the first available role. The default
+        # is not stored, so reading it does not mark the session modified.
         if not active_role and roles:
             active_role = roles[0]
-            request.session['active_role'] = active_role
         
         return Response({
             'active_role': active_role,
@@ -123,7 +124,7 @@ def get_role_status(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         # Check if user has profiles for each role
         is_client = hasattr(account, 'client')
@@ -136,10 +137,10 @@ def get_role_status(request):
         # Get all roles from AccountRole
         roles = list(account.accountrole_set.values_list('account_role', flat=True))
         
-        # If no active role is set, use the first available role or default to client
+        # If no active role is set, use the first available role or default to
+        # client, without storing the default in the session
         if not active_role and roles:
             active_role = roles[0]
-            request.session['active_role'] = active_role
         elif not active_role:
             active_role = 'client'
         
@@ -190,7 +191,7 @@ def register_mechanic(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        account = Account.objects.get(id=account_id)
+        account = get_session_account(request)
         
         # Check if already registered as mechanic
         if hasattr(account, 'mechanic'):